@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+
+# Duração de cada quadro de análise de energia
+QUADRO_MS = 30
+
+# Nível mínimo representável (silêncio digital), em dBFS
+PISO_DB = -100.0
+
+# Quadros até VAD_LIMIAR_DB abaixo do volume médio (RMS) do áudio contam como fala
+VAD_LIMIAR_DB = float(os.getenv('VAD_LIMIAR_DB', 10))
+
+
+def _db(valor):
+    """
+    Converte amplitude (escala int16) em dBFS, limitada a PISO_DB.
+    """
+    return 20 * np.log10(np.maximum(np.asarray(valor, dtype=np.float64) / 32768.0, 10 ** (PISO_DB / 20)))
+
+
+def pcm_para_amostras(pcm: bytes) -> np.ndarray:
+    """
+    Converte PCM 16 bits little-endian (mono) em um array de amostras int16.
+    """
+    return np.frombuffer(pcm, dtype='<i2')
+
+
+def energia_quadros_db(amostras: np.ndarray, sample_rate: int, quadro_ms: int = QUADRO_MS) -> np.ndarray:
+    """
+    Calcula a energia RMS de cada quadro, em dBFS. Amostras que não completam
+    um quadro no final são descartadas.
+    """
+    return _db(np.sqrt(_quadrado_medio_quadros(amostras.astype(np.float32), sample_rate, quadro_ms)))
+
+
+def _quadrado_medio_quadros(amostras, sample_rate, quadro_ms):
+    tamanho = max(1, sample_rate * quadro_ms // 1000)
+    total = len(amostras) // tamanho
+    quadros = amostras[:total * tamanho].reshape(total, tamanho)
+    return np.mean(quadros * quadros, axis=1) if total else np.empty(0, dtype=np.float32)
+
+
+def analisar_volume(pcm: bytes, sample_rate: int, margem_db: float = VAD_LIMIAR_DB, quadro_ms: int = QUADRO_MS) -> dict:
+    """
+    Analisa o volume do PCM decodificado em uma passagem vetorizada.
+
+    Parameters:
+    pcm (bytes): PCM 16 bits mono.
+    sample_rate (int): Taxa de amostragem do PCM.
+    margem_db (float): Quadros abaixo de (volume médio - margem_db) são silêncio.
+
+    Returns:
+    dict: 'mean_volume' (RMS) e 'max_volume' (pico) em dBFS, 'proporcao_silencio'
+    (0 a 1) e 'inicio_fala' / 'fim_fala' (segundos) delimitando o trecho
+    entre o silêncio inicial e o final.
+    """
+    amostras = pcm_para_amostras(pcm).astype(np.float32)
+    quadrado_medio = _quadrado_medio_quadros(amostras, sample_rate, quadro_ms)
+    if quadrado_medio.size == 0:
+        return {"mean_volume": PISO_DB, "max_volume": PISO_DB, "proporcao_silencio": 1.0,
+                "inicio_fala": 0.0, "fim_fala": 0.0}
+
+    media_db = float(_db(np.sqrt(np.mean(quadrado_medio))))
+    pico_db = float(_db(np.max(np.abs(amostras))))
+    fala = np.flatnonzero(_db(np.sqrt(quadrado_medio)) > media_db - margem_db)
+    duracao_quadro = quadro_ms / 1000
+    return {
+        "mean_volume": round(media_db, 1),
+        "max_volume": round(pico_db, 1),
+        "proporcao_silencio": round(1 - fala.size / quadrado_medio.size, 3),
+        "inicio_fala": float(fala[0] * duracao_quadro) if fala.size else 0.0,
+        "fim_fala": float((fala[-1] + 1) * duracao_quadro) if fala.size else 0.0,
+    }
+
+
+def cortar_silencio(pcm: bytes, sample_rate: int, analise: dict, margem_ms: int = 200, sample_width: int = 2) -> bytes:
+    """
+    Remove o silêncio inicial e final do PCM, mantendo `margem_ms` de margem
+    em volta do trecho de fala indicado por `analisar_volume`.
+    """
+    if analise["fim_fala"] <= analise["inicio_fala"]:
+        return pcm
+    margem = margem_ms / 1000
+    inicio = int(max(0.0, analise["inicio_fala"] - margem) * sample_rate) * sample_width
+    fim = int((analise["fim_fala"] + margem) * sample_rate) * sample_width
+    return pcm[inicio:fim]
+
+
+def segmentar_por_silencio(pcm: bytes, sample_rate: int, limiar_db: float, silencio_min_ms: int = 500,
+                           segmento_max_s: float = 15.0, margem_ms: int = 200, quadro_ms: int = QUADRO_MS):
+    """
+    Divide o áudio em trechos de fala separados por silêncio (VAD por energia).
+
+    Parameters:
+    pcm (bytes): PCM 16 bits mono.
+    sample_rate (int): Taxa de amostragem do PCM.
+    limiar_db (float): Quadros com energia acima deste nível (dBFS) são fala.
+    silencio_min_ms (int): Silêncio mínimo para separar dois trechos.
+    segmento_max_s (float): Trechos maiores são divididos em partes iguais.
+    margem_ms (int): Margem de áudio mantida antes e depois de cada trecho.
+
+    Returns:
+    list[tuple[int, int]]: Intervalos (início, fim) em amostras, em ordem.
+    """
+    amostras = pcm_para_amostras(pcm)
+    energia = energia_quadros_db(amostras, sample_rate, quadro_ms)
+    fala = np.flatnonzero(energia > limiar_db)
+    if fala.size == 0:
+        return []
+
+    # Quadros de fala separados por mais que o silêncio mínimo iniciam um novo trecho
+    silencio_quadros = max(1, silencio_min_ms // quadro_ms)
+    quebras = np.flatnonzero(np.diff(fala) > silencio_quadros)
+    inicios = np.concatenate(([fala[0]], fala[quebras + 1]))
+    fins = np.concatenate((fala[quebras], [fala[-1]])) + 1
+
+    tamanho_quadro = sample_rate * quadro_ms // 1000
+    margem = sample_rate * margem_ms // 1000
+    maximo = int(sample_rate * segmento_max_s)
+    intervalos = []
+    for inicio, fim in zip(inicios * tamanho_quadro, fins * tamanho_quadro):
+        inicio = max(0, int(inicio) - margem)
+        fim = min(len(amostras), int(fim) + margem)
+        partes = max(1, -(-(fim - inicio) // maximo))
+        passo = -(-(fim - inicio) // partes)
+        intervalos.extend((i, min(i + passo, fim)) for i in range(inicio, fim, passo))
+    return intervalos
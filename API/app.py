@@ -1,112 +1,277 @@
-from flask import Flask, request, jsonify
-import logging
 from dotenv import load_dotenv
-import os
-import tempfile
-import base64
-from audio_processing import transcrever_audio, gerar_audio_resposta
-from web_search import pesquisar_na_web
-from cache.cache_manager import obter_cache, armazenar_cache
-import re
-import shutil
-from check_audio import check_audio, convert_audio_format
-
-# Carregar variáveis de ambiente
+
+# Carregar variáveis de ambiente antes dos módulos que as leem na importação
 load_dotenv()
 
-# Configuração de logging
-log_level = os.getenv('LOG_LEVEL', 'DEBUG').upper()
-logging.basicConfig(filename='logs/api.log', level=getattr(logging, log_level), format='%(asctime)s - %(levelname)s - %(message)s')
+from configuracao_log import configurar_logging, definir_id_requisicao, id_requisicao  # noqa: E402
+
+# Logging assíncrono (fila e thread de escrita), configurado antes dos demais módulos
+configurar_logging()
+
+from flask import Flask, Request, Response, request, jsonify, stream_with_context  # noqa: E402
+from werkzeug.exceptions import RequestEntityTooLarge  # noqa: E402
+import logging  # noqa: E402
+import json  # noqa: E402
+import contextvars  # noqa: E402
+import hashlib  # noqa: E402
+import threading  # noqa: E402
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed  # noqa: E402
+import os  # noqa: E402
+import base64  # noqa: E402
+from io import BytesIO  # noqa: E402
+from audio_processing import (  # noqa: E402
+    transcrever_audio, transcricao_valida, gerar_audio_resultado, iniciar_sintese_especulativa, aquecer,
+    TTS_ESPECULATIVO,
+)
+from web_search import pesquisar_na_web, MAX_RESULTADOS  # noqa: E402
+from cache.cache_manager import (  # noqa: E402
+    obter_ou_buscar, iniciar_renovacao_proativa, chave_busca, estatisticas_audio_cache, estatisticas_cache,
+    obter_transcricao_cache, armazenar_transcricao_cache, armazenar_audio_resposta, obter_audio_resposta,
+    verificar_conexao, indice_similaridade, AUDIO_RESPOSTA_TIMEOUT,
+)
+from cache.snapshot import importar_snapshot_inicial, iniciar_pre_aquecimento  # noqa: E402
+from check_audio import check_audio_stream, MAX_AUDIO_SIZE_MB, MAX_AUDIO_SIZE_BYTES  # noqa: E402
+from transcodificacao import limitador_transcodificacao, SobrecargaTranscodificacao  # noqa: E402
+from cota import CotaEsgotada, faixa_atual, LOTE  # noqa: E402
+from comandos import filtrar_por_palavra_chave  # noqa: E402
+from metricas import medir_etapa, registro  # noqa: E402
+
+# Processamento em lote: threads compartilhadas por todos os lotes e limite de áudios por lote
+LOTE_MAX_WORKERS = int(os.getenv('LOTE_MAX_WORKERS', 8))
+LOTE_MAX_ARQUIVOS = int(os.getenv('LOTE_MAX_ARQUIVOS', 20))
+executor_lote = ThreadPoolExecutor(max_workers=LOTE_MAX_WORKERS, thread_name_prefix='lote')
+
+class BufferComHash(BytesIO):
+    """
+    Buffer em memória que calcula o hash do conteúdo à medida que o upload é
+    escrito, sem uma segunda leitura dos bytes. Uploads acima de `limite`
+    bytes são recusados durante a leitura da requisição.
+    """
+    def __init__(self, limite=None):
+        super().__init__()
+        self._hash = hashlib.blake2b(digest_size=32)
+        self._limite = limite
+
+    def write(self, dados):
+        if self._limite is not None and self.tell() + len(dados) > self._limite:
+            raise RequestEntityTooLarge()
+        self._hash.update(dados)
+        return super().write(dados)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+class RequisicaoEmMemoria(Request):
+    """
+    Requisição que mantém os arquivos enviados em memória, em vez de usar
+    arquivos temporários para uploads maiores que 500 KB, limitados a
+    MAX_AUDIO_SIZE_MB por arquivo.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BufferComHash(MAX_AUDIO_SIZE_BYTES)
+
+def calcular_digest(stream):
+    """
+    Retorna o hash do conteúdo do áudio enviado, reaproveitando o hash
+    calculado durante o upload quando disponível.
+    """
+    if isinstance(stream, BufferComHash):
+        return stream.hexdigest()
+    posicao = stream.tell()
+    digest = hashlib.blake2b(stream.read(), digest_size=32).hexdigest()
+    stream.seek(posicao)
+    return digest
 
 # Inicializa o Flask
 app = Flask(__name__)
+app.request_class = RequisicaoEmMemoria
 
-# Função de filtragem de comandos de pesquisa
-def filtrar_por_palavra_chave(texto):
-    comandos_chave = [
-        r"pesquisar\s*(.*)",   
-        r"buscar\s*(.*)",       
-        r"me\s*encontre\s*(.*)", 
-        r"faça\s*uma\s*pesquisa\s*sobre\s*(.*)",  
-        r"procure\s*(.*)",      
-        r"encontre\s*(.*)",     
-        r"encontre\s*informações\s*sobre\s*(.*)", 
-        r"quero\s*ver\s*(.*)",  
-    ]
-    for comando in comandos_chave:
-        match = re.search(comando, texto, re.IGNORECASE)
-        if match:
-            consulta = match.group(1).strip()
-            logging.info(f"Comando de pesquisa identificado: {consulta}")
-            return consulta
-    logging.info(f"Texto filtrado sem comando específico: {texto.strip()}")
-    return texto.strip()
+# Requisições maiores que um lote completo são recusadas pelo Content-Length, antes da leitura
+app.config['MAX_CONTENT_LENGTH'] = MAX_AUDIO_SIZE_BYTES * LOTE_MAX_ARQUIVOS + 64 * 1024
 
-@app.route('/processar_audio', methods=['POST'])
-def processar_audio():
-    if 'audio' not in request.files:
-        logging.warning("Nenhum áudio enviado na requisição.")
-        return jsonify({"error": "Nenhum áudio enviado."}), 400
+def iniciar_worker():
+    """
+    Inicializa os recursos próprios de cada processo que atende requisições
+    (no servidor com pré-fork, logo após o fork): abre a conexão com o cache,
+    carrega o índice de consultas similares e inicia a renovação proativa das
+    consultas mais acessadas e o pré-aquecimento pelas consultas do log, e
+    passa a publicar as métricas do processo (METRICAS_DIR).
+    """
+    verificar_conexao()
+    registro.iniciar_publicacao()
+    indice_similaridade.iniciar_recarga()
+    iniciar_renovacao_proativa(pesquisar_na_web)
+    iniciar_pre_aquecimento(pesquisar_na_web, gerar_audio_resultado)
 
-    try:
-        # Validação do arquivo de áudio
-        audio_file = request.files['audio']
-        temp_audio_path = tempfile.mktemp(suffix='.ogg')
-        audio_file.save(temp_audio_path)
-        validation_result = check_audio(temp_audio_path)
+class ErroRequisicao(Exception):
+    """
+    Interrompe o processamento de um áudio com a resposta JSON e o status HTTP
+    a serem devolvidos ao cliente.
+    """
+    def __init__(self, payload, status, headers=None):
+        super().__init__(payload.get("error") or payload.get("message"))
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+
+def _transcrever_e_filtrar(stream, nome_arquivo):
+    """
+    Valida o áudio recebido, transcreve-o e extrai a consulta de pesquisa.
+
+    Returns:
+    tuple: (texto_transcrito, texto_filtrado, query)
+    """
+    # Áudios repetidos (mesmo conteúdo) reaproveitam validação e transcrição
+    digest = calcular_digest(stream)
+    with medir_etapa('cache_transcricao'):
+        transcricao_cache = obter_transcricao_cache(digest)
+    if transcricao_cache:
+        logging.info("Áudio repetido (%s); reaproveitando a transcrição em cache.", digest[:12])
+        texto_transcrito = transcricao_cache['transcricao']
+    else:
+        # Validação do arquivo de áudio (o upload é enviado ao ffmpeg em memória)
+        try:
+            with medir_etapa('check_audio'):
+                validation_result = check_audio_stream(stream, nome_arquivo or 'upload')
+        except SobrecargaTranscodificacao as e:
+            logging.warning("Áudio recusado por sobrecarga na transcodificação: %s", e)
+            raise ErroRequisicao({"error": "Servidor ocupado. Tente novamente em instantes."}, 503,
+                                 {"Retry-After": str(e.retry_after)})
         if validation_result['status'] != 'success':
-            logging.error(f"Erro na validação do áudio: {validation_result['message']}")
-            return jsonify({"error": validation_result['message']}), 400
-
-        # Caso o formato do áudio não seja WAV, converte para WAV
-        if validation_result['message'] != "Áudio validado com sucesso.":
-            conversion_result = convert_audio_format(temp_audio_path, target_format='wav')
-            if conversion_result['status'] != 'success':
-                logging.error(f"Erro ao converter o áudio para WAV: {conversion_result['message']}")
-                return jsonify({"error": conversion_result['message']}), 400
-            temp_audio_path = conversion_result['output_file']
-
-        # Transcrição do áudio para texto
-        texto_transcrito = transcrever_audio(temp_audio_path)
-        if texto_transcrito == "Não consegui entender o áudio.":
-            logging.error("Não consegui transcrever o áudio, possivelmente com baixa qualidade.")
-            return jsonify({"error": "Não consegui transcrever o áudio. Tente um áudio mais claro."}), 400
-
-        # Filtragem do texto transcrito para identificar comando de pesquisa
+            logging.error("Erro na validação do áudio: %s", validation_result['message'])
+            raise ErroRequisicao({"error": validation_result['message']}, 400)
+
+        # Transcrição do áudio para texto (reaproveita o PCM decodificado na validação)
+        with medir_etapa('transcricao'):
+            texto_transcrito = transcrever_audio(validation_result)
+        if transcricao_valida(texto_transcrito):
+            armazenar_transcricao_cache(digest, validation_result, texto_transcrito)
+
+    if texto_transcrito == "Não consegui entender o áudio.":
+        logging.error("Não consegui transcrever o áudio, possivelmente com baixa qualidade.")
+        raise ErroRequisicao({"error": "Não consegui transcrever o áudio. Tente um áudio mais claro."}, 400)
+
+    # Filtragem do texto transcrito para identificar comando de pesquisa
+    with medir_etapa('filtro'):
         texto_filtrado = filtrar_por_palavra_chave(texto_transcrito)
-        if not texto_filtrado:
-            logging.warning(f"Texto transcrito não contém um comando de pesquisa válido: {texto_transcrito}")
-            return jsonify({"message": "Não foi possível interpretar a consulta a partir da transcrição."}), 400
+    if not texto_filtrado:
+        logging.warning("Texto transcrito não contém um comando de pesquisa válido: %s", texto_transcrito)
+        raise ErroRequisicao({"message": "Não foi possível interpretar a consulta a partir da transcrição."}, 400)
 
-        logging.info(f"Consulta filtrada: {texto_filtrado}")
-        query = texto_filtrado.strip()
+    # Sem amostragem: cada consulta conta para o pré-aquecimento do cache
+    logging.info("Consulta filtrada: %s", texto_filtrado, extra={"amostragem": False})
+    return texto_transcrito, texto_filtrado, texto_filtrado.strip()
 
-        # Tentativa de obter resultados do cache
-        try:
-            cache_resultados = obter_cache(query)
-            if cache_resultados:
-                logging.info(f"Resultados encontrados no cache para a consulta: {query}")
-                resultados_pesquisa = cache_resultados
+
+def _cota_esgotada(e):
+    logging.warning("Requisição recusada por falta de cota do serviço externo: %s", e)
+    return ErroRequisicao({"error": "Servidor ocupado. Tente novamente em instantes."}, 503,
+                          {"Retry-After": str(e.retry_after)})
+
+
+def _pesquisar(query):
+    """
+    Obtém os resultados da consulta, iniciando antes a síntese especulativa
+    quando habilitada.
+
+    Returns:
+    tuple: (resultados_pesquisa, finalizar_audio ou None)
+    """
+    # Com TTS especulativo, a síntese começa em paralelo com a pesquisa, apenas para o total
+    # mais comum (a página cheia); outros totais são sintetizados ao final, se ocorrerem
+    finalizar_audio = iniciar_sintese_especulativa(query, [MAX_RESULTADOS]) if TTS_ESPECULATIVO else None
+
+    # Resultados do cache ou da pesquisa na web (uma única busca por consulta fria)
+    try:
+        with medir_etapa('busca'):
+            resultados_pesquisa = obter_ou_buscar(query, pesquisar_na_web)
+    except CotaEsgotada as e:
+        raise _cota_esgotada(e)
+    except Exception as e:
+        logging.error("Erro ao acessar o cache: %s", e)
+        raise ErroRequisicao({"error": "Erro ao acessar o cache."}, 500)
+    if not resultados_pesquisa:
+        logging.warning("Sem resultados encontrados para a pesquisa: %s", query)
+        raise ErroRequisicao({"message": "Nenhum resultado relevante encontrado."}, 404)
+    return resultados_pesquisa, finalizar_audio
+
+
+def _sintetizar(query, resultados_pesquisa, finalizar_audio=None):
+    """
+    Gera o áudio (MP3) de resposta baseado nos resultados encontrados.
+    """
+    try:
+        with medir_etapa('tts'):
+            if finalizar_audio:
+                audio_resposta = finalizar_audio(len(resultados_pesquisa))
             else:
-                logging.info(f"Buscando resultados para a consulta: {query}")
-                resultados_pesquisa = pesquisar_na_web(query)
-                if resultados_pesquisa:
-                    # Armazenando os resultados no cache
-                    armazenar_cache(query, resultados_pesquisa)
-                else:
-                    logging.warning(f"Sem resultados encontrados para a pesquisa: {query}")
-                    return jsonify({"message": "Nenhum resultado relevante encontrado."}), 404
-        except Exception as e:
-            logging.error(f"Erro ao acessar o cache: {e}")
-            return jsonify({"error": "Erro ao acessar o cache."}), 500
+                audio_resposta = gerar_audio_resultado(query, len(resultados_pesquisa))
+    except CotaEsgotada as e:
+        raise _cota_esgotada(e)
+    if not isinstance(audio_resposta, bytes):
+        logging.error("Erro ao gerar o áudio de resposta: %s", audio_resposta)
+        raise ErroRequisicao({"error": "Erro ao gerar o áudio de resposta."}, 500)
+    return audio_resposta
+
+
+def _pesquisar_e_sintetizar(query):
+    """
+    Obtém os resultados da consulta e gera o áudio de resposta codificado em base64.
+
+    Returns:
+    tuple: (resultados_pesquisa, audio_content)
+    """
+    resultados_pesquisa, finalizar_audio = _pesquisar(query)
+    audio_resposta = _sintetizar(query, resultados_pesquisa, finalizar_audio)
+
+    # Codificação do áudio gerado para retorno na resposta
+    with medir_etapa('codificacao'):
+        audio_content = base64.b64encode(audio_resposta).decode('utf-8')
+    return resultados_pesquisa, audio_content
+
+
+def _erro_inesperado(e):
+    if isinstance(e, ErroRequisicao):
+        return e.payload, e.status, e.headers
+    if isinstance(e, ValueError):
+        logging.error("Erro de validação: %s", e)
+        return {"error": str(e)}, 400, {}
+    logging.error("Erro inesperado ao processar o áudio: %s", e)
+    return {"error": "Ocorreu um erro ao processar o áudio. Tente novamente mais tarde."}, 500, {}
+
 
-        # Geração do áudio de resposta baseado nos resultados encontrados
-        texto_audio = f"Sua pesquisa sobre {query} resultou em {len(resultados_pesquisa)} resultados encontrados."
-        arquivo_audio_resposta = gerar_audio_resposta(texto_audio)
+@app.before_request
+def atribuir_id_requisicao():
+    # Identificador anexado aos logs desta requisição (o X-Request-ID recebido, se válido)
+    definir_id_requisicao(request.headers.get('X-Request-ID'))
 
-        # Leitura e codificação do arquivo de áudio gerado para retorno na resposta
-        with open(arquivo_audio_resposta, 'rb') as audio_file:
-            audio_content = base64.b64encode(audio_file.read()).decode('utf-8')
+
+@app.after_request
+def devolver_id_requisicao(resposta):
+    resposta.headers['X-Request-ID'] = id_requisicao.get()
+    return resposta
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_muito_grande(e):
+    logging.warning("Upload recusado por exceder o limite de %s MB por áudio.", MAX_AUDIO_SIZE_MB)
+    return jsonify({"error": f"Arquivo excede o limite de {MAX_AUDIO_SIZE_MB} MB."}), 413
+
+
+@app.route('/processar_audio', methods=['POST'])
+def processar_audio():
+    # Leitura do upload (multipart) para a memória
+    with medir_etapa('upload'):
+        arquivos = request.files
+    if 'audio' not in arquivos:
+        logging.warning("Nenhum áudio enviado na requisição.")
+        return jsonify({"error": "Nenhum áudio enviado."}), 400
+
+    try:
+        audio_file = arquivos['audio']
+        texto_transcrito, texto_filtrado, query = _transcrever_e_filtrar(audio_file.stream, audio_file.filename)
+        resultados_pesquisa, audio_content = _pesquisar_e_sintetizar(query)
 
         # Retorno dos dados
         return jsonify({
@@ -116,20 +281,164 @@ def processar_audio():
             'audio': audio_content
         }), 200
 
-    except ValueError as e:
-        logging.error(f"Erro de validação: {e}")
-        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logging.error(f"Erro inesperado ao processar o áudio: {e}")
-        return jsonify({"error": "Ocorreu um erro ao processar o áudio. Tente novamente mais tarde."}), 500
-    finally:
-        # Limpeza dos arquivos temporários após o processamento
+        payload, status, headers = _erro_inesperado(e)
+        return jsonify(payload), status, headers
+
+
+@app.route('/processar_audio_stream', methods=['POST'])
+def processar_audio_stream():
+    """
+    Versão em streaming de /processar_audio: devolve um objeto JSON por linha
+    (NDJSON) assim que cada etapa termina (transcrição, consulta filtrada,
+    resultados e áudio). O áudio não vai embutido em base64; o último evento
+    traz a URL de onde baixá-lo, válida por AUDIO_RESPOSTA_TIMEOUT segundos.
+    """
+    with medir_etapa('upload'):
+        arquivos = request.files
+    if 'audio' not in arquivos:
+        logging.warning("Nenhum áudio enviado na requisição.")
+        return jsonify({"error": "Nenhum áudio enviado."}), 400
+    # O upload é fechado ao fim da view, antes da geração dos eventos; o conteúdo é copiado antes
+    audio_file = arquivos['audio']
+    nome_arquivo, conteudo = audio_file.filename, audio_file.read()
+
+    def evento(nome, **dados):
+        return json.dumps({"evento": nome, **dados}, ensure_ascii=False) + "\n"
+
+    def gerar_eventos():
         try:
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
-                logging.info(f"Arquivo temporário {temp_audio_path} removido com sucesso.")
+            texto_transcrito, texto_filtrado, query = _transcrever_e_filtrar(BytesIO(conteudo), nome_arquivo)
+            yield evento("transcricao", transcricao=texto_transcrito)
+            yield evento("filtrado", filtrado=texto_filtrado)
+
+            resultados_pesquisa, finalizar_audio = _pesquisar(query)
+            yield evento("resultados", resultados=resultados_pesquisa)
+
+            identificador = armazenar_audio_resposta(_sintetizar(query, resultados_pesquisa, finalizar_audio))
+            if identificador is None:
+                raise ErroRequisicao({"error": "Erro ao gerar o áudio de resposta."}, 500)
+            yield evento("audio", url=f"/audio/{identificador}", expira_em=AUDIO_RESPOSTA_TIMEOUT)
         except Exception as e:
-            logging.warning(f"Erro ao tentar remover o arquivo temporário: {e}")
+            payload, status, headers = _erro_inesperado(e)
+            if "Retry-After" in headers:
+                payload = {**payload, "retry_after": int(headers["Retry-After"])}
+            yield evento("erro", status=status, **payload)
+
+    return Response(stream_with_context(gerar_eventos()), mimetype='application/x-ndjson')
+
+
+@app.route('/audio/<identificador>', methods=['GET'])
+def baixar_audio(identificador):
+    """
+    Áudio de resposta (MP3) gerado por /processar_audio_stream.
+    """
+    audio = obter_audio_resposta(identificador)
+    if audio is None:
+        return jsonify({"error": "Áudio não encontrado ou expirado."}), 404
+    return Response(audio, mimetype='audio/mpeg', headers={"Cache-Control": f"private, max-age={AUDIO_RESPOSTA_TIMEOUT}"})
+
+
+def _processar_item_lote(indice, nome_arquivo, conteudo, consultas, consultas_lock):
+    """
+    Processa um áudio do lote. Áudios com a mesma consulta (após normalização)
+    compartilham uma única pesquisa e um único áudio de resposta. As chamadas
+    a serviços externos usam a faixa de prioridade LOTE da cota.
+    """
+    item = {"indice": indice, "arquivo": nome_arquivo}
+    # Cada item roda em uma cópia do contexto: a faixa vale apenas para ele
+    faixa_atual.set(LOTE)
+    try:
+        texto_transcrito, texto_filtrado, query = _transcrever_e_filtrar(BytesIO(conteudo), nome_arquivo)
+
+        chave = chave_busca(query)
+        with consultas_lock:
+            futuro = consultas.get(chave)
+            responsavel = futuro is None
+            if responsavel:
+                futuro = consultas[chave] = Future()
+        if responsavel:
+            try:
+                futuro.set_result(_pesquisar_e_sintetizar(query))
+            except Exception as e:
+                futuro.set_exception(e)
+        else:
+            logging.debug("Consulta '%s' já em processamento neste lote; reaproveitando resultado.", query)
+        resultados_pesquisa, audio_content = futuro.result()
+
+        item.update({
+            'status': 200,
+            'transcricao': texto_transcrito,
+            'filtrado': texto_filtrado,
+            'resultados': resultados_pesquisa,
+            'audio': audio_content
+        })
+    except Exception as e:
+        payload, status, headers = _erro_inesperado(e)
+        item.update(payload, status=status)
+        if "Retry-After" in headers:
+            item["retry_after"] = int(headers["Retry-After"])
+    return item
+
+@app.route('/processar_audio_lote', methods=['POST'])
+def processar_audio_lote():
+    """
+    Processa vários áudios (campo 'audio' repetido) em paralelo e devolve um
+    objeto JSON por linha (NDJSON), na ordem em que cada áudio termina.
+    """
+    with medir_etapa('upload'):
+        arquivos = request.files.getlist('audio')
+    if not arquivos:
+        logging.warning("Nenhum áudio enviado na requisição de lote.")
+        return jsonify({"error": "Nenhum áudio enviado."}), 400
+    if len(arquivos) > LOTE_MAX_ARQUIVOS:
+        logging.warning("Lote com %s áudios excede o limite de %s.", len(arquivos), LOTE_MAX_ARQUIVOS)
+        return jsonify({"error": f"O lote excede o limite de {LOTE_MAX_ARQUIVOS} áudios."}), 400
+
+    logging.info("Processando lote com %s áudios.", len(arquivos))
+    # Os uploads são fechados ao fim da requisição; o conteúdo é copiado antes
+    consultas, consultas_lock = {}, threading.Lock()
+    futuros = [
+        # Cada item roda em uma cópia do contexto, mantendo o identificador da requisição nos logs
+        executor_lote.submit(
+            contextvars.copy_context().run,
+            _processar_item_lote, indice, audio_file.filename, audio_file.read(), consultas, consultas_lock,
+        )
+        for indice, audio_file in enumerate(arquivos)
+    ]
+
+    def gerar_linhas():
+        for futuro in as_completed(futuros):
+            yield json.dumps(futuro.result(), ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(gerar_linhas()), mimetype='application/x-ndjson')
+
+@app.route('/estatisticas', methods=['GET'])
+def estatisticas():
+    """
+    Estado da fila de transcodificação e do cache de áudio deste processo
+    (no gunicorn, do worker que atendeu a requisição, identificado por "pid").
+    """
+    return jsonify({
+        "pid": os.getpid(),
+        "transcodificacao": limitador_transcodificacao.estatisticas(),
+        "cache_audio": estatisticas_audio_cache(),
+        "cache_transcricao": estatisticas_cache("transcricao"),
+        "cache_busca": estatisticas_cache("busca"),
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Métricas no formato texto do Prometheus: duração de cada etapa, acertos e
+    falhas dos caches e falhas e novas tentativas nos serviços externos. Com
+    METRICAS_DIR (definido pelo gunicorn.conf.py), somadas entre os workers.
+    """
+    return Response(registro.expor(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == "__main__":
+    # Servidor de desenvolvimento; em produção, use gunicorn -c gunicorn.conf.py
+    aquecer()
+    importar_snapshot_inicial()
+    iniciar_worker()
     app.run(debug=True)
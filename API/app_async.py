@@ -0,0 +1,250 @@
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente antes dos módulos que as leem na importação
+load_dotenv()
+
+from configuracao_log import configurar_logging, definir_id_requisicao  # noqa: E402
+
+# Logging assíncrono (fila e thread de escrita), configurado antes dos demais módulos
+configurar_logging()
+
+import asyncio  # noqa: E402
+import base64  # noqa: E402
+import contextvars  # noqa: E402
+import hashlib  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from functools import partial  # noqa: E402
+
+from aiohttp import web  # noqa: E402
+
+from audio_processing import (  # noqa: E402
+    transcrever_audio, transcricao_valida, gerar_audio_resultado, iniciar_sintese_especulativa, aquecer,
+    TTS_ESPECULATIVO,
+)
+from web_search import pesquisar_na_web, pesquisar_na_web_async, cliente_serpapi_async, MAX_RESULTADOS  # noqa: E402
+from cache.cache_manager import (  # noqa: E402
+    obter_ou_buscar_async, obter_transcricao_cache, armazenar_transcricao_cache, iniciar_renovacao_proativa,
+    indice_similaridade,
+)
+from cache.snapshot import importar_snapshot_inicial, iniciar_pre_aquecimento  # noqa: E402
+from check_audio import check_audio_stream_async, MAX_AUDIO_SIZE_MB, MAX_AUDIO_SIZE_BYTES  # noqa: E402
+from transcodificacao import SobrecargaTranscodificacao  # noqa: E402
+from cota import CotaEsgotada  # noqa: E402
+from comandos import filtrar_por_palavra_chave  # noqa: E402
+from metricas import medir_etapa, registro  # noqa: E402
+
+# Threads para as chamadas bloqueantes (reconhecimento de fala e gTTS)
+ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', 32))
+ASYNC_PORT = int(os.getenv('ASYNC_PORT', 5001))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Mesmo formato de JSON do Flask (chaves ordenadas)
+_dumps = partial(json.dumps, sort_keys=True)
+
+
+def _em_thread(funcao, *args):
+    # Executor padrão do loop, em uma cópia do contexto: o identificador da requisição
+    # nos logs e a faixa da cota seguem para a thread
+    return asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, funcao, *args)
+
+
+def _json(dados, status):
+    return web.json_response(dados, status=status, dumps=_dumps)
+
+
+async def _receber_upload(request):
+    """
+    Procura a parte 'audio' do multipart e a recebe em memória, calculando o
+    hash do conteúdo enquanto chega. A leitura para assim que o áudio passa de
+    MAX_AUDIO_SIZE_BYTES.
+
+    Returns:
+    tuple: (conteúdo, nome do arquivo, hash do conteúdo) ou (None, None, None)
+    sem áudio. Acima do limite, o conteúdo vem truncado e o hash é None.
+    """
+    try:
+        reader = await request.multipart()
+    except (AssertionError, ValueError, KeyError):
+        return None, None, None
+
+    async for parte in reader:
+        if parte.name == 'audio':
+            hash_conteudo = hashlib.blake2b(digest_size=32)
+            conteudo = bytearray()
+            while True:
+                bloco = await parte.read_chunk(UPLOAD_CHUNK_SIZE)
+                if not bloco:
+                    break
+                conteudo += bloco
+                if len(conteudo) > MAX_AUDIO_SIZE_BYTES:
+                    return bytes(conteudo), parte.filename or 'upload', None
+                hash_conteudo.update(bloco)
+            return bytes(conteudo), parte.filename or 'upload', hash_conteudo.hexdigest()
+    return None, None, None
+
+
+async def _blocos(conteudo):
+    """
+    Itera sobre o áudio recebido em blocos de UPLOAD_CHUNK_SIZE, para o ffmpeg.
+    """
+    for inicio in range(0, len(conteudo), UPLOAD_CHUNK_SIZE):
+        yield conteudo[inicio:inicio + UPLOAD_CHUNK_SIZE]
+
+
+async def processar_audio(request):
+    """
+    Versão asyncio de /processar_audio, com o mesmo contrato JSON do Flask.
+    """
+    try:
+        conteudo, nome_arquivo, digest = await _receber_upload(request)
+        if conteudo is None:
+            logging.warning("Nenhum áudio enviado na requisição.")
+            return _json({"error": "Nenhum áudio enviado."}, 400)
+        if digest is None:
+            logging.error("Arquivo de áudio acima de %s MB: %s", MAX_AUDIO_SIZE_MB, nome_arquivo)
+            return _json({"error": f"Arquivo excede o limite de {MAX_AUDIO_SIZE_MB} MB."}, 400)
+
+        # Áudios repetidos (mesmo conteúdo) reaproveitam validação e transcrição,
+        # sem passar pelo ffmpeg
+        with medir_etapa('cache_transcricao'):
+            transcricao_cache = obter_transcricao_cache(digest)
+        if transcricao_cache:
+            logging.info("Áudio repetido (%s); reaproveitando a transcrição em cache.", digest[:12])
+            texto_transcrito = transcricao_cache['transcricao']
+        else:
+            # Validação do arquivo de áudio (subprocesso assíncrono do ffmpeg)
+            try:
+                with medir_etapa('check_audio'):
+                    validation_result = await check_audio_stream_async(_blocos(conteudo), nome_arquivo)
+            except SobrecargaTranscodificacao as e:
+                logging.warning("Áudio recusado por sobrecarga na transcodificação: %s", e)
+                resposta = _json({"error": "Servidor ocupado. Tente novamente em instantes."}, 503)
+                resposta.headers["Retry-After"] = str(e.retry_after)
+                return resposta
+            if validation_result['status'] != 'success':
+                logging.error("Erro na validação do áudio: %s", validation_result['message'])
+                return _json({"error": validation_result['message']}, 400)
+
+            # Transcrição do áudio para texto (chamada bloqueante em thread)
+            with medir_etapa('transcricao'):
+                texto_transcrito = await _em_thread(transcrever_audio, validation_result)
+            if transcricao_valida(texto_transcrito):
+                armazenar_transcricao_cache(digest, validation_result, texto_transcrito)
+        if texto_transcrito == "Não consegui entender o áudio.":
+            logging.error("Não consegui transcrever o áudio, possivelmente com baixa qualidade.")
+            return _json({"error": "Não consegui transcrever o áudio. Tente um áudio mais claro."}, 400)
+
+        # Filtragem do texto transcrito para identificar comando de pesquisa
+        with medir_etapa('filtro'):
+            texto_filtrado = filtrar_por_palavra_chave(texto_transcrito)
+        if not texto_filtrado:
+            logging.warning("Texto transcrito não contém um comando de pesquisa válido: %s", texto_transcrito)
+            return _json({"message": "Não foi possível interpretar a consulta a partir da transcrição."}, 400)
+
+        # Sem amostragem: cada consulta conta para o pré-aquecimento do cache
+        logging.info("Consulta filtrada: %s", texto_filtrado, extra={"amostragem": False})
+        query = texto_filtrado.strip()
+
+        # Com TTS especulativo, a síntese começa em paralelo com a pesquisa, apenas para o total
+        # mais comum (a página cheia); outros totais são sintetizados ao final, se ocorrerem
+        finalizar_audio = iniciar_sintese_especulativa(query, [MAX_RESULTADOS]) if TTS_ESPECULATIVO else None
+
+        # Resultados do cache ou da pesquisa na web assíncrona
+        try:
+            with medir_etapa('busca'):
+                resultados_pesquisa = await obter_ou_buscar_async(query, pesquisar_na_web_async)
+            if not resultados_pesquisa:
+                logging.warning("Sem resultados encontrados para a pesquisa: %s", query)
+                return _json({"message": "Nenhum resultado relevante encontrado."}, 404)
+        except CotaEsgotada:
+            raise
+        except Exception as e:
+            logging.error("Erro ao acessar o cache: %s", e)
+            return _json({"error": "Erro ao acessar o cache."}, 500)
+
+        # Geração do áudio de resposta (gTTS não tem API assíncrona)
+        with medir_etapa('tts'):
+            if finalizar_audio:
+                audio_resposta = await _em_thread(finalizar_audio, len(resultados_pesquisa))
+            else:
+                audio_resposta = await _em_thread(gerar_audio_resultado, query, len(resultados_pesquisa))
+        if not isinstance(audio_resposta, bytes):
+            logging.error("Erro ao gerar o áudio de resposta: %s", audio_resposta)
+            return _json({"error": "Erro ao gerar o áudio de resposta."}, 500)
+
+        with medir_etapa('codificacao'):
+            audio_content = base64.b64encode(audio_resposta).decode('utf-8')
+
+        return _json({
+            'transcricao': texto_transcrito,
+            'filtrado': texto_filtrado,
+            'resultados': resultados_pesquisa,
+            'audio': audio_content
+        }, 200)
+
+    except CotaEsgotada as e:
+        logging.warning("Requisição recusada por falta de cota do serviço externo: %s", e)
+        resposta = _json({"error": "Servidor ocupado. Tente novamente em instantes."}, 503)
+        resposta.headers["Retry-After"] = str(e.retry_after)
+        return resposta
+    except ValueError as e:
+        logging.error("Erro de validação: %s", e)
+        return _json({"error": str(e)}, 400)
+    except Exception as e:
+        logging.error("Erro inesperado ao processar o áudio: %s", e)
+        return _json({"error": "Ocorreu um erro ao processar o áudio. Tente novamente mais tarde."}, 500)
+
+
+async def metrics(request):
+    """
+    Métricas deste processo no formato texto do Prometheus.
+    """
+    return web.Response(text=registro.expor(), content_type='text/plain')
+
+
+async def _ao_iniciar(app):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix='pipeline-bloqueante')
+    )
+    await _em_thread(aquecer)
+    await _em_thread(importar_snapshot_inicial)
+    await _em_thread(indice_similaridade.iniciar_recarga)
+    # A renovação proativa e o pré-aquecimento rodam em threads próprias, com as funções síncronas
+    iniciar_renovacao_proativa(pesquisar_na_web)
+    iniciar_pre_aquecimento(pesquisar_na_web, gerar_audio_resultado)
+
+
+async def _ao_encerrar(app):
+    await cliente_serpapi_async.fechar()
+
+
+@web.middleware
+async def id_requisicao_middleware(request, handler):
+    """
+    Identificador da requisição nos logs (o X-Request-ID recebido, se válido),
+    devolvido no cabeçalho da resposta.
+    """
+    valor = definir_id_requisicao(request.headers.get('X-Request-ID'))
+    resposta = await handler(request)
+    resposta.headers['X-Request-ID'] = valor
+    return resposta
+
+
+def criar_app():
+    """
+    Cria a aplicação aiohttp com a rota assíncrona /processar_audio e /metrics.
+    """
+    app = web.Application(middlewares=[id_requisicao_middleware])
+    app.router.add_post('/processar_audio', processar_audio)
+    app.router.add_get('/metrics', metrics)
+    app.on_startup.append(_ao_iniciar)
+    app.on_cleanup.append(_ao_encerrar)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(criar_app(), port=ASYNC_PORT)
@@ -1,111 +1,502 @@
 import speech_recognition as sr
-from pydub import AudioSegment
-from gtts import gTTS
-import tempfile
 import logging
 import os
-from typing import Union, Dict
-from check_audio import check_audio
+import json
+import threading
+import contextvars
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Union, Dict
+from check_audio import check_audio, verificar_ffmpeg
+from analise_audio import segmentar_por_silencio, VAD_LIMIAR_DB
+from metricas import erros_upstream
+from cota import CotaCompartilhada, CotaEsgotada, prioridade, LOTE
+from cache.cache_manager import (
+    cache, estado_compartilhado, obter_audio_cache, armazenar_audio_cache, chave_audio, executar_uma_vez, TTS_CACHE_TIMEOUT,
+)
 
-# Configuração do logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Mensagens devolvidas por transcrever_audio quando não há transcrição
+ERROS_TRANSCRICAO = (
+    "Arquivo de áudio não encontrado.",
+    "Não consegui entender o áudio.",
+    "Erro ao processar o áudio, tente novamente mais tarde.",
+    "Erro ao processar o áudio.",
+)
 
-def transcrever_audio(arquivo_audio: str) -> Union[str, None]:
+
+def transcricao_valida(texto: Union[str, None]) -> bool:
+    """
+    Indica se o retorno de `transcrever_audio` é uma transcrição (e não uma
+    mensagem de erro).
     """
-    Função para transcrever o conteúdo de um arquivo de áudio para texto.
+    return bool(texto) and texto not in ERROS_TRANSCRICAO and not texto.startswith("Erro na validação do áudio:")
 
-    Parameters:
-    arquivo_audio (str): Caminho para o arquivo de áudio a ser transcrito.
 
-    Returns:
-    Union[str, None]: Texto transcrito ou mensagens de erro.
+# Modo de transcrição: 'completo' envia o áudio inteiro ao reconhecedor; 'segmentado'
+# divide áudios longos nos silêncios e transcreve os trechos em paralelo
+TRANSCRICAO_MODO = os.getenv('TRANSCRICAO_MODO', 'completo').lower()
+TRANSCRICAO_SEGMENTO_MIN_S = float(os.getenv('TRANSCRICAO_SEGMENTO_MIN_S', 10))
+TRANSCRICAO_SEGMENTO_MAX_S = float(os.getenv('TRANSCRICAO_SEGMENTO_MAX_S', 15))
+TRANSCRICAO_WORKERS = int(os.getenv('TRANSCRICAO_WORKERS', 4))
+
+# Detecção de fala: silêncios a partir de VAD_SILENCIO_MIN_MS separam trechos
+VAD_SILENCIO_MIN_MS = int(os.getenv('VAD_SILENCIO_MIN_MS', 500))
+VAD_LIMIAR_PADRAO_DB = -40.0
+_executor_transcricao = None
+_executor_transcricao_lock = threading.Lock()
+
+
+# Reconhecedor de fala: 'google' (serviço web) ou 'vosk' (modelo local, offline).
+# Com RECONHECEDOR_FALLBACK, o segundo reconhecedor é usado quando o principal falha
+RECONHECEDOR = os.getenv('RECONHECEDOR', 'google').lower()
+RECONHECEDOR_FALLBACK = os.getenv('RECONHECEDOR_FALLBACK', '').lower()
+RECONHECEDOR_TIMEOUT = float(os.getenv('RECONHECEDOR_TIMEOUT', 10))
+VOSK_MODELO_DIR = os.getenv('VOSK_MODELO_DIR', 'modelos/vosk-model-small-pt-0.3')
+_modelo_vosk = None
+_modelo_vosk_lock = threading.Lock()
+
+
+def reconhecer_google(audio_data: sr.AudioData) -> str:
     """
-    if not os.path.exists(arquivo_audio):
-        logging.error(f"Arquivo de áudio não encontrado: {arquivo_audio}")
-        return "Arquivo de áudio não encontrado."
+    Reconhecedor Google Web Speech em português, limitado a RECONHECEDOR_TIMEOUT.
 
+    Raises:
+    sr.UnknownValueError: se não houver fala reconhecível.
+    sr.RequestError: em falhas de comunicação com o serviço.
+    """
     r = sr.Recognizer()
-    temp_wav = None 
+    r.operation_timeout = RECONHECEDOR_TIMEOUT
+    return r.recognize_google(audio_data, language="pt-BR")
+
+
+def carregar_modelo_vosk():
+    """
+    Carrega o modelo Vosk uma única vez por processo; as chamadas seguintes
+    reutilizam o modelo residente em memória.
+
+    Raises:
+    sr.RequestError: se o pacote vosk ou o modelo não estiverem disponíveis.
+    """
+    global _modelo_vosk
+    if _modelo_vosk is None:
+        with _modelo_vosk_lock:
+            if _modelo_vosk is None:
+                try:
+                    import vosk
+                except ImportError:
+                    raise sr.RequestError("Pacote vosk não instalado.")
+                if not os.path.isdir(VOSK_MODELO_DIR):
+                    raise sr.RequestError(f"Modelo Vosk não encontrado em {VOSK_MODELO_DIR}.")
+                vosk.SetLogLevel(-1)
+                logging.info("Carregando modelo Vosk de %s.", VOSK_MODELO_DIR)
+                _modelo_vosk = vosk.Model(VOSK_MODELO_DIR)
+    return _modelo_vosk
+
+
+def reconhecer_vosk(audio_data: sr.AudioData) -> str:
+    """
+    Reconhecedor offline (Vosk) sobre o modelo residente. O modelo é
+    compartilhado entre threads; cada chamada usa seu próprio KaldiRecognizer.
+
+    Raises:
+    sr.UnknownValueError: se não houver fala reconhecível.
+    sr.RequestError: se o modelo não puder ser carregado.
+    """
+    modelo = carregar_modelo_vosk()
+    from vosk import KaldiRecognizer
+
+    reconhecedor = KaldiRecognizer(modelo, audio_data.sample_rate)
+    reconhecedor.AcceptWaveform(audio_data.get_raw_data(convert_width=2))
+    texto = json.loads(reconhecedor.FinalResult()).get('text', '')
+    if not texto:
+        raise sr.UnknownValueError()
+    return texto
+
+
+RECONHECEDORES = {
+    'google': reconhecer_google,
+    'vosk': reconhecer_vosk,
+}
+
+
+def com_fallback(principal: Callable[[sr.AudioData], str], reserva: Callable[[sr.AudioData], str]) -> Callable[[sr.AudioData], str]:
+    """
+    Combina dois reconhecedores: o de reserva é usado quando o principal
+    falha por erro de serviço ou tempo limite (não quando o áudio não tem fala).
+    """
+    def reconhecer(audio_data: sr.AudioData) -> str:
+        try:
+            return principal(audio_data)
+        except (sr.RequestError, OSError) as e:
+            logging.warning("Reconhecedor principal falhou (%s); usando o reconhecedor de reserva.", e)
+            return reserva(audio_data)
+    return reconhecer
+
+
+def criar_reconhecedor(nome: str = RECONHECEDOR, fallback: str = RECONHECEDOR_FALLBACK) -> Callable[[sr.AudioData], str]:
+    """
+    Monta o reconhecedor configurado a partir dos nomes em RECONHECEDORES.
+    """
+    if nome not in RECONHECEDORES or (fallback and fallback not in RECONHECEDORES):
+        raise ValueError(f"Reconhecedor inválido: {nome} / {fallback}. Opções: {', '.join(RECONHECEDORES)}.")
+    if fallback and fallback != nome:
+        return com_fallback(RECONHECEDORES[nome], RECONHECEDORES[fallback])
+    return RECONHECEDORES[nome]
 
+
+# Reconhecedor em uso: qualquer função (sr.AudioData) -> str com os mesmos erros de reconhecer_google
+_reconhecedor = criar_reconhecedor()
+
+
+def definir_reconhecedor(reconhecedor: Callable[[sr.AudioData], str]) -> None:
+    """
+    Substitui o reconhecedor de fala usado por `transcrever_audio` (por
+    exemplo, por um reconhecedor local em testes).
+    """
+    global _reconhecedor
+    _reconhecedor = reconhecedor
+
+
+def preparar_reconhecedor() -> None:
+    """
+    Carrega antecipadamente o modelo local, quando configurado, para que a
+    primeira requisição do worker não pague o tempo de carga.
+    """
+    if 'vosk' in (RECONHECEDOR, RECONHECEDOR_FALLBACK):
+        try:
+            carregar_modelo_vosk()
+        except sr.RequestError as e:
+            logging.error("Não foi possível carregar o modelo Vosk: %s", e)
+
+
+def _limiar_vad(audio: Dict) -> float:
+    """
+    Limiar de fala (dBFS) a partir do volume médio medido por check_audio.
+    """
+    volume_medio = audio.get('volume', {}).get('mean_volume')
+    if volume_medio is None:
+        return VAD_LIMIAR_PADRAO_DB
+    return volume_medio - VAD_LIMIAR_DB
+
+
+def _reconhecer_trecho(audio_data: sr.AudioData) -> str:
+    """
+    Reconhece um trecho; trechos sem fala reconhecível resultam em texto vazio.
+    """
     try:
-        logging.info(f"Iniciando o processamento do áudio: {arquivo_audio}")
+        return _reconhecedor(audio_data)
+    except sr.UnknownValueError:
+        return ""
 
-        # Validar o áudio
-        validation_result = check_audio(arquivo_audio)
-        if validation_result['status'] != 'success':
-            logging.error(f"Erro na validação do áudio: {validation_result['message']}")
-            return f"Erro na validação do áudio: {validation_result['message']}"
 
-        # Converter áudio para WAV
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_wav:
-            try:
-                audio = AudioSegment.from_file(arquivo_audio)
-                audio.export(temp_wav.name, format="wav")
-                logging.info(f"Áudio convertido para WAV com sucesso: {temp_wav.name}")
-            except Exception as e:
-                logging.error(f"Erro ao converter o áudio para WAV: {e}")
-                return "Erro ao converter o áudio para o formato adequado."
-
-        # Reconhecimento de áudio
-        with sr.AudioFile(temp_wav.name) as source:
-            try:
-                logging.info(f"Preparando para reconhecer áudio em: {temp_wav.name}")
-                audio_data = r.record(source)
-                texto = r.recognize_google(audio_data, language="pt-BR")
-                logging.info(f"Texto transcrito com sucesso: {texto}")
-                return texto
-            except sr.UnknownValueError:
-                logging.error("Erro: O áudio não pôde ser transcrito.")
-                return "Não consegui entender o áudio."
-            except sr.RequestError as e:
-                logging.error(f"Erro ao se conectar ao serviço de reconhecimento: {e}")
-                return "Erro ao processar o áudio, tente novamente mais tarde."
-            except Exception as e:
-                logging.error(f"Erro inesperado ao transcrever o áudio: {e}")
-                return "Erro ao processar o áudio."
+def _transcrever_segmentado(audio: Dict) -> str:
+    """
+    Divide o PCM nos silêncios e transcreve os trechos em paralelo,
+    juntando os textos na ordem original.
+
+    Raises:
+    sr.UnknownValueError: se nenhum trecho tiver fala reconhecível.
+    sr.RequestError: se o serviço falhar em algum trecho.
+    """
+    global _executor_transcricao
+    with _executor_transcricao_lock:
+        if _executor_transcricao is None:
+            _executor_transcricao = ThreadPoolExecutor(max_workers=TRANSCRICAO_WORKERS, thread_name_prefix='transcricao')
+
+    pcm, sample_rate, sample_width = audio['pcm'], audio['sample_rate'], audio['sample_width']
+    intervalos = segmentar_por_silencio(
+        pcm, sample_rate, _limiar_vad(audio),
+        silencio_min_ms=VAD_SILENCIO_MIN_MS, segmento_max_s=TRANSCRICAO_SEGMENTO_MAX_S,
+    )
+    if not intervalos:
+        raise sr.UnknownValueError()
+    logging.info("Áudio dividido em %s trechos de fala.", len(intervalos))
+
+    # Cada trecho roda em uma cópia do contexto (identificador da requisição nos logs e faixa da cota)
+    futuros = [
+        _executor_transcricao.submit(
+            contextvars.copy_context().run,
+            _reconhecer_trecho, sr.AudioData(pcm[inicio * sample_width:fim * sample_width], sample_rate, sample_width)
+        )
+        for inicio, fim in intervalos
+    ]
+    texto = " ".join(t for t in (futuro.result() for futuro in futuros) if t)
+    if not texto:
+        raise sr.UnknownValueError()
+    return texto
+
+
+def transcrever_audio(audio: Union[str, Dict]) -> Union[str, None]:
+    """
+    Função para transcrever o conteúdo de um áudio para texto. Conforme
+    TRANSCRICAO_MODO, áudios longos são transcritos em trechos paralelos.
 
+    Parameters:
+    audio (Union[str, Dict]): Resultado de `check_audio` (com o PCM já
+    decodificado) ou caminho para o arquivo de áudio a ser transcrito.
+
+    Returns:
+    Union[str, None]: Texto transcrito ou mensagens de erro.
+    """
+    if isinstance(audio, str):
+        if not os.path.exists(audio):
+            logging.error("Arquivo de áudio não encontrado: %s", audio)
+            return "Arquivo de áudio não encontrado."
+
+        # Validar e decodificar o áudio quando apenas o caminho é fornecido
+        logging.info("Iniciando o processamento do áudio: %s", audio)
+        audio = check_audio(audio)
+
+    if audio.get('status') != 'success':
+        logging.error("Erro na validação do áudio: %s", audio.get('message'))
+        return f"Erro na validação do áudio: {audio.get('message')}"
+
+    try:
+        logging.info("Preparando para reconhecer áudio de %.2fs.", audio['duration'])
+        if TRANSCRICAO_MODO == 'segmentado' and audio['duration'] >= TRANSCRICAO_SEGMENTO_MIN_S:
+            texto = _transcrever_segmentado(audio)
+        else:
+            # O PCM decodificado por check_audio é entregue diretamente ao reconhecedor
+            texto = _reconhecedor(sr.AudioData(audio['pcm'], audio['sample_rate'], audio['sample_width']))
+        logging.info("Texto transcrito com sucesso: %s", texto)
+        return texto
+    except sr.UnknownValueError:
+        logging.error("Erro: O áudio não pôde ser transcrito.")
+        return "Não consegui entender o áudio."
+    except sr.RequestError as e:
+        logging.error("Erro ao se conectar ao serviço de reconhecimento: %s", e)
+        erros_upstream.inc(servico='reconhecimento')
+        return "Erro ao processar o áudio, tente novamente mais tarde."
     except Exception as e:
-        logging.error(f"Erro geral no processamento do áudio: {e}")
+        logging.error("Erro inesperado ao transcrever o áudio: %s", e)
         return "Erro ao processar o áudio."
 
-    finally:
-        # Limpeza do arquivo temporário de forma segura
-        if temp_wav and os.path.exists(temp_wav.name):
-            try:
-                os.remove(temp_wav.name)
-                logging.info(f"Arquivo temporário {temp_wav.name} excluído com sucesso.")
-            except Exception as e:
-                logging.warning(f"Erro ao tentar excluir o arquivo temporário WAV: {e}")
 
+# Frase de resposta: segmentos fixos em volta da consulta e da contagem
+TEMPLATE_RESPOSTA_INICIO = "Sua pesquisa sobre"
+TEMPLATE_RESPOSTA_FIM = "resultou em {total} resultados encontrados."
+
+# 'completo' sintetiza a frase inteira; 'segmentado' sintetiza apenas a consulta
+# e reaproveita os segmentos fixos pré-renderizados
+TTS_MODO = os.getenv('TTS_MODO', 'completo').lower()
+TTS_MAX_TOTAL_PRE_RENDERIZADO = int(os.getenv('TTS_MAX_TOTAL_PRE_RENDERIZADO', 10))
+
+# Síntese especulativa: o TTS começa junto com a pesquisa, assim que a consulta é conhecida
+TTS_ESPECULATIVO = os.getenv('TTS_ESPECULATIVO', 'false').lower() in ('1', 'true', 'sim')
+TTS_ESPECULATIVO_WORKERS = int(os.getenv('TTS_ESPECULATIVO_WORKERS', 8))
+_executor_tts = None
+_executor_tts_lock = threading.Lock()
 
-def gerar_audio_resposta(texto: str) -> Union[str, str]:
+# Cota de sínteses no gTTS compartilhada por todos os processos (0 = sem limite)
+TTS_COTA_POR_MINUTO = float(os.getenv('TTS_COTA_POR_MINUTO', 300))
+TTS_COTA_RAJADA = int(os.getenv('TTS_COTA_RAJADA', 30))
+cota_tts = CotaCompartilhada('gtts', estado_compartilhado, TTS_COTA_POR_MINUTO, TTS_COTA_RAJADA)
+
+# Classe de síntese (gTTS), importada na primeira síntese ou no aquecimento do
+# processo; pode ser substituída por outra com a mesma interface
+gTTS = None
+
+
+def carregar_sintetizador():
+    """
+    Importa o gTTS uma única vez por processo.
     """
-    Função para gerar um arquivo de áudio a partir de um texto.
+    global gTTS
+    if gTTS is None:
+        from gtts import gTTS as classe
+        gTTS = classe
+    return gTTS
+
+
+def gerar_audio_resposta(texto: str, lang: str = 'pt', slow: bool = False,
+                         expira_em_segundos: int = TTS_CACHE_TIMEOUT) -> Union[bytes, str]:
+    """
+    Função para gerar o áudio (MP3) de resposta a partir de um texto.
+    Áudios já sintetizados para o mesmo (texto, lang, slow) são servidos do
+    cache, sem nova chamada ao gTTS.
 
     Parameters:
     texto (str): Texto a ser convertido em áudio.
+    lang (str): Idioma da síntese.
+    slow (bool): Se a fala deve ser gerada em modo lento.
+    expira_em_segundos (int, opcional): Expiração no cache (0 = sem expiração).
 
     Returns:
-    Union[str, str]: Caminho para o arquivo de áudio gerado ou mensagem de erro.
+    Union[bytes, str]: Conteúdo MP3 gerado em memória ou mensagem de erro.
+
+    Raises:
+    CotaEsgotada: se não houver cota do gTTS para a faixa de prioridade atual.
     """
     if not texto:
         logging.error("Texto vazio fornecido para gerar o áudio.")
         return "Texto vazio fornecido."
 
-    try:
-        logging.info(f"Gerando áudio de resposta para o texto: {texto}")
+    audio_cache = obter_audio_cache(texto, lang, slow)
+    if audio_cache is not None:
+        logging.info("Áudio de resposta obtido do cache para o texto: %s", texto)
+        return audio_cache
+
+    def sintetizar() -> bytes:
+        cota_tts.adquirir()
+        logging.info("Gerando áudio de resposta para o texto: %s", texto)
 
-        # Gerar o áudio de resposta
-        tts = gTTS(texto, lang='pt', slow=False)
-        temp_audio_file = tempfile.mktemp(suffix=".mp3")
-        tts.save(temp_audio_file)
+        # Gerar o áudio de resposta diretamente em memória
+        tts = carregar_sintetizador()(texto, lang=lang, slow=slow)
+        buffer = BytesIO()
+        tts.write_to_fp(buffer)
 
-        logging.info(f"Áudio gerado com sucesso: {temp_audio_file}")
-        return temp_audio_file
+        logging.info("Áudio gerado com sucesso: %s bytes.", buffer.tell())
+        audio = buffer.getvalue()
+        armazenar_audio_cache(texto, audio, lang, slow, expira_em_segundos=expira_em_segundos)
+        return audio
+
+    try:
+        # Entre processos, apenas um worker sintetiza o texto; os demais leem o áudio que ele gravar
+        chave = chave_audio(texto, lang, slow)
+        return executar_uma_vez(chave, sintetizar, lambda: cache.get(chave), 'tts')
 
+    except CotaEsgotada:
+        raise
     except Exception as e:
-        logging.error(f"Erro ao gerar áudio de resposta: {e}")
+        logging.error("Erro ao gerar áudio de resposta: %s", e)
+        erros_upstream.inc(servico='gtts')
+        return "Erro ao gerar áudio."
+
+
+def texto_resposta(query: str, total: int) -> str:
+    """
+    Monta a frase falada na resposta a partir da consulta e do total de resultados.
+    """
+    return f"{TEMPLATE_RESPOSTA_INICIO} {query} {TEMPLATE_RESPOSTA_FIM.format(total=total)}"
+
+
+def _remover_tags_id3(audio: bytes) -> bytes:
+    """
+    Remove cabeçalho ID3v2 e rodapé ID3v1, deixando apenas os quadros MPEG.
+    """
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        tamanho = ((audio[6] & 0x7F) << 21) | ((audio[7] & 0x7F) << 14) | ((audio[8] & 0x7F) << 7) | (audio[9] & 0x7F)
+        rodape = 10 if audio[5] & 0x10 else 0
+        audio = audio[10 + tamanho + rodape:]
+    if len(audio) >= 128 and audio[-128:-125] == b"TAG":
+        audio = audio[:-128]
+    return audio
+
+
+def _concatenar_mp3(partes) -> bytes:
+    """
+    Concatena áudios MP3 gerados pelo gTTS. Como todos os segmentos têm a
+    mesma taxa de amostragem e bitrate, os quadros MPEG podem ser unidos
+    diretamente, sem decodificar e recodificar o áudio.
+    """
+    return b"".join(_remover_tags_id3(parte) for parte in partes)
+
+
+def gerar_audio_resposta_segmentado(query: str, total: int, lang: str = 'pt', slow: bool = False) -> Union[bytes, str]:
+    """
+    Gera o áudio da frase de resposta sintetizando apenas a consulta. O início
+    e o final da frase (com a contagem de resultados) são segmentos fixos,
+    sintetizados uma única vez e mantidos no cache sem expiração.
+
+    Returns:
+    Union[bytes, str]: Conteúdo MP3 gerado em memória ou mensagem de erro.
+    """
+    partes = [
+        gerar_audio_resposta(TEMPLATE_RESPOSTA_INICIO, lang, slow, expira_em_segundos=0),
+        gerar_audio_resposta(query, lang, slow),
+        gerar_audio_resposta(TEMPLATE_RESPOSTA_FIM.format(total=total), lang, slow, expira_em_segundos=0),
+    ]
+    if not all(isinstance(parte, bytes) for parte in partes):
+        logging.error("Erro ao gerar os segmentos do áudio de resposta para a consulta: %s", query)
         return "Erro ao gerar áudio."
+    return _concatenar_mp3(partes)
+
+
+def gerar_audio_resultado(query: str, total: int) -> Union[bytes, str]:
+    """
+    Gera o áudio de resposta para uma consulta conforme o modo configurado
+    em TTS_MODO ('completo' ou 'segmentado').
+    """
+    if TTS_MODO == 'segmentado':
+        return gerar_audio_resposta_segmentado(query, total)
+    return gerar_audio_resposta(texto_resposta(query, total))
+
+
+def iniciar_sintese_especulativa(query: str, contagens: Iterable[int]) -> Callable[[int], Union[bytes, str]]:
+    """
+    Inicia a síntese do áudio de resposta antes de a pesquisa terminar. No
+    modo 'segmentado' apenas a consulta é sintetizada (os demais segmentos já
+    estão no cache); no modo 'completo' a frase é sintetizada para cada total
+    de resultados em `contagens` (os apps passam apenas MAX_RESULTADOS) e os
+    demais totais são sintetizados sob demanda por `finalizar`.
+
+    Returns:
+    Callable[[int], Union[bytes, str]]: Função que, dado o total real de
+    resultados, aguarda e retorna o áudio correspondente.
+    """
+    global _executor_tts
+    with _executor_tts_lock:
+        if _executor_tts is None:
+            _executor_tts = ThreadPoolExecutor(max_workers=TTS_ESPECULATIVO_WORKERS, thread_name_prefix='tts-especulativo')
+
+    if TTS_MODO == 'segmentado':
+        futuro_query = _executor_tts.submit(contextvars.copy_context().run, gerar_audio_resposta, query)
+
+        def finalizar(total: int) -> Union[bytes, str]:
+            futuro_query.result()
+            return gerar_audio_resposta_segmentado(query, total)
+        return finalizar
+
+    # Cópias do contexto de quem chamou: a síntese usa a mesma faixa da cota (ex.: LOTE) e o mesmo identificador nos logs
+    futuros = {
+        total: _executor_tts.submit(contextvars.copy_context().run, gerar_audio_resposta, texto_resposta(query, total))
+        for total in contagens
+    }
+    logging.debug("Síntese especulativa iniciada para a consulta '%s' com totais %s.", query, list(futuros))
+
+    def finalizar(total: int) -> Union[bytes, str]:
+        futuro = futuros.get(total)
+        if futuro is None:
+            return gerar_audio_resultado(query, total)
+        return futuro.result()
+    return finalizar
+
+
+def pre_renderizar_segmentos(max_total: int = TTS_MAX_TOTAL_PRE_RENDERIZADO, lang: str = 'pt', slow: bool = False) -> int:
+    """
+    Sintetiza antecipadamente os segmentos fixos da frase de resposta (início
+    e finais de 0 a max_total resultados), que ficam no cache persistente.
+
+    Returns:
+    int: Quantidade de segmentos disponíveis no cache.
+    """
+    textos = [TEMPLATE_RESPOSTA_INICIO] + [TEMPLATE_RESPOSTA_FIM.format(total=n) for n in range(max_total + 1)]
+    prontos = 0
+    # Fora do caminho de uma requisição: disputa a cota como lote, sem a reserva interativa
+    with prioridade(LOTE):
+        for texto in textos:
+            try:
+                prontos += isinstance(gerar_audio_resposta(texto, lang, slow, expira_em_segundos=0), bytes)
+            except CotaEsgotada as e:
+                # Os segmentos que faltarem são sintetizados na primeira resposta que os usar
+                logging.warning("Pré-renderização interrompida: %s", e)
+                break
+    logging.info("Segmentos de resposta pré-renderizados: %s/%s", prontos, len(textos))
+    return prontos
+
+
+def aquecer() -> None:
+    """
+    Prepara o processo antes de ele receber requisições: verifica o ffmpeg,
+    importa o gTTS, carrega o reconhecedor local (quando configurado) e, no
+    modo segmentado, pré-renderiza os segmentos fixos da resposta. Executado
+    no processo mestre, antes do fork, o resultado é compartilhado pelos workers.
+    """
+    verificar_ffmpeg()
+    carregar_sintetizador()
+    preparar_reconhecedor()
+    if TTS_MODO == 'segmentado':
+        pre_renderizar_segmentos()
 
 
 def check_audio_validity(arquivo_audio: str) -> Dict[str, str]:
@@ -122,8 +513,9 @@ def check_audio_validity(arquivo_audio: str) -> Dict[str, str]:
         return {"status": "error", "message": "Formato de áudio inválido. Suporte para MP3, WAV, FLAC e M4A."}
 
     try:
+        from pydub import AudioSegment
         AudioSegment.from_file(arquivo_audio)
         return {"status": "success", "message": "Áudio válido."}
     except Exception as e:
-        logging.error(f"Erro ao verificar a validade do áudio: {e}")
+        logging.error("Erro ao verificar a validade do áudio: %s", e)
         return {"status": "error", "message": "Erro ao verificar a validade do áudio."}
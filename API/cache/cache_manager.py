@@ -1,102 +1,837 @@
+import asyncio
 import json
 import os
 import logging
-from dotenv import load_dotenv
+import hashlib
+import re
+import secrets
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import diskcache
-from time import time
-from logging.handlers import RotatingFileHandler
-
-# Carregar variáveis de ambiente
-load_dotenv()
+from time import monotonic, sleep, time
+from metricas import consultas_cache, chamadas_coalescidas
+from cota import prioridade, CotaEsgotada, SEGUNDO_PLANO
+from cache.similaridade import IndiceSimilaridade
 
 # Configuração do diretório de cache e timeout
 CACHE_DIR = os.getenv('CACHE_DIR', 'API/cache')
+
+# Estado de coordenação entre processos (fichas das cotas e marcadores de chamadas em
+# andamento), fora do cache de dados: não sofre remoção por tamanho nem é apagado por limpar_cache
+CACHE_ESTADO_DIR = os.getenv('CACHE_ESTADO_DIR', os.path.join(CACHE_DIR, 'estado'))
 CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', 3600))
 
-# Configuração do diretório de logs e arquivo de log
-LOG_DIR = os.getenv('LOG_DIR', 'API/logs')
-LOG_FILE = os.path.join(LOG_DIR, 'api.log')
+# Após CACHE_TIMEOUT o resultado fica "velho": continua sendo servido por mais
+# CACHE_STALE_TIMEOUT segundos enquanto é renovado em segundo plano
+CACHE_STALE_TIMEOUT = int(os.getenv('CACHE_STALE_TIMEOUT', 3600))
 
-# Garantir que os diretórios de cache e log existam
-for directory in [CACHE_DIR, LOG_DIR]:
-    try:
-        os.makedirs(directory, exist_ok=True)
-        logging.info(f"Diretório {directory} verificado/criado com sucesso.")
-    except Exception as e:
-        logging.error(f"Erro ao criar o diretório {directory}: {e}")
-        raise
+# Renovação em segundo plano: threads de renovação e renovação proativa das
+# CACHE_RENOVACAO_TOP_K consultas mais acessadas a cada CACHE_RENOVACAO_INTERVALO
+CACHE_RENOVACAO_WORKERS = int(os.getenv('CACHE_RENOVACAO_WORKERS', 2))
+CACHE_RENOVACAO_TOP_K = int(os.getenv('CACHE_RENOVACAO_TOP_K', 20))
+CACHE_RENOVACAO_INTERVALO = int(os.getenv('CACHE_RENOVACAO_INTERVALO', 300))
+
+# Limite de tamanho do cache em disco: acima dele, cada escrita remove até
+# CACHE_REMOCAO_POR_ESCRITA entradas (as expiradas primeiro, depois conforme a política).
+# 'least-recently-used' e 'least-frequently-used' transformam cada leitura em uma escrita
+# no SQLite (tempo ou contagem de acesso), disputando o lock de escrita entre os workers
+CACHE_SIZE_LIMIT_MB = int(os.getenv('CACHE_SIZE_LIMIT_MB', 512))
+CACHE_POLITICA_REMOCAO = os.getenv('CACHE_POLITICA_REMOCAO', 'least-recently-stored')
+CACHE_REMOCAO_POR_ESCRITA = int(os.getenv('CACHE_REMOCAO_POR_ESCRITA', 10))
+POLITICAS_REMOCAO = ('least-recently-used', 'least-recently-stored', 'least-frequently-used')
+
+# Quantidade máxima de consultas mantidas no cache em memória de cada processo
+CACHE_MEMORIA_MAX_ITENS = int(os.getenv('CACHE_MEMORIA_MAX_ITENS', 1024))
+
+# Consultas com similaridade (0 a 1, por trigramas de caracteres) a partir deste limiar
+# e com as mesmas palavras, a menos de erros de digitação, reaproveitam o resultado em cache
+# de outra consulta (0 desativa); o índice relê as consultas persistidas em segundo plano a
+# cada CACHE_SIMILARIDADE_RECARGA segundos
+CACHE_SIMILARIDADE_LIMIAR = float(os.getenv('CACHE_SIMILARIDADE_LIMIAR', 0.88))
+CACHE_SIMILARIDADE_RECARGA = int(os.getenv('CACHE_SIMILARIDADE_RECARGA', 60))
+
+# Espera máxima (segundos) pela chamada à origem que outro processo já está
+# fazendo para a mesma chave, antes de fazer a própria chamada
+CACHE_COALESCER_ESPERA_MAX = float(os.getenv('CACHE_COALESCER_ESPERA_MAX', 30))
+
+# Palavras que sobram após a remoção do comando e não mudam a consulta. São comparadas
+# com as palavras ainda acentuadas: "pará" e "é" não são confundidas com "para" e "e"
+STOP_WORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas', 'de', 'do', 'da', 'dos', 'das',
+    'sobre', 'para', 'por', 'pra', 'com', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'me', 'mim', 'informações', 'informação', 'informacoes', 'informacao', 'favor',
+}
+
+# Expiração dos áudios de resposta (TTS) em cache; 0 = sem expiração
+TTS_CACHE_TIMEOUT = int(os.getenv('TTS_CACHE_TIMEOUT', 7 * 24 * 3600))
+
+# Expiração das transcrições em cache, indexadas pelo hash do áudio enviado
+TRANSCRICAO_CACHE_TIMEOUT = int(os.getenv('TRANSCRICAO_CACHE_TIMEOUT', 30 * 24 * 3600))
+
+# Áudios de resposta entregues por URL (resposta em streaming), disponíveis por pouco tempo
+AUDIO_RESPOSTA_TIMEOUT = int(os.getenv('AUDIO_RESPOSTA_TIMEOUT', 300))
+
+# Garantir que o diretório de cache exista
+try:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+except Exception as e:
+    logging.error("Erro ao criar o diretório %s: %s", CACHE_DIR, e)
+    raise
 
-# Configuração do logging
-log_level = os.getenv('LOG_LEVEL', 'DEBUG').upper()
 logger = logging.getLogger(__name__)
-logger.setLevel(getattr(logging, log_level))
 
-# Rotacionando arquivos de log
-handler = RotatingFileHandler(LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5)
-handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
-logger.addHandler(logging.StreamHandler())
+# Sem política de remoção ('none') o cache cresceria sem limite
+if CACHE_POLITICA_REMOCAO not in POLITICAS_REMOCAO:
+    logger.warning("CACHE_POLITICA_REMOCAO inválida (%s); usando least-recently-stored.", CACHE_POLITICA_REMOCAO)
+    CACHE_POLITICA_REMOCAO = 'least-recently-stored'
 
 # Inicializando o cache com diskcache
 try:
-    cache = diskcache.Cache(CACHE_DIR)
-    logger.info(f"Cache inicializado com sucesso em {CACHE_DIR}.")
+    cache = diskcache.Cache(
+        CACHE_DIR,
+        size_limit=CACHE_SIZE_LIMIT_MB * 1024 * 1024,
+        eviction_policy=CACHE_POLITICA_REMOCAO,
+        cull_limit=max(1, CACHE_REMOCAO_POR_ESCRITA),
+    )
+    logger.info("Cache inicializado com sucesso em %s.", CACHE_DIR)
 except Exception as e:
-    logger.error(f"Erro ao inicializar o cache em {CACHE_DIR}: {e}")
+    logger.error("Erro ao inicializar o cache em %s: %s", CACHE_DIR, e)
     raise
 
+# Poucas chaves pequenas e com expiração própria: sem limite de tamanho nem política de remoção
+try:
+    estado_compartilhado = diskcache.Cache(CACHE_ESTADO_DIR, eviction_policy='none')
+except Exception as e:
+    logger.error("Erro ao inicializar o estado compartilhado em %s: %s", CACHE_ESTADO_DIR, e)
+    raise
+
+class CacheMemoria:
+    """
+    Cache LRU em memória, com expiração por entrada, usado como primeira
+    camada na frente do diskcache. Seguro para uso entre threads.
+    """
+    def __init__(self, max_itens=CACHE_MEMORIA_MAX_ITENS):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= time():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, expira_em_segundos=None):
+        if self.max_itens <= 0:
+            return
+        expira_em = time() + expira_em_segundos if expira_em_segundos else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+cache_memoria = CacheMemoria()
+
+def normalizar_consulta(query):
+    """
+    Normaliza a consulta para uso como chave de cache: minúsculas, sem
+    pontuação, espaços colapsados, sem stop-words e, por fim, sem acentos (as
+    stop-words são removidas antes, para que "clima no Pará" não vire "clima").
+
+    Parameters:
+    query (str): Consulta original.
+
+    Returns:
+    str: Consulta normalizada.
+    """
+    tokens = re.findall(r"\w+", unicodedata.normalize('NFC', query.lower()))
+    significativos = [token for token in tokens if token not in STOP_WORDS]
+    texto = unicodedata.normalize('NFKD', ' '.join(significativos or tokens))
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+PREFIXO_BUSCA = "busca:"
+
+def chave_busca(query):
+    """
+    Gera a chave de cache dos resultados de pesquisa para uma consulta.
+    """
+    return PREFIXO_BUSCA + normalizar_consulta(query)
+
+def _consultas_em_cache():
+    """
+    Consultas normalizadas com resultados persistidos no diskcache.
+    """
+    return [
+        chave[len(PREFIXO_BUSCA):] for chave in cache.iterkeys()
+        if isinstance(chave, str) and chave.startswith(PREFIXO_BUSCA)
+    ]
+
+indice_similaridade = IndiceSimilaridade(CACHE_SIMILARIDADE_LIMIAR, _consultas_em_cache, CACHE_SIMILARIDADE_RECARGA)
+
+def _ler_entrada(chave, query):
+    entrada = cache_memoria.get(chave)
+    if entrada is not None:
+        logger.debug("Cache em memória encontrado para a consulta: %s", query)
+        return entrada
+
+    logger.debug("Buscando cache para a consulta: %s", query)
+    entrada, expira_em = cache.get(chave, expire_time=True)
+    if not entrada:
+        return None
+    if not isinstance(entrada, dict):
+        entrada = {"query": query, "resultados": entrada, "renovar_em": expira_em or time() + CACHE_TIMEOUT}
+    restante = expira_em - time() if expira_em else None
+    cache_memoria.set(chave, entrada, restante)
+    return entrada
+
+def _obter_entrada_similar(query):
+    """
+    Procura no índice de similaridade uma consulta em cache parecida com a
+    consulta (ex.: outra transcrição da mesma pergunta) e retorna a entrada
+    dela, com o motivo da correspondência em 'correspondencia'.
+    """
+    consulta = normalizar_consulta(query)
+    encontrada = indice_similaridade.buscar(consulta)
+    if encontrada is None:
+        return None
+    similar, similaridade = encontrada
+    entrada = _ler_entrada(PREFIXO_BUSCA + similar, query)
+    if entrada is None:
+        # A entrada expirou ou foi removida depois da última recarga do índice
+        indice_similaridade.remover(similar)
+        return None
+    logger.info("Consulta '%s' respondida pelo cache de '%s' (similaridade %.2f, limiar %.2f).",
+                query, similar, similaridade, indice_similaridade.limiar)
+    correspondencia = {
+        "consulta": similar,
+        "similaridade": round(similaridade, 3),
+        "limiar": indice_similaridade.limiar,
+        "motivo": "trigramas de caracteres (Dice) sobre a consulta normalizada",
+    }
+    return {**entrada, "correspondencia": correspondencia}
+
+def _obter_entrada(query):
+    """
+    Recupera a entrada de cache da consulta, no formato
+    {'query', 'resultados', 'renovar_em'}, consultando a memória antes do
+    diskcache. Entradas antigas (apenas a lista de resultados) são tratadas
+    como frescas. Sem entrada para a própria consulta, usa a de uma consulta
+    parecida (índice de similaridade), com o campo adicional 'correspondencia'.
+    """
+    entrada = _ler_entrada(chave_busca(query), query)
+    if entrada is None:
+        entrada = _obter_entrada_similar(query)
+    return entrada
+
 # Função para obter cache
 def obter_cache(query):
     """
-    Recupera o cache armazenado para uma consulta, se existir.
+    Recupera o cache armazenado para uma consulta, se existir. A camada em
+    memória é consultada antes do diskcache. Resultados velhos (entre
+    CACHE_TIMEOUT e CACHE_TIMEOUT + CACHE_STALE_TIMEOUT) também são retornados.
 
     Parameters:
     query (str): A consulta cujo resultado será buscado no cache.
 
     Returns:
-    dict or None: Dados do cache ou None se não encontrado.
+    list or None: Dados do cache ou None se não encontrado.
     """
     try:
-        logger.debug(f"Buscando cache para a consulta: {query}")
-        cached_result = cache.get(query)
-        if cached_result:
-            logger.info(f"Cache encontrado para a consulta: {query}")
-            return json.loads(cached_result)
+        entrada = _obter_entrada(query)
+        if entrada:
+            logger.info("Cache encontrado para a consulta: %s", query)
+            return entrada["resultados"]
         else:
-            logger.info(f"Nenhum cache encontrado para a consulta: {query}")
+            logger.info("Nenhum cache encontrado para a consulta: %s", query)
             return None
     except diskcache.CacheError as e:
-        logger.error(f"Erro ao acessar o cache para a consulta {query}: {e}")
+        logger.error("Erro ao acessar o cache para a consulta %s: %s", query, e)
         return None
 
 # Função para armazenar cache
 def armazenar_cache(query, resultados, expira_em_segundos=CACHE_TIMEOUT):
     """
-    Armazena os resultados da consulta no cache.
+    Armazena os resultados da consulta no cache em memória e no diskcache.
+    Os resultados são guardados como objetos Python, sem serialização JSON.
 
     Parameters:
     query (str): A consulta para a qual os resultados serão armazenados.
-    resultados (dict): Os resultados a serem armazenados.
-    expira_em_segundos (int): O tempo de expiração do cache em segundos.
+    resultados (list): Os resultados a serem armazenados.
+    expira_em_segundos (int): Tempo em segundos até o resultado ficar velho.
+    A entrada é removida CACHE_STALE_TIMEOUT segundos depois disso.
     """
     try:
-        logger.debug(f"Armazenando resultados no cache para a consulta: {query}")
+        logger.debug("Armazenando resultados no cache para a consulta: %s", query)
 
         if not resultados:
-            logger.warning(f"Tentativa de armazenar resultados vazios para a consulta {query}. Cache não será atualizado.")
+            logger.warning("Tentativa de armazenar resultados vazios para a consulta %s. Cache não será atualizado.", query)
             return
 
+        # Armazenando no cache
+        chave = chave_busca(query)
+        entrada = {"query": query, "resultados": resultados, "renovar_em": time() + expira_em_segundos}
+        expiracao_total = expira_em_segundos + CACHE_STALE_TIMEOUT
+        cache.set(chave, entrada, expire=expiracao_total, tag='busca')
+        cache_memoria.set(chave, entrada, expiracao_total)
+        indice_similaridade.adicionar(chave[len(PREFIXO_BUSCA):])
+        logger.info("Resultados armazenados com sucesso no cache para a consulta: %s. Expiração em %s segundos.", query, expira_em_segundos)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao tentar armazenar resultados no cache para a consulta %s: %s", query, e)
+
+# Intervalo entre as leituras do cache enquanto outro processo chama a origem
+_INTERVALO_COALESCER = 0.05
+
+def executar_uma_vez(chave, produzir, ler, nome_cache, espera_max=CACHE_COALESCER_ESPERA_MAX):
+    """
+    Executa `produzir()` (uma chamada à origem que grava o resultado no cache)
+    em um único processo por vez para a mesma chave. Um marcador em
+    `estado_compartilhado` indica a chamada em andamento; os demais workers
+    aguardam o resultado aparecer no cache, lendo-o com `ler()`. Se a chamada
+    em andamento terminar sem gravar nada, outro processo assume; após
+    `espera_max` segundos, o processo segue com a própria chamada.
+
+    Parameters:
+    chave (str): Chave de cache do resultado.
+    produzir (callable): Chamada à origem; retorna o resultado.
+    ler (callable): Lê o resultado gravado por outro processo (None se ainda não existe).
+    nome_cache (str): Cache usado nas métricas ('busca' ou 'tts').
+    espera_max (float): Espera máxima pela chamada de outro processo.
+
+    Returns:
+    O retorno de `produzir()` ou de `ler()`.
+    """
+    marcador = "em_andamento:" + chave
+    limite = monotonic() + espera_max
+    dono = estado_compartilhado.add(marcador, os.getpid(), expire=espera_max)
+    while not dono and monotonic() < limite:
+        sleep(_INTERVALO_COALESCER)
+        valor = ler()
+        if valor is not None:
+            chamadas_coalescidas.inc(cache=nome_cache)
+            return valor
+        dono = estado_compartilhado.add(marcador, os.getpid(), expire=espera_max)
+    try:
+        return produzir()
+    finally:
+        if dono:
+            estado_compartilhado.delete(marcador)
+
+async def executar_uma_vez_async(chave, produzir, ler, nome_cache, espera_max=CACHE_COALESCER_ESPERA_MAX):
+    """
+    Versão assíncrona de `executar_uma_vez`, em que `produzir` é uma corrotina.
+    """
+    marcador = "em_andamento:" + chave
+    limite = monotonic() + espera_max
+    dono = estado_compartilhado.add(marcador, os.getpid(), expire=espera_max)
+    while not dono and monotonic() < limite:
+        await asyncio.sleep(_INTERVALO_COALESCER)
+        valor = ler()
+        if valor is not None:
+            chamadas_coalescidas.inc(cache=nome_cache)
+            return valor
+        dono = estado_compartilhado.add(marcador, os.getpid(), expire=espera_max)
+    try:
+        return await produzir()
+    finally:
+        if dono:
+            estado_compartilhado.delete(marcador)
+
+def _resultados_gravados(chave, query):
+    entrada = _ler_entrada(chave, query)
+    return entrada["resultados"] if entrada else None
+
+def _entrada_renovada(chave, renovar_em_anterior=None):
+    """
+    Entrada da chave lida direto do disco (a cópia em memória deste processo
+    pode ser a velha), se for fresca e mais nova que a conhecida (`renovar_em`
+    posterior a `renovar_em_anterior`), ou seja, já renovada por outro
+    processo. A cópia em memória é atualizada com ela.
+    """
+    entrada, expira_em = cache.get(chave, expire_time=True)
+    limite = time() if renovar_em_anterior is None else max(time(), renovar_em_anterior)
+    if not isinstance(entrada, dict) or entrada["renovar_em"] <= limite:
+        return None
+    cache_memoria.set(chave, entrada, expira_em - time() if expira_em else None)
+    return entrada
+
+def _entrada_renovada_no_disco(chave, entrada):
+    # Entrada velha na memória deste processo: outro worker pode já ter gravado a renovada no disco
+    if "correspondencia" in entrada:
+        return None
+    try:
+        return _entrada_renovada(chave, entrada["renovar_em"])
+    except diskcache.CacheError as e:
+        logger.error("Erro ao acessar o cache da chave %s: %s", chave, e)
+        return None
+
+# Locks por chave para que apenas uma busca seja feita por consulta fria
+_buscas_em_andamento = {}
+_buscas_em_andamento_lock = threading.Lock()
+
+# Renovações em segundo plano em andamento e contagem de acessos por chave
+_renovacoes_em_andamento = set()
+_renovacoes_lock = threading.Lock()
+_executor_renovacao = None
+_acessos = Counter()
+_consultas_por_chave = {}
+_acessos_lock = threading.Lock()
+
+def _registrar_acesso(chave, query):
+    with _acessos_lock:
+        _acessos[chave] += 1
+        _consultas_por_chave[chave] = query
+
+def _renovar(query, chave, buscar, expira_em_segundos, renovar_em_anterior=None):
+    def renovar():
+        # Outro worker pode ter renovado a entrada antes de este obter o marcador
+        renovada = _entrada_renovada(chave, renovar_em_anterior)
+        if renovada is not None:
+            logger.debug("Cache da consulta %s já renovado por outro processo.", query)
+            return renovada
+        logger.info("Renovando em segundo plano o cache da consulta: %s", query)
+        resultados = buscar(query)
+        if resultados:
+            armazenar_cache(query, resultados, expira_em_segundos)
+        else:
+            logger.warning("Renovação sem resultados para a consulta %s. Mantendo o cache atual.", query)
+        return resultados
+
+    try:
+        # Renovações usam apenas a parte da cota não reservada às requisições
+        # interativas; se outro worker já renova a consulta, aguarda a entrada dele
+        with prioridade(SEGUNDO_PLANO):
+            executar_uma_vez(chave, renovar, lambda: _entrada_renovada(chave, renovar_em_anterior), 'busca')
+    except CotaEsgotada as e:
+        logger.info("Renovação da consulta %s adiada: %s", query, e)
+    except Exception as e:
+        logger.error("Erro ao renovar o cache da consulta %s: %s", query, e)
+    finally:
+        with _renovacoes_lock:
+            _renovacoes_em_andamento.discard(chave)
+
+def agendar_renovacao(query, buscar, expira_em_segundos=CACHE_TIMEOUT, renovar_em_anterior=None):
+    """
+    Agenda a renovação da consulta em segundo plano. Não faz nada se já houver
+    uma renovação em andamento para a mesma chave. A origem não é chamada se,
+    ao começar, o disco já tiver uma entrada mais nova que `renovar_em_anterior`
+    (o `renovar_em` da entrada que motivou a renovação).
+
+    Returns:
+    bool: True se a renovação foi agendada.
+    """
+    global _executor_renovacao
+    chave = chave_busca(query)
+    with _renovacoes_lock:
+        if chave in _renovacoes_em_andamento:
+            return False
+        _renovacoes_em_andamento.add(chave)
+        if _executor_renovacao is None:
+            _executor_renovacao = ThreadPoolExecutor(
+                max_workers=CACHE_RENOVACAO_WORKERS, thread_name_prefix='renovacao-cache'
+            )
+    _executor_renovacao.submit(_renovar, query, chave, buscar, expira_em_segundos, renovar_em_anterior)
+    return True
+
+def obter_ou_buscar(query, buscar, expira_em_segundos=CACHE_TIMEOUT):
+    """
+    Retorna os resultados em cache para a consulta ou executa `buscar(query)`
+    e armazena o resultado. Requisições simultâneas para a mesma consulta
+    (após normalização) aguardam uma única execução de `buscar`. Resultados
+    velhos são retornados imediatamente e renovados em segundo plano.
+
+    Parameters:
+    query (str): A consulta a ser resolvida.
+    buscar (callable): Função que busca os resultados na origem.
+    expira_em_segundos (int): Tempo em segundos até o resultado ficar velho.
+
+    Returns:
+    list or None: Resultados da consulta ou None se a busca não retornou nada.
+    """
+    chave = chave_busca(query)
+    try:
+        entrada = _obter_entrada(query)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao acessar o cache para a consulta %s: %s", query, e)
+        entrada = None
+
+    if entrada:
+        _contar("busca", "hits")
+        if "correspondencia" in entrada:
+            _contar("busca", "similares")
+        _registrar_acesso(chave, query)
+        if entrada["renovar_em"] <= time():
+            renovada = _entrada_renovada_no_disco(chave, entrada)
+            if renovada is not None:
+                return renovada["resultados"]
+            logger.info("Servindo resultado velho para a consulta %s enquanto é renovado.", query)
+            agendar_renovacao(query, buscar, expira_em_segundos, entrada["renovar_em"])
+        else:
+            logger.info("Cache encontrado para a consulta: %s", query)
+        return entrada["resultados"]
+
+    logger.info("Nenhum cache encontrado para a consulta: %s", query)
+    _contar("busca", "misses")
+    with _buscas_em_andamento_lock:
+        em_andamento = _buscas_em_andamento.setdefault(chave, {"lock": threading.Lock(), "aguardando": 0})
+        em_andamento["aguardando"] += 1
+
+    try:
+        with em_andamento["lock"]:
+            # Outra requisição pode ter preenchido o cache enquanto esperávamos
+            resultados = obter_cache(query)
+            if resultados:
+                logger.debug("Resultados obtidos de busca concorrente para a consulta: %s", query)
+                return resultados
+
+            def buscar_e_armazenar():
+                resultados = buscar(query)
+                if resultados:
+                    armazenar_cache(query, resultados, expira_em_segundos)
+                return resultados
+
+            # Entre processos, apenas um worker chama a origem; os demais leem o que ele gravar
+            resultados = executar_uma_vez(chave, buscar_e_armazenar, lambda: _resultados_gravados(chave, query), 'busca')
+            if resultados:
+                _registrar_acesso(chave, query)
+            return resultados
+    finally:
+        with _buscas_em_andamento_lock:
+            em_andamento["aguardando"] -= 1
+            if em_andamento["aguardando"] == 0:
+                _buscas_em_andamento.pop(chave, None)
+
+# Buscas assíncronas em andamento por chave (uma por consulta fria no loop)
+_buscas_async_em_andamento = {}
+
+async def _renovar_async(query, chave, buscar, expira_em_segundos, renovar_em_anterior=None):
+    async def renovar():
+        renovada = _entrada_renovada(chave, renovar_em_anterior)
+        if renovada is not None:
+            logger.debug("Cache da consulta %s já renovado por outro processo.", query)
+            return renovada
+        logger.info("Renovando em segundo plano o cache da consulta: %s", query)
+        resultados = await buscar(query)
+        if resultados:
+            armazenar_cache(query, resultados, expira_em_segundos)
+        else:
+            logger.warning("Renovação sem resultados para a consulta %s. Mantendo o cache atual.", query)
+        return resultados
+
+    try:
+        # A faixa vale apenas para esta tarefa
+        with prioridade(SEGUNDO_PLANO):
+            await executar_uma_vez_async(chave, renovar, lambda: _entrada_renovada(chave, renovar_em_anterior), 'busca')
+    except CotaEsgotada as e:
+        logger.info("Renovação da consulta %s adiada: %s", query, e)
+    except Exception as e:
+        logger.error("Erro ao renovar o cache da consulta %s: %s", query, e)
+    finally:
+        with _renovacoes_lock:
+            _renovacoes_em_andamento.discard(chave)
+
+async def _buscar_e_armazenar_async(query, buscar, expira_em_segundos):
+    async def buscar_e_armazenar():
+        resultados = await buscar(query)
+        if resultados:
+            armazenar_cache(query, resultados, expira_em_segundos)
+        return resultados
+
+    chave = chave_busca(query)
+    resultados = await executar_uma_vez_async(
+        chave, buscar_e_armazenar, lambda: _resultados_gravados(chave, query), 'busca'
+    )
+    if resultados:
+        _registrar_acesso(chave, query)
+    return resultados
+
+async def obter_ou_buscar_async(query, buscar, expira_em_segundos=CACHE_TIMEOUT):
+    """
+    Versão assíncrona de `obter_ou_buscar`, em que `buscar` é uma corrotina.
+    Requisições simultâneas para a mesma consulta aguardam a mesma tarefa e
+    resultados velhos são renovados por uma tarefa em segundo plano.
+    """
+    chave = chave_busca(query)
+    try:
+        entrada = _obter_entrada(query)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao acessar o cache para a consulta %s: %s", query, e)
+        entrada = None
+
+    if entrada:
+        _contar("busca", "hits")
+        if "correspondencia" in entrada:
+            _contar("busca", "similares")
+        _registrar_acesso(chave, query)
+        if entrada["renovar_em"] <= time():
+            renovada = _entrada_renovada_no_disco(chave, entrada)
+            if renovada is not None:
+                return renovada["resultados"]
+            with _renovacoes_lock:
+                agendar = chave not in _renovacoes_em_andamento
+                _renovacoes_em_andamento.add(chave)
+            if agendar:
+                logger.info("Servindo resultado velho para a consulta %s enquanto é renovado.", query)
+                asyncio.ensure_future(_renovar_async(query, chave, buscar, expira_em_segundos, entrada["renovar_em"]))
+        else:
+            logger.info("Cache encontrado para a consulta: %s", query)
+        return entrada["resultados"]
+
+    logger.info("Nenhum cache encontrado para a consulta: %s", query)
+    _contar("busca", "misses")
+    tarefa = _buscas_async_em_andamento.get(chave)
+    if tarefa is None:
+        tarefa = asyncio.ensure_future(_buscar_e_armazenar_async(query, buscar, expira_em_segundos))
+        _buscas_async_em_andamento[chave] = tarefa
+        tarefa.add_done_callback(lambda _: _buscas_async_em_andamento.pop(chave, None))
+    else:
+        logger.debug("Aguardando busca em andamento para a consulta: %s", query)
+    # shield: o cancelamento de uma requisição não cancela a busca compartilhada
+    return await asyncio.shield(tarefa)
+
+def renovar_mais_acessadas(buscar, top_k=CACHE_RENOVACAO_TOP_K, janela_segundos=CACHE_RENOVACAO_INTERVALO,
+                           expira_em_segundos=CACHE_TIMEOUT):
+    """
+    Agenda a renovação das top_k consultas mais acessadas que ficarão velhas
+    nos próximos janela_segundos. Em seguida, as contagens de acesso são
+    reduzidas pela metade, para que consultas que deixaram de ser populares
+    percam prioridade.
+
+    Returns:
+    int: Quantidade de renovações agendadas.
+    """
+    with _acessos_lock:
+        mais_acessadas = [(chave, _consultas_por_chave[chave]) for chave, _ in _acessos.most_common(top_k)]
+        for chave in list(_acessos):
+            _acessos[chave] //= 2
+            if not _acessos[chave]:
+                del _acessos[chave]
+                _consultas_por_chave.pop(chave, None)
+
+    agendadas = 0
+    limite = time() + janela_segundos
+    for chave, query in mais_acessadas:
         try:
-            resultados_json = json.dumps(resultados)
-        except (TypeError, ValueError) as e:
-            logger.error(f"Erro ao serializar os resultados para a consulta {query}: {e}")
-            return
+            entrada = _obter_entrada(query)
+        except diskcache.CacheError as e:
+            logger.error("Erro ao acessar o cache para a consulta %s: %s", query, e)
+            continue
+        if (entrada and entrada["renovar_em"] <= limite
+                and agendar_renovacao(query, buscar, expira_em_segundos, entrada["renovar_em"])):
+            agendadas += 1
 
-        # Armazenando no cache
-        cache.set(query, resultados_json, expire=expira_em_segundos)
-        logger.info(f"Resultados armazenados com sucesso no cache para a consulta: {query}. Expiração em {expira_em_segundos} segundos.")
+    logger.debug("Renovação proativa agendada para %s de %s consultas mais acessadas.", agendadas, len(mais_acessadas))
+    return agendadas
+
+_renovador_proativo = None
+
+def iniciar_renovacao_proativa(buscar, top_k=CACHE_RENOVACAO_TOP_K, intervalo=CACHE_RENOVACAO_INTERVALO):
+    """
+    Inicia uma thread que, a cada `intervalo` segundos, renova as consultas
+    mais acessadas antes que fiquem velhas. Chamadas repetidas não criam
+    novas threads. top_k <= 0 desativa a renovação proativa.
+    """
+    global _renovador_proativo
+    if top_k <= 0 or (_renovador_proativo is not None and _renovador_proativo.is_alive()):
+        return
+
+    def executar():
+        while True:
+            sleep(intervalo)
+            try:
+                renovar_mais_acessadas(buscar, top_k, intervalo)
+            except Exception as e:
+                logger.error("Erro na renovação proativa do cache: %s", e)
+
+    _renovador_proativo = threading.Thread(target=executar, name='renovador-cache', daemon=True)
+    _renovador_proativo.start()
+    logger.info("Renovação proativa iniciada: top %s consultas a cada %s segundos.", top_k, intervalo)
+
+# Contadores de acertos/falhas de cada cache (TTS, transcrições) deste processo
+_cache_stats = {"busca": {"hits": 0, "misses": 0, "similares": 0}, "tts": {"hits": 0, "misses": 0}, "transcricao": {"hits": 0, "misses": 0}}
+_cache_stats_lock = threading.Lock()
+
+def _contar(nome_cache, evento):
+    with _cache_stats_lock:
+        _cache_stats[nome_cache][evento] += 1
+    consultas_cache.inc(cache=nome_cache, resultado={"hits": "hit", "misses": "miss", "similares": "similar"}[evento])
+
+def chave_audio(texto, lang='pt', slow=False):
+    """
+    Gera a chave endereçada por conteúdo para um áudio de resposta (TTS).
+
+    Parameters:
+    texto (str): Texto sintetizado.
+    lang (str): Idioma da síntese.
+    slow (bool): Se a fala foi gerada em modo lento.
+
+    Returns:
+    str: Chave no formato 'tts:<sha256>'.
+    """
+    conteudo = json.dumps([texto, lang, bool(slow)], ensure_ascii=False)
+    return "tts:" + hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+# Função para obter áudio de resposta do cache
+def obter_audio_cache(texto, lang='pt', slow=False):
+    """
+    Recupera o áudio (MP3) já sintetizado para o texto, se existir.
+
+    Returns:
+    bytes or None: Conteúdo do áudio ou None se não encontrado.
+    """
+    chave = chave_audio(texto, lang, slow)
+    try:
+        audio = cache.get(chave)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao acessar o cache de áudio %s: %s", chave, e)
+        audio = None
+
+    if audio is None:
+        _contar("tts", "misses")
+        logger.debug("Áudio de resposta não encontrado no cache: %s", chave)
+        return None
+
+    _contar("tts", "hits")
+    logger.debug("Áudio de resposta encontrado no cache: %s", chave)
+    return audio
+
+# Função para armazenar áudio de resposta no cache
+def armazenar_audio_cache(texto, audio, lang='pt', slow=False, expira_em_segundos=TTS_CACHE_TIMEOUT):
+    """
+    Armazena o áudio (MP3) sintetizado para o texto. A remoção por tamanho
+    segue o limite CACHE_SIZE_LIMIT_MB do cache.
+    """
+    if not audio:
+        logger.warning("Tentativa de armazenar áudio vazio no cache. Cache não será atualizado.")
+        return
+
+    chave = chave_audio(texto, lang, slow)
+    try:
+        cache.set(chave, audio, expire=expira_em_segundos or None, tag='tts')
+        logger.debug("Áudio de resposta armazenado no cache: %s (%s bytes)", chave, len(audio))
     except diskcache.CacheError as e:
-        logger.error(f"Erro ao tentar armazenar resultados no cache para a consulta {query}: {e}")
+        logger.error("Erro ao armazenar áudio no cache %s: %s", chave, e)
+
+def chave_transcricao(digest):
+    """
+    Gera a chave de cache da transcrição de um áudio a partir do hash do conteúdo.
+    """
+    return "audio:" + digest
+
+# Função para obter a transcrição de um áudio já processado
+def obter_transcricao_cache(digest):
+    """
+    Recupera a validação e a transcrição de um áudio com o mesmo conteúdo.
+
+    Parameters:
+    digest (str): Hash do conteúdo do áudio enviado.
+
+    Returns:
+    dict or None: {'validacao': dict, 'transcricao': str} ou None.
+    """
+    chave = chave_transcricao(digest)
+    try:
+        entrada = cache.get(chave)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao acessar o cache de transcrições %s: %s", chave, e)
+        entrada = None
+
+    if entrada is None:
+        _contar("transcricao", "misses")
+        logger.debug("Transcrição não encontrada no cache: %s", chave)
+        return None
+
+    _contar("transcricao", "hits")
+    logger.debug("Transcrição encontrada no cache: %s", chave)
+    return entrada
+
+# Função para armazenar a transcrição de um áudio
+def armazenar_transcricao_cache(digest, validacao, transcricao, expira_em_segundos=TRANSCRICAO_CACHE_TIMEOUT):
+    """
+    Armazena a validação (sem o PCM decodificado) e a transcrição de um áudio.
+
+    Parameters:
+    digest (str): Hash do conteúdo do áudio enviado.
+    validacao (dict): Resultado de check_audio.
+    transcricao (str): Texto transcrito.
+    expira_em_segundos (int): Tempo de expiração (0 = sem expiração).
+    """
+    chave = chave_transcricao(digest)
+    entrada = {
+        "validacao": {campo: valor for campo, valor in validacao.items() if campo != 'pcm'},
+        "transcricao": transcricao,
+    }
+    try:
+        cache.set(chave, entrada, expire=expira_em_segundos or None, tag='transcricao')
+        logger.debug("Transcrição armazenada no cache: %s", chave)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao armazenar a transcrição no cache %s: %s", chave, e)
+
+def armazenar_audio_resposta(audio, expira_em_segundos=AUDIO_RESPOSTA_TIMEOUT):
+    """
+    Guarda o áudio de uma resposta para ser baixado separadamente, sob um
+    identificador aleatório (não adivinhável) válido por pouco tempo.
+
+    Returns:
+    str | None: Identificador do áudio ou None em caso de erro.
+    """
+    identificador = secrets.token_urlsafe(16)
+    try:
+        cache.set("resposta:" + identificador, audio, expire=expira_em_segundos, tag='resposta')
+        return identificador
+    except diskcache.CacheError as e:
+        logger.error("Erro ao armazenar o áudio de resposta: %s", e)
+        return None
+
+def obter_audio_resposta(identificador):
+    """
+    Retorna o áudio guardado por `armazenar_audio_resposta`, ou None se o
+    identificador não existir ou já tiver expirado.
+    """
+    try:
+        return cache.get("resposta:" + identificador)
+    except diskcache.CacheError as e:
+        logger.error("Erro ao obter o áudio de resposta %s: %s", identificador, e)
+        return None
+
+def estatisticas_cache(nome_cache):
+    """
+    Retorna os contadores de acertos e falhas de um cache ('busca', 'tts' ou
+    'transcricao') deste processo.
+
+    Returns:
+    dict: 'hits', 'misses' e 'hit_rate' (e, no cache de busca, 'similares':
+    acertos por uma consulta parecida, incluídos em 'hits').
+    """
+    with _cache_stats_lock:
+        contadores = dict(_cache_stats[nome_cache])
+    total = contadores["hits"] + contadores["misses"]
+    return {**contadores, "hit_rate": contadores["hits"] / total if total else 0.0}
+
+def estatisticas_audio_cache():
+    """
+    Retorna os contadores de acertos e falhas do cache de áudio deste processo.
+
+    Returns:
+    dict: 'hits', 'misses' e 'hit_rate'.
+    """
+    return estatisticas_cache("tts")
 
 # Função para limpar o cache
 def limpar_cache():
@@ -106,9 +841,39 @@ def limpar_cache():
     try:
         logger.info("Iniciando limpeza do cache...")
         cache.clear()
+        cache_memoria.clear()
         logger.info("Cache limpo com sucesso.")
     except diskcache.CacheError as e:
-        logger.error(f"Erro ao tentar limpar o cache: {e}")
+        logger.error("Erro ao tentar limpar o cache: %s", e)
+
+# Função para manter o cache dentro do limite de tamanho
+def manter_limite_cache():
+    """
+    Remove as entradas expiradas e, se o cache ainda estiver acima de
+    CACHE_SIZE_LIMIT_MB, as entradas escolhidas pela política de remoção
+    (ex.: após importar um snapshot grande).
+
+    Returns:
+    int: Quantidade de entradas removidas.
+    """
+    try:
+        removidas = cache.cull()
+        logger.info("Cache com %.1f MB após remover %s entradas.", cache.volume() / (1024 * 1024), removidas)
+        return removidas
+    except diskcache.CacheError as e:
+        logger.error("Erro ao reduzir o cache ao limite de tamanho: %s", e)
+        return 0
+
+# Função para fechar a conexão do processo com o cache
+def fechar_cache():
+    """
+    Fecha a conexão deste processo com o cache em disco. A conexão é reaberta
+    automaticamente no próximo acesso; usado no processo mestre antes do fork,
+    para que cada worker abra a sua própria conexão SQLite.
+    """
+    cache.close()
+    estado_compartilhado.close()
+    cache_memoria.clear()
 
 # Função de verificação da saúde do cache
 def verificar_conexao():
@@ -123,28 +888,11 @@ def verificar_conexao():
         test_value = 'test_value'
         cache.set(test_key, test_value, expire=60)
         if cache.get(test_key) == test_value:
-            logger.info(f"Cache está operacional em {CACHE_DIR}.")
+            logger.info("Cache está operacional em %s.", CACHE_DIR)
             return True
         else:
             logger.error("Falha ao verificar a escrita e leitura no cache.")
             return False
     except diskcache.CacheError as e:
-        logger.error(f"Erro ao verificar conexão com o cache: {e}")
+        logger.error("Erro ao verificar conexão com o cache: %s", e)
         return False
-
-# Função para medir a performance do cache
-def medir_performance(iteracoes=100):
-    """
-    Mede a performance do cache realizando várias operações de leitura e escrita.
-
-    Parameters:
-    iteracoes (int): Número de operações de cache para testar.
-    """
-    start_time = time()
-
-    for _ in range(iteracoes):
-        cache.set("performance_test", "OK", expire=60)
-        cache.get("performance_test")
-
-    end_time = time()
-    logger.info(f"Performance do cache: {end_time - start_time:.6f} segundos para {iteracoes} operações de leitura e escrita.")
@@ -0,0 +1,204 @@
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from itertools import chain, islice
+from time import sleep
+
+logger = logging.getLogger(__name__)
+
+_NUMERO_RE = re.compile(r"\w*\d\w*")
+
+
+def trigramas(consulta):
+    """
+    Trigramas de caracteres da consulta normalizada, com as palavras em ordem
+    alfabética (a ordem das palavras não altera a similaridade).
+    """
+    texto = f" {' '.join(sorted(consulta.split()))} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+def _uma_edicao(palavra, outra):
+    # Uma inserção, remoção, substituição ou transposição de letras vizinhas
+    if abs(len(palavra) - len(outra)) > 1:
+        return False
+    if len(palavra) == len(outra):
+        diferentes = [i for i in range(len(palavra)) if palavra[i] != outra[i]]
+        if len(diferentes) == 2:
+            i, j = diferentes
+            return j == i + 1 and palavra[i] == outra[j] and palavra[j] == outra[i]
+        return len(diferentes) == 1
+    curta, longa = sorted((palavra, outra), key=len)
+    i = next((i for i in range(len(curta)) if curta[i] != longa[i]), len(curta))
+    return curta[i:] == longa[i + 1:]
+
+
+def mesmas_palavras(consulta, candidata):
+    """
+    Indica se as duas consultas têm as mesmas palavras, a menos de erros de
+    digitação: cada palavra de uma que falta na outra precisa corresponder a
+    uma palavra da outra com a mesma inicial e a uma edição de distância. Assim
+    "inteligencia artifical" corresponde a "inteligencia artificial", mas
+    "ipython tutorial" não corresponde a "python tutorial".
+    """
+    palavras, outras = set(consulta.split()), set(candidata.split())
+    sobrando = sorted(outras - palavras)
+    faltando = sorted(palavras - outras)
+    if len(faltando) != len(sobrando):
+        return False
+    for palavra in faltando:
+        par = next((outra for outra in sobrando if outra[0] == palavra[0] and _uma_edicao(palavra, outra)), None)
+        if par is None:
+            return False
+        sobrando.remove(par)
+    return True
+
+
+class IndiceSimilaridade:
+    """
+    Índice de consultas em cache por trigramas de caracteres, para encontrar
+    a consulta mais parecida com uma nova (ex.: "inteligencia artificial" e
+    "inteligencia artifical"). A similaridade é o coeficiente de Dice entre os
+    conjuntos de trigramas. Além do limiar, as palavras precisam ser as mesmas
+    a menos de erros de digitação (`mesmas_palavras`) e os números (anos,
+    placares, horários) precisam ser idênticos, para que "jogo 2023" não
+    responda por "jogo 2024".
+
+    O conteúdo vem das chaves persistidas no cache (`listar_consultas`), lidas
+    por completo no primeiro uso e depois, em uma thread em segundo plano, a
+    cada `intervalo_recarga` segundos (para incluir consultas armazenadas por
+    outros processos); entre as recargas, o índice é atualizado a cada
+    consulta armazenada.
+    """
+
+    def __init__(self, limiar, listar_consultas, intervalo_recarga=60, max_por_trigrama=64):
+        self.limiar = limiar
+        self.intervalo_recarga = intervalo_recarga
+        self.max_por_trigrama = max_por_trigrama
+        self._listar_consultas = listar_consultas
+        self._trigramas = {}
+        self._invertido = defaultdict(set)
+        self._carregado = False
+        self._recarregador = None
+        self._lock = threading.Lock()
+        self._recarga_lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return 0 < self.limiar <= 1
+
+    def _adicionar(self, consulta):
+        if consulta in self._trigramas:
+            return
+        conjunto = trigramas(consulta)
+        self._trigramas[consulta] = conjunto
+        for trigrama in conjunto:
+            self._invertido[trigrama].add(consulta)
+
+    def adicionar(self, consulta):
+        """
+        Inclui uma consulta normalizada no índice.
+        """
+        if self.ativo:
+            with self._lock:
+                self._adicionar(consulta)
+
+    def _remover(self, consulta):
+        conjunto = self._trigramas.pop(consulta, None)
+        for trigrama in conjunto or ():
+            consultas = self._invertido.get(trigrama)
+            if consultas is not None:
+                consultas.discard(consulta)
+                if not consultas:
+                    del self._invertido[trigrama]
+
+    def remover(self, consulta):
+        """
+        Remove uma consulta normalizada do índice (ex.: a entrada expirou).
+        """
+        with self._lock:
+            self._remover(consulta)
+
+    def recarregar(self):
+        """
+        Relê todas as consultas persistidas no cache.
+        """
+        consultas = set(self._listar_consultas())
+        with self._lock:
+            for consulta in set(self._trigramas) - consultas:
+                self._remover(consulta)
+            for consulta in consultas:
+                self._adicionar(consulta)
+            total = len(self._trigramas)
+        self._carregado = True
+        logger.debug("Índice de similaridade recarregado: %s consultas.", total)
+
+    def iniciar_recarga(self):
+        """
+        Carrega o índice, se ainda não foi carregado, e inicia a thread que o
+        recarrega a cada `intervalo_recarga` segundos. Chamadas repetidas (e as
+        feitas por outras threads durante a carga) não repetem a leitura nem
+        criam novas threads; após um fork, a thread é recriada no novo processo.
+        """
+        if not self.ativo or (self._recarregador is not None and self._recarregador.is_alive()):
+            return
+        # Só a primeira carga bloqueia quem chama; as recargas seguintes ficam com a thread
+        if not self._recarga_lock.acquire(blocking=not self._carregado):
+            return
+        try:
+            if self._recarregador is not None and self._recarregador.is_alive():
+                return
+            if not self._carregado:
+                self.recarregar()
+
+            def executar():
+                while True:
+                    sleep(self.intervalo_recarga)
+                    try:
+                        self.recarregar()
+                    except Exception as e:
+                        logger.error("Erro ao recarregar o índice de similaridade: %s", e)
+
+            self._recarregador = threading.Thread(target=executar, name='recarga-similaridade', daemon=True)
+            self._recarregador.start()
+        finally:
+            self._recarga_lock.release()
+
+    def buscar(self, consulta):
+        """
+        Procura a consulta indexada mais parecida com `consulta` (normalizada).
+
+        Returns:
+        tuple[str, float] | None: Consulta encontrada e similaridade (0 a 1),
+        ou None se nenhuma atingir o limiar.
+        """
+        if not self.ativo or not consulta:
+            return None
+        self.iniciar_recarga()
+
+        conjunto = trigramas(consulta)
+        numeros = set(_NUMERO_RE.findall(consulta))
+        # Com Dice >= limiar, a candidata compartilha ao menos `minimo` trigramas da consulta e,
+        # portanto, aparece em uma das len(conjunto) - minimo + 1 listas mais curtas: só essas
+        # são lidas, limitadas a max_por_trigrama consultas cada, e copiadas sob o lock
+        minimo = math.ceil(self.limiar * len(conjunto) / (2 - self.limiar))
+        with self._lock:
+            listas = sorted((self._invertido.get(trigrama, ()) for trigrama in conjunto), key=len)
+            raras = [tuple(islice(lista, self.max_por_trigrama)) for lista in listas[:len(conjunto) - minimo + 1]]
+
+        # Similaridade exata de cada candidata, fora do lock (os conjuntos de trigramas são imutáveis)
+        candidatos = []
+        for candidata in set(chain.from_iterable(raras)):
+            conjunto_candidata = self._trigramas.get(candidata)
+            if candidata != consulta and conjunto_candidata is not None:
+                compartilhados = len(conjunto & conjunto_candidata)
+                candidatos.append((2 * compartilhados / (len(conjunto) + len(conjunto_candidata)), candidata))
+
+        for similaridade, candidata in sorted(candidatos, reverse=True):
+            if similaridade < self.limiar:
+                break
+            if set(_NUMERO_RE.findall(candidata)) == numeros and mesmas_palavras(consulta, candidata):
+                return candidata, similaridade
+        return None
@@ -0,0 +1,297 @@
+import base64
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from time import sleep, time
+
+import diskcache
+
+from configuracao_log import LOG_FILE
+from cota import prioridade, CotaEsgotada, SEGUNDO_PLANO
+from cache.cache_manager import (
+    cache, estado_compartilhado, chave_busca, normalizar_consulta, armazenar_cache, executar_uma_vez, indice_similaridade,
+    manter_limite_cache, PREFIXO_BUSCA,
+)
+
+logger = logging.getLogger(__name__)
+
+# Identificação do arquivo de snapshot; VERSAO muda quando o formato das entradas ou das chaves muda
+FORMATO = 'cache-snapshot'
+VERSAO = 1
+
+# Snapshot importado na inicialização (vazio = nenhum)
+CACHE_SNAPSHOT_IMPORTAR = os.getenv('CACHE_SNAPSHOT_IMPORTAR', '')
+
+# Pré-aquecimento: consultas mais frequentes do api.log buscadas em segundo plano (0 desativa),
+# com no máximo CACHE_PRE_AQUECIMENTO_POR_MINUTO consultas por minuto
+CACHE_PRE_AQUECIMENTO_TOP_N = int(os.getenv('CACHE_PRE_AQUECIMENTO_TOP_N', 50))
+CACHE_PRE_AQUECIMENTO_POR_MINUTO = float(os.getenv('CACHE_PRE_AQUECIMENTO_POR_MINUTO', 30))
+
+# Prefixos das entradas exportadas: resultados de busca e áudios de resposta (TTS)
+TIPOS = {PREFIXO_BUSCA: 'busca', 'tts:': 'tts'}
+
+_CONSULTA_FILTRADA = "Consulta filtrada: "
+_CONSULTA_FILTRADA_RE = re.compile(re.escape(_CONSULTA_FILTRADA) + r"(.+)$")
+
+
+def _tipo(chave):
+    if isinstance(chave, str):
+        for prefixo, tipo in TIPOS.items():
+            if chave.startswith(prefixo):
+                return tipo
+    return None
+
+
+def exportar_snapshot(caminho):
+    """
+    Grava os resultados de busca e os áudios de resposta (TTS) em cache em um
+    snapshot compacto: JSON Lines comprimido com gzip, com um cabeçalho
+    ({'formato', 'versao', 'criado_em'}) e uma linha por entrada ({'tipo',
+    'chave', 'valor', 'expira_em'}; o áudio em base64). Transcrições, áudios
+    entregues por URL e o estado das cotas não são exportados. O arquivo é
+    escrito em um temporário e renomeado ao final.
+
+    Parameters:
+    caminho (str): Arquivo de destino.
+
+    Returns:
+    dict: Entradas exportadas por tipo.
+    """
+    contagens = Counter()
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({"formato": FORMATO, "versao": VERSAO, "criado_em": time()}) + "\n")
+        for chave in cache.iterkeys():
+            tipo = _tipo(chave)
+            if tipo is None:
+                continue
+            try:
+                valor, expira_em = cache.get(chave, expire_time=True)
+            except diskcache.CacheError as e:
+                logger.error("Erro ao ler a entrada %s para o snapshot: %s", chave, e)
+                continue
+            if valor is None:
+                continue
+            if tipo == 'tts':
+                valor = base64.b64encode(valor).decode('ascii')
+            elif not isinstance(valor, dict):
+                # Entrada antiga (apenas a lista de resultados)
+                valor = {"query": chave[len(PREFIXO_BUSCA):], "resultados": valor, "renovar_em": expira_em or time()}
+            registro = {"tipo": tipo, "chave": chave, "valor": valor, "expira_em": expira_em}
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            contagens[tipo] += 1
+    os.replace(temporario, caminho)
+    logger.info("Snapshot do cache exportado para %s: %s", caminho, dict(contagens))
+    return dict(contagens)
+
+
+def _ler_registro(linha):
+    """
+    Campos (tipo, chave, valor, expira_em) de uma linha do snapshot; tipo é
+    None se não corresponder ao prefixo da chave.
+
+    Raises:
+    ValueError / KeyError / TypeError: se o registro estiver malformado.
+    """
+    registro = json.loads(linha)
+    tipo, chave, valor, expira_em = registro["tipo"], registro["chave"], registro["valor"], registro["expira_em"]
+    if expira_em is not None and not isinstance(expira_em, (int, float)):
+        raise TypeError(f"expira_em inválido: {expira_em!r}")
+    if _tipo(chave) != tipo:
+        return None, chave, valor, expira_em
+    if tipo == 'tts':
+        valor = base64.b64decode(valor, validate=True)
+    elif not isinstance(valor, dict):
+        raise TypeError("entrada de busca sem o dicionário de resultados")
+    return tipo, chave, valor, expira_em
+
+
+def importar_snapshot(caminho):
+    """
+    Carrega no cache as entradas de um snapshot gerado por `exportar_snapshot`.
+    Entradas já presentes no cache (possivelmente mais novas) são mantidas e
+    entradas expiradas são ignoradas; as expirações restantes são preservadas.
+    Registros malformados são registrados no log e ignorados, e um arquivo
+    truncado é importado até o ponto em que termina. Ao final, o cache é
+    reduzido ao limite de tamanho, se preciso.
+
+    Parameters:
+    caminho (str): Arquivo de snapshot.
+
+    Returns:
+    dict: Entradas importadas por tipo (e registros malformados em 'ignorados').
+
+    Raises:
+    ValueError: se o arquivo não for um snapshot ou tiver versão mais nova que a suportada.
+    """
+    contagens = Counter()
+    agora = time()
+    with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+        try:
+            cabecalho = json.loads(f.readline())
+        except (ValueError, OSError, EOFError):
+            cabecalho = {}
+        if not isinstance(cabecalho, dict) or cabecalho.get("formato") != FORMATO:
+            raise ValueError(f"{caminho} não é um snapshot do cache.")
+        if cabecalho.get("versao", 0) > VERSAO:
+            raise ValueError(f"Snapshot na versão {cabecalho['versao']}; versão suportada: {VERSAO}.")
+
+        numero = 1
+        try:
+            for numero, linha in enumerate(f, start=2):
+                try:
+                    tipo, chave, valor, expira_em = _ler_registro(linha)
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning("Registro %s do snapshot %s ignorado: %s", numero, caminho, e)
+                    contagens['ignorados'] += 1
+                    continue
+                if tipo is None or (expira_em and expira_em <= agora):
+                    continue
+                try:
+                    if not cache.add(chave, valor, expire=expira_em - agora if expira_em else None, tag=tipo):
+                        continue
+                except diskcache.CacheError as e:
+                    logger.error("Erro ao importar a entrada %s do snapshot: %s", chave, e)
+                    continue
+                if tipo == 'busca':
+                    indice_similaridade.adicionar(chave[len(PREFIXO_BUSCA):])
+                contagens[tipo] += 1
+        except (EOFError, OSError) as e:
+            logger.error("Snapshot %s truncado após o registro %s: %s", caminho, numero, e)
+
+    manter_limite_cache()
+    logger.info("Snapshot %s importado: %s", caminho, dict(contagens))
+    return dict(contagens)
+
+
+def importar_snapshot_inicial(caminho=CACHE_SNAPSHOT_IMPORTAR):
+    """
+    Importa o snapshot configurado em CACHE_SNAPSHOT_IMPORTAR, se houver. Erros
+    não impedem a inicialização: o cache apenas começa frio.
+    """
+    if not caminho:
+        return
+    try:
+        importar_snapshot(caminho)
+    except (OSError, ValueError, EOFError) as e:
+        logger.error("Não foi possível importar o snapshot %s: %s", caminho, e)
+
+
+def _consulta_da_linha(linha):
+    if _CONSULTA_FILTRADA not in linha:
+        return None
+    if linha.startswith('{'):
+        # LOG_FORMATO=json
+        try:
+            linha = json.loads(linha).get("mensagem", "")
+        except ValueError:
+            return None
+    encontrada = _CONSULTA_FILTRADA_RE.search(linha.rstrip("\n"))
+    return encontrada.group(1).strip() if encontrada else None
+
+
+def consultas_mais_frequentes(top_n, arquivos=None):
+    """
+    Consultas mais frequentes registradas no log ("Consulta filtrada: ..."),
+    agrupadas pela consulta normalizada. Por padrão, lê o api.log e os
+    arquivos rotacionados (api.log.1, api.log.2, ...). Essas linhas não passam
+    pelo limite de taxa do log, então cada consulta atendida é contada.
+
+    Returns:
+    list[str]: Até top_n consultas (na forma em que apareceram primeiro no log).
+    """
+    if arquivos is None:
+        arquivos = [LOG_FILE] + [f"{LOG_FILE}.{n}" for n in range(1, 10)]
+    contagem = Counter()
+    exemplos = {}
+    for arquivo in arquivos:
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, encoding='utf-8', errors='replace') as f:
+            for linha in f:
+                consulta = _consulta_da_linha(linha)
+                normalizada = normalizar_consulta(consulta) if consulta else None
+                if normalizada:
+                    contagem[normalizada] += 1
+                    exemplos.setdefault(normalizada, consulta)
+    return [exemplos[normalizada] for normalizada, _ in contagem.most_common(top_n)]
+
+
+def _sem_cota(funcao):
+    # Segundo plano não espera pela cota: tenta de novo após o Retry-After sugerido
+    while True:
+        try:
+            return funcao()
+        except CotaEsgotada as e:
+            logger.debug("Pré-aquecimento aguardando cota: %s", e)
+            sleep(e.retry_after)
+
+
+def pre_aquecer(buscar, sintetizar=None, top_n=CACHE_PRE_AQUECIMENTO_TOP_N, por_minuto=CACHE_PRE_AQUECIMENTO_POR_MINUTO):
+    """
+    Busca as top_n consultas mais frequentes do log que ainda não estão no
+    cache e, com `sintetizar(query, total)`, gera também o áudio de resposta.
+    As chamadas usam a faixa SEGUNDO_PLANO da cota e no máximo `por_minuto`
+    consultas são buscadas por minuto.
+
+    Returns:
+    int: Quantidade de consultas pré-aquecidas.
+    """
+    intervalo = 60 / por_minuto if por_minuto > 0 else 0
+    aquecidas = 0
+    with prioridade(SEGUNDO_PLANO):
+        for query in consultas_mais_frequentes(top_n):
+            chave = chave_busca(query)
+            if chave in cache:
+                continue
+
+            def buscar_e_armazenar():
+                resultados = buscar(query)
+                if resultados:
+                    armazenar_cache(query, resultados)
+                return resultados
+
+            def ler():
+                entrada = cache.get(chave)
+                return entrada["resultados"] if isinstance(entrada, dict) else entrada
+
+            try:
+                resultados = _sem_cota(lambda: executar_uma_vez(chave, buscar_e_armazenar, ler, 'busca'))
+                if resultados and sintetizar:
+                    _sem_cota(lambda: sintetizar(query, len(resultados)))
+            except Exception as e:
+                logger.error("Erro ao pré-aquecer a consulta %s: %s", query, e)
+                continue
+            aquecidas += bool(resultados)
+            sleep(intervalo)
+
+    logger.info("Pré-aquecimento do cache concluído: %s consultas.", aquecidas)
+    return aquecidas
+
+
+def iniciar_pre_aquecimento(buscar, sintetizar=None, top_n=CACHE_PRE_AQUECIMENTO_TOP_N,
+                            por_minuto=CACHE_PRE_AQUECIMENTO_POR_MINUTO):
+    """
+    Executa `pre_aquecer` em uma thread em segundo plano, em um único processo
+    por diretório de cache: os demais workers encontram o marcador no cache e
+    não repetem o pré-aquecimento. top_n <= 0 desativa.
+    """
+    if top_n <= 0:
+        return
+    duracao_max = top_n * (60 / por_minuto if por_minuto > 0 else 1) + 300
+    if not estado_compartilhado.add("pre_aquecimento", os.getpid(), expire=duracao_max):
+        logger.debug("Pré-aquecimento do cache já executado por outro processo.")
+        return
+
+    def executar():
+        try:
+            pre_aquecer(buscar, sintetizar, top_n, por_minuto)
+        except Exception as e:
+            logger.error("Erro no pré-aquecimento do cache: %s", e)
+
+    logger.info("Pré-aquecimento iniciado: top %s consultas do log, até %s por minuto.", top_n, por_minuto)
+    threading.Thread(target=executar, name='pre-aquecimento-cache', daemon=True).start()
@@ -1,120 +1,486 @@
 import os
+import re
+import asyncio
+import contextvars
 import subprocess
+import threading
+import struct
 import logging
 import mimetypes
-from pydub.utils import mediainfo
+from itertools import chain
+from analise_audio import analisar_volume, cortar_silencio
+from transcodificacao import limitador_transcodificacao, SobrecargaTranscodificacao, TRANSCODIFICACAO_TIMEOUT
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
 SUPPORTED_FORMATS = ['.mp3', '.wav', '.ogg', '.flac', '.aac']
-MAX_AUDIO_SIZE_MB = 10
+SUPPORTED_CODECS = ['mp3', 'aac', 'vorbis', 'pcm', 'flac']
+MAX_AUDIO_SIZE_MB = int(os.getenv('MAX_AUDIO_SIZE_MB', 10))
+MAX_AUDIO_SIZE_BYTES = MAX_AUDIO_SIZE_MB * 1024 * 1024
+
+# Bytes iniciais lidos para identificar o formato antes de iniciar o ffmpeg
+TAMANHO_CABECALHO = 4096
+
+# Formato do PCM entregue à transcrição (16 kHz, mono, 16 bits)
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+SAMPLE_WIDTH = 2
+
+# Áudios com pico abaixo deste nível (dBFS) são considerados mudos
+VOLUME_MINIMO_DB = -60.0
+
+# Padrões para extrair metadados do stderr do ffmpeg
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_CODEC_RE = re.compile(r"Stream #\S+: Audio:\s*([\w-]+)")
+
+# Resultado de `ffmpeg -version` ('' se falhou), verificado uma vez por processo
+_versao_ffmpeg = None
+
+
+def _parse_ffmpeg_stderr(stderr):
+    """
+    Extrai duração e codec da saída de erro do ffmpeg.
+    Apenas a seção de entrada é usada para duração e codec.
+    """
+    input_section = stderr.split("Output #", 1)[0]
+    info = {"duration": None, "codec": ""}
+
+    match = _DURATION_RE.search(input_section)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    match = _CODEC_RE.search(input_section)
+    if match:
+        info["codec"] = match.group(1).lower()
+
+    return info
+
+
+def identificar_formato(cabecalho):
+    """
+    Identifica o formato do áudio pela assinatura nos bytes iniciais.
+
+    Returns:
+    str | None: 'ogg', 'flac', 'wav', 'mp3' ou 'aac'; None se não reconhecido.
+    """
+    if cabecalho[:4] == b'OggS':
+        return 'ogg'
+    if cabecalho[:4] == b'fLaC':
+        return 'flac'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WAVE':
+        return 'wav'
+    if cabecalho[:3] == b'ID3':
+        return 'mp3'
+    if cabecalho[:4] == b'ADIF':
+        return 'aac'
+    if len(cabecalho) >= 2 and cabecalho[0] == 0xFF and cabecalho[1] & 0xE0 == 0xE0:
+        # Sincronismo de quadro MPEG: a camada 00 indica ADTS (AAC), as demais MP3
+        return 'aac' if cabecalho[1] & 0x06 == 0 else 'mp3'
+    return None
+
+
+def duracao_cabecalho(cabecalho, formato):
+    """
+    Lê a duração declarada no cabeçalho do contêiner (WAV e FLAC). Para os
+    demais formatos, ou se o cabeçalho não a informar, retorna None.
+    """
+    if formato == 'wav':
+        taxa_bytes, posicao = None, 12
+        while posicao + 8 <= len(cabecalho):
+            bloco, tamanho = struct.unpack_from('<4sI', cabecalho, posicao)
+            if bloco == b'fmt ' and posicao + 20 <= len(cabecalho):
+                taxa_bytes = struct.unpack_from('<I', cabecalho, posicao + 16)[0]
+            elif bloco == b'data':
+                # Tamanho 0 ou máximo indica WAV gravado em fluxo contínuo (sem duração)
+                if taxa_bytes and 0 < tamanho < 0xFFFFFFFF:
+                    return tamanho / taxa_bytes
+                return None
+            posicao += 8 + tamanho + (tamanho & 1)
+    elif formato == 'flac' and len(cabecalho) >= 42 and cabecalho[4] & 0x7F == 0:
+        # Bloco STREAMINFO: taxa de amostragem (20 bits) e total de amostras (36 bits)
+        info = cabecalho[8:42]
+        taxa = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+        amostras = ((info[13] & 0x0F) << 32) | struct.unpack_from('>I', info, 14)[0]
+        if taxa and amostras:
+            return amostras / taxa
+    return None
+
+
+def pre_validar_cabecalho(cabecalho, label):
+    """
+    Validação rápida pelos bytes iniciais, antes de iniciar o ffmpeg: rejeita
+    conteúdos que não são áudio em um formato suportado e áudios cuja duração
+    declarada no cabeçalho é curta demais.
+
+    Returns:
+    dict | None: Dicionário de erro (mesmo formato de `check_audio`) ou None
+    se o áudio pode seguir para a decodificação.
+    """
+    formato = identificar_formato(cabecalho)
+    if formato is None:
+        logger.error("Conteúdo não reconhecido como áudio suportado: %s", label)
+        return {"status": "error", "message": "Tipo de arquivo inválido, não é áudio."}
+
+    duracao = duracao_cabecalho(cabecalho, formato)
+    if duracao is not None and duracao < 0.1:
+        logger.error("Áudio muito curto (duração no cabeçalho: %ss): %s", duracao, label)
+        return {"status": "error", "message": "Áudio muito curto para processamento."}
+    return None
+
+
+def _decode_command(input_arg):
+    """
+    Monta o comando ffmpeg de validação e decodificação em uma única passagem.
+    """
+    return [
+        'ffmpeg', '-hide_banner', '-nostats', '-i', input_arg,
+        '-vn', '-ac', str(TARGET_CHANNELS), '-ar', str(TARGET_SAMPLE_RATE),
+        '-acodec', 'pcm_s16le', '-f', 's16le', 'pipe:1',
+    ]
+
+
+def _feed_stdin(process, stream, counter, inicio=b'', chunk_size=64 * 1024):
+    """
+    Copia o stream de upload (precedido dos bytes já lidos em `inicio`) para a
+    entrada padrão do ffmpeg em blocos, contabilizando os bytes enviados.
+    Acima de MAX_AUDIO_SIZE_BYTES o ffmpeg é encerrado sem ler o restante.
+    """
+    try:
+        for chunk in chain((inicio,), iter(lambda: stream.read(chunk_size), b'')):
+            counter["bytes"] += len(chunk)
+            if counter["bytes"] > MAX_AUDIO_SIZE_BYTES:
+                process.kill()
+                break
+            process.stdin.write(chunk)
+    except (BrokenPipeError, OSError):
+        # O ffmpeg encerrou antes de consumir toda a entrada (arquivo inválido)
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+
+def decode_audio(source, inicio=b''):
+    """
+    Executa um único processo ffmpeg que valida e decodifica o áudio para
+    PCM 16 kHz mono de 16 bits.
+
+    Parameters:
+    source (str | file-like): Caminho do arquivo ou stream binário. Streams
+    são enviados ao ffmpeg pela entrada padrão, sem gravação em disco.
+    inicio (bytes): Bytes do stream já lidos (cabeçalho), enviados antes do restante.
+
+    Returns:
+    dict: 'returncode', 'pcm' (bytes), 'input_bytes' e os metadados extraídos
+    do stderr.
+    """
+    from_stream = not isinstance(source, str)
+    with limitador_transcodificacao.vaga():
+        process = subprocess.Popen(
+            _decode_command('pipe:0' if from_stream else source),
+            stdin=subprocess.PIPE if from_stream else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        # O processo é encerrado se ultrapassar o tempo limite por áudio
+        expirado = threading.Event()
+
+        def encerrar():
+            expirado.set()
+            process.kill()
+
+        timer = threading.Timer(TRANSCODIFICACAO_TIMEOUT, encerrar)
+        timer.start()
+
+        # stdin e stderr são atendidos em threads para evitar deadlock nos pipes
+        counter = {"bytes": 0}
+        stderr_chunks = []
+        threads = [threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)]
+        if from_stream:
+            threads.append(threading.Thread(target=_feed_stdin, args=(process, source, counter, inicio), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        pcm = process.stdout.read()
+        process.wait()
+        timer.cancel()
+        for thread in threads:
+            thread.join()
+
+    if expirado.is_set():
+        logger.error("Tempo limite de transcodificação excedido (%ss).", TRANSCODIFICACAO_TIMEOUT)
+        raise SobrecargaTranscodificacao("Tempo limite de transcodificação excedido.", 1)
+
+    info = _parse_ffmpeg_stderr(b''.join(stderr_chunks).decode('utf-8', errors='replace'))
+    info["returncode"] = process.returncode
+    info["pcm"] = pcm
+    info["input_bytes"] = counter["bytes"] if from_stream else os.path.getsize(source)
+    return info
+
+
+async def decode_audio_async(chunks, inicio=b''):
+    """
+    Versão assíncrona de `decode_audio` para streams: os blocos de `chunks`
+    (iterador assíncrono de bytes), precedidos de `inicio`, são enviados ao
+    ffmpeg pela entrada padrão, sem bloquear o loop de eventos.
+    """
+    loop = asyncio.get_running_loop()
+    aquisicao = loop.run_in_executor(None, contextvars.copy_context().run, limitador_transcodificacao.adquirir)
+    try:
+        adquirido_em = await asyncio.shield(aquisicao)
+    except asyncio.CancelledError:
+        # Requisição cancelada enquanto aguardava: a vaga é devolvida ao ser obtida
+        aquisicao.add_done_callback(
+            lambda f: f.cancelled() or f.exception() or limitador_transcodificacao.liberar(f.result())
+        )
+        raise
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *_decode_command('pipe:0'),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        counter = {"bytes": 0}
+
+        async def feed():
+            try:
+                chunk = inicio
+                while True:
+                    counter["bytes"] += len(chunk)
+                    if counter["bytes"] > MAX_AUDIO_SIZE_BYTES:
+                        # Acima do limite: o ffmpeg é encerrado sem ler o restante
+                        process.kill()
+                        break
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+                    chunk = await anext(chunks, b'')
+                    if not chunk:
+                        break
+            except (BrokenPipeError, ConnectionResetError):
+                # O ffmpeg encerrou antes de consumir toda a entrada (arquivo inválido)
+                pass
+            finally:
+                process.stdin.close()
+
+        # O processo é encerrado se ultrapassar o tempo limite por áudio
+        try:
+            _, pcm, stderr = await asyncio.wait_for(
+                asyncio.gather(feed(), process.stdout.read(), process.stderr.read()),
+                timeout=TRANSCODIFICACAO_TIMEOUT,
+            )
+            await process.wait()
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.error("Tempo limite de transcodificação excedido (%ss).", TRANSCODIFICACAO_TIMEOUT)
+            raise SobrecargaTranscodificacao("Tempo limite de transcodificação excedido.", 1)
+    finally:
+        limitador_transcodificacao.liberar(adquirido_em)
+
+    info = _parse_ffmpeg_stderr(stderr.decode('utf-8', errors='replace'))
+    info["returncode"] = process.returncode
+    info["pcm"] = pcm
+    info["input_bytes"] = counter["bytes"]
+    return info
+
+
+def _validate_decoded(decoded, label):
+    """
+    Aplica as verificações de tamanho, integridade, duração, codec e volume sobre o
+    resultado de `decode_audio` e monta o dicionário de resposta.
+    """
+    # Verificar tamanho do áudio recebido (uploads acima do limite são
+    # interrompidos durante o envio ao ffmpeg)
+    if decoded["input_bytes"] > MAX_AUDIO_SIZE_BYTES:
+        logger.error("Arquivo de áudio acima de %s MB: %s", MAX_AUDIO_SIZE_MB, label)
+        return {"status": "error", "message": f"Arquivo excede o limite de {MAX_AUDIO_SIZE_MB} MB."}
+
+    if decoded["returncode"] != 0 or not decoded["pcm"]:
+        logger.error("Arquivo corrompido ou ilegível: %s", label)
+        return {"status": "error", "message": "Arquivo corrompido ou ilegível."}
+
+    # Verificação do tempo de duração (o PCM decodificado é a referência
+    # quando o contêiner não informa a duração)
+    duration = decoded["duration"]
+    if duration is None:
+        duration = len(decoded["pcm"]) / (TARGET_SAMPLE_RATE * TARGET_CHANNELS * SAMPLE_WIDTH)
+    if duration < 0.1:
+        logger.error("Áudio muito curto (duração: %ss): %s", duration, label)
+        return {"status": "error", "message": "Áudio muito curto para processamento."}
+
+    # Verificação do codec de áudio (pcm_s16le, pcm_f32le... contam como pcm)
+    codec = decoded["codec"]
+    if codec.split('_')[0] not in SUPPORTED_CODECS:
+        logger.error("Codec de áudio não suportado: %s", codec)
+        return {"status": "error", "message": f"Codec não suportado: {codec}"}
+
+    # Verificação de volume do áudio, analisado sobre o próprio PCM decodificado
+    volume = analisar_volume(decoded["pcm"], TARGET_SAMPLE_RATE)
+    if volume["max_volume"] < VOLUME_MINIMO_DB:
+        logger.warning("Áudio pode estar mudo ou com volume muito baixo: %s", label)
+        return {"status": "warning", "message": "Áudio com volume muito baixo ou mudo."}
+
+    # O silêncio no início e no fim não é enviado ao reconhecedor
+    pcm = cortar_silencio(decoded["pcm"], TARGET_SAMPLE_RATE, volume, sample_width=SAMPLE_WIDTH)
+    logger.debug("Silêncio removido: %s bytes de PCM (%s).", len(decoded['pcm']) - len(pcm), label)
+
+    logger.info("Áudio validado com sucesso: %s", label)
+    return {
+        "status": "success",
+        "message": "Áudio validado com sucesso.",
+        "duration": duration,
+        "codec": codec,
+        "volume": volume,
+        "pcm": pcm,
+        "sample_rate": TARGET_SAMPLE_RATE,
+        "sample_width": SAMPLE_WIDTH,
+    }
+
 
 def check_audio(file_path):
     """
-    Função que valida o arquivo de áudio com várias verificações:
+    Função que valida o arquivo de áudio e o decodifica em uma única passagem:
     1. Verifica se o arquivo existe.
     2. Verifica se o tipo do arquivo é compatível com os formatos suportados.
-    3. Usa o ffmpeg para verificar se o áudio pode ser lido e decodificado corretamente.
-    4. Verifica se o arquivo contém dados de áudio válidos.
-    5. Verifica o tamanho do arquivo.
-    6. Verifica permissões de leitura e escrita.
-    7. Verifica se o áudio contém som (não está mudo).
-    8. Verifica o codec do áudio.
-    9. Verifica integridade do arquivo.
-    10. Verifica a versão do ffmpeg.
-    11. Retorna um dicionário com status e mensagens de erro.
+    3. Verifica o tamanho do arquivo.
+    4. Verifica permissões de leitura.
+    5. Identifica o formato pela assinatura do cabeçalho e rejeita áudios
+       cuja duração declarada é curta demais, sem iniciar o ffmpeg.
+    6. Executa um único processo ffmpeg que verifica a integridade, extrai
+       duração e codec e decodifica para PCM 16 kHz mono.
+    7. Verifica a duração, o codec e, pela análise do PCM, se o áudio contém
+       som (não está mudo); o silêncio inicial e final é removido do PCM.
+    8. Retorna um dicionário com status e mensagens de erro. Em caso de
+       sucesso, inclui também 'duration', 'codec', 'volume', 'pcm',
+       'sample_rate' e 'sample_width', para que as etapas seguintes não
+       precisem validar ou decodificar o arquivo novamente.
     """
     # Verificar existência do arquivo
     if not os.path.isfile(file_path):
-        logger.error(f"Arquivo não encontrado: {file_path}")
+        logger.error("Arquivo não encontrado: %s", file_path)
         return {"status": "error", "message": "Arquivo não encontrado."}
 
     # Verificar tipo MIME
     mime_type, encoding = mimetypes.guess_type(file_path)
     if mime_type is None or not mime_type.startswith('audio'):
-        logger.error(f"Tipo de arquivo inválido: {mime_type}")
+        logger.error("Tipo de arquivo inválido: %s", mime_type)
         return {"status": "error", "message": "Tipo de arquivo inválido, não é áudio."}
 
     # Verificar extensão
     _, ext = os.path.splitext(file_path)
     if ext.lower() not in SUPPORTED_FORMATS:
-        logger.error(f"Formato de áudio não suportado: {ext}")
+        logger.error("Formato de áudio não suportado: %s", ext)
         return {"status": "error", "message": f"Formato não suportado: {ext}"}
 
     # Verificar tamanho do arquivo
     file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
     if file_size_mb > MAX_AUDIO_SIZE_MB:
-        logger.error(f"Arquivo de áudio muito grande: {file_size_mb:.2f} MB.")
+        logger.error("Arquivo de áudio muito grande: %.2f MB.", file_size_mb)
         return {"status": "error", "message": f"Arquivo excede o limite de {MAX_AUDIO_SIZE_MB} MB."}
 
     # Verificar permissões de leitura do arquivo
     if not os.access(file_path, os.R_OK):
-        logger.error(f"Permissão de leitura negada para o arquivo: {file_path}")
+        logger.error("Permissão de leitura negada para o arquivo: %s", file_path)
         return {"status": "error", "message": "Permissão de leitura negada."}
 
-    # Verificar permissões de escrita no diretório de destino
-    output_dir = os.path.dirname(file_path)
-    if not os.access(output_dir, os.W_OK):
-        logger.error(f"Permissão de escrita negada no diretório: {output_dir}")
-        return {"status": "error", "message": "Permissão de escrita negada no diretório."}
+    # Verificar assinatura e duração declaradas no cabeçalho
+    with open(file_path, 'rb') as arquivo:
+        erro = pre_validar_cabecalho(arquivo.read(TAMANHO_CABECALHO), file_path)
+    if erro:
+        return erro
 
-    # Verificar integridade do arquivo (usando ffmpeg)
     try:
-        subprocess.run(['ffmpeg', '-v', 'error', '-i', file_path, '-f', 'null', '-'], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError:
-        logger.error(f"Arquivo corrompido ou ilegível: {file_path}")
-        return {"status": "error", "message": "Arquivo corrompido ou ilegível."}
+        return _validate_decoded(decode_audio(file_path), file_path)
+    except SobrecargaTranscodificacao:
+        raise
+    except Exception as e:
+        logger.error("Erro ao analisar o áudio: %s. Erro: %s", file_path, str(e))
+        return {"status": "error", "message": "Erro ao analisar o áudio."}
+
+
+def check_audio_stream(stream, label='upload'):
+    """
+    Valida e decodifica um áudio recebido como stream binário (por exemplo,
+    o upload da requisição), enviando-o diretamente ao ffmpeg sem gravar
+    arquivos temporários. O formato é identificado pelo conteúdo, não pela
+    extensão, e conteúdos inválidos são recusados pelo cabeçalho antes de
+    iniciar o ffmpeg. Retorna o mesmo dicionário de `check_audio`.
+
+    Raises:
+    SobrecargaTranscodificacao: sem vaga para o ffmpeg ou tempo limite excedido.
+    """
+    try:
+        cabecalho = stream.read(TAMANHO_CABECALHO)
+        erro = pre_validar_cabecalho(cabecalho, label)
+        if erro:
+            return erro
+        return _validate_decoded(decode_audio(stream, cabecalho), label)
+    except SobrecargaTranscodificacao:
+        raise
+    except Exception as e:
+        logger.error("Erro ao analisar o áudio: %s. Erro: %s", label, str(e))
+        return {"status": "error", "message": "Erro ao analisar o áudio."}
 
-    # Verificar informações do áudio com ffmpeg ou pydub
+async def check_audio_stream_async(chunks, label='upload'):
+    """
+    Versão assíncrona de `check_audio_stream`, que recebe o áudio como
+    iterador assíncrono de blocos de bytes.
+    """
     try:
-        audio_info = mediainfo(file_path)
-        if not audio_info or 'duration' not in audio_info:
-            logger.error(f"Áudio corrompido ou ilegível: {file_path}")
-            return {"status": "error", "message": "Áudio corrompido ou ilegível."}
-
-        # Verificação do tempo de duração
-        duration = float(audio_info['duration'])
-        if duration < 0.1:
-            logger.error(f"Áudio muito curto (duração: {duration}s): {file_path}")
-            return {"status": "error", "message": "Áudio muito curto para processamento."}
-
-       # Verificação do codec de áudio
-        codec = audio_info.get('codec_name', '').lower()
-        if codec not in ['mp3', 'aac', 'vorbis', 'pcm', 'flac']:
-            logger.error(f"Codec de áudio não suportado: {codec}")
-            return {"status": "error", "message": f"Codec não suportado: {codec}"}
-
-        # Verificação de volume do áudio
-        output = subprocess.check_output(['ffmpeg', '-i', file_path, '-af', 'volumedetect', '-f', 'null', '/dev/null'], stderr=subprocess.STDOUT)
-        if b"max_volume" not in output:
-            logger.warning(f"Áudio pode estar mudo ou com volume muito baixo: {file_path}")
-            return {"status": "warning", "message": "Áudio com volume muito baixo ou mudo."}
-
-        logger.info(f"Áudio validado com sucesso: {file_path}")
-        return {"status": "success", "message": "Áudio validado com sucesso."}
+        # Acumula os primeiros blocos até ter o cabeçalho completo
+        cabecalho = b''
+        async for chunk in chunks:
+            cabecalho += chunk
+            if len(cabecalho) >= TAMANHO_CABECALHO:
+                break
+        erro = pre_validar_cabecalho(cabecalho, label)
+        if erro:
+            return erro
+        return _validate_decoded(await decode_audio_async(chunks, cabecalho), label)
+    except SobrecargaTranscodificacao:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao analisar o áudio: {file_path}. Erro: {str(e)}")
+        logger.error("Erro ao analisar o áudio: %s. Erro: %s", label, str(e))
         return {"status": "error", "message": "Erro ao analisar o áudio."}
 
+def verificar_ffmpeg():
+    """
+    Verifica uma única vez por processo se o ffmpeg está disponível. O
+    resultado fica guardado e é herdado pelos workers criados por fork.
+
+    Returns:
+    str | None: Primeira linha de `ffmpeg -version`, ou None se o ffmpeg não funcionar.
+    """
+    global _versao_ffmpeg
+    if _versao_ffmpeg is None:
+        try:
+            _versao_ffmpeg = subprocess.check_output(['ffmpeg', '-version'], stderr=subprocess.STDOUT).decode().splitlines()[0]
+            logger.info("Versão do ffmpeg: %s", _versao_ffmpeg)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error("Erro ao obter versão do ffmpeg: %s", e)
+            _versao_ffmpeg = ''
+    return _versao_ffmpeg or None
+
 def convert_audio_format(file_path, target_format='wav'):
     """
     Converte o arquivo de áudio para o formato desejado utilizando ffmpeg.
     """
-    # Verificação de versão do ffmpeg
-    try:
-        ffmpeg_version = subprocess.check_output(['ffmpeg', '-version'], stderr=subprocess.STDOUT).decode()
-        logger.info(f"Versão do ffmpeg: {ffmpeg_version.splitlines()[0]}")
-    except subprocess.CalledProcessError:
-        logger.error("Erro ao obter versão do ffmpeg.")
+    if not verificar_ffmpeg():
         return {"status": "error", "message": "Erro ao verificar versão do ffmpeg."}
 
     ## Conversão de áudio
     try:
         output_path = f"{os.path.splitext(file_path)[0]}.{target_format}"
         subprocess.run(['ffmpeg', '-i', file_path, '-vn', '-f', target_format, output_path], check=True)
-        logger.info(f"Áudio convertido com sucesso: {output_path}")
+        logger.info("Áudio convertido com sucesso: %s", output_path)
         return {"status": "success", "message": "Conversão realizada com sucesso.", "output_file": output_path}
     except subprocess.CalledProcessError as e:
-        logger.error(f"Erro ao converter o áudio: {file_path}. Erro: {str(e)}")
+        logger.error("Erro ao converter o áudio: %s. Erro: %s", file_path, str(e))
         return {"status": "error", "message": "Erro ao converter o áudio."}
@@ -0,0 +1,97 @@
+import os
+import re
+import logging
+import unicodedata
+
+# Frases de comando de pesquisa; a consulta é o texto que vem depois da frase
+COMANDOS_PADRAO = [
+    "pesquisar",
+    "buscar",
+    "me encontre",
+    "faça uma pesquisa sobre",
+    "procure",
+    "encontre",
+    "encontre informações sobre",
+    "quero ver",
+]
+
+# Frases configuráveis, separadas por vírgula (ex.: "pesquisar,buscar,quero ver")
+COMANDOS_PESQUISA = [
+    frase.strip() for frase in os.getenv('COMANDOS_PESQUISA', ','.join(COMANDOS_PADRAO)).split(',') if frase.strip()
+]
+
+# Variantes acentuadas de cada letra (ex.: 'c' -> 'cç'), para que as frases de
+# comando casem com ou sem acentos diretamente no texto original
+_VARIANTES = {}
+for _letra in map(chr, range(0xC0, 0x100)):
+    _base = unicodedata.normalize('NFD', _letra.lower())[0]
+    if _base != _letra.lower() and _letra.lower() not in _VARIANTES.get(_base, ''):
+        _VARIANTES[_base] = _VARIANTES.get(_base, _base) + _letra.lower()
+
+
+def _remover_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if not unicodedata.combining(c))
+
+
+def _padrao_palavra(palavra):
+    """
+    Expressão regular de uma palavra que aceita as variantes com e sem acento.
+    """
+    return ''.join(
+        f"[{_VARIANTES[letra]}]" if letra in _VARIANTES else re.escape(letra)
+        for letra in _remover_acentos(palavra).lower()
+    )
+
+
+class IdentificadorComandos:
+    """
+    Identifica o comando de pesquisa em uma transcrição com uma única
+    expressão regular, compilada uma vez: uma alternância entre as frases de
+    comando (com ou sem acentos, com qualquer espaçamento entre as palavras). Frases
+    mais longas vêm primeiro, para que "encontre informações sobre" tenha
+    precedência sobre "encontre"; entre posições diferentes, vale o comando
+    que aparece primeiro no texto.
+    """
+
+    def __init__(self, frases):
+        self.frases = sorted(frases, key=lambda frase: len(frase.split()), reverse=True)
+        alternativas = '|'.join(
+            f"(?P<c{indice}>" + r'\s+'.join(_padrao_palavra(palavra) for palavra in frase.split()) + ")"
+            for indice, frase in enumerate(self.frases)
+        )
+        self._padrao = re.compile(rf"\b(?:{alternativas})\b\s*", re.IGNORECASE)
+
+    def identificar(self, texto):
+        """
+        Parameters:
+        texto (str): Texto transcrito.
+
+        Returns:
+        tuple[str, str | None]: Consulta (texto após o comando, ou o texto
+        inteiro sem comando) e a frase de comando identificada (ou None).
+        """
+        match = self._padrao.search(texto)
+        if not match:
+            return texto.strip(), None
+        comando = self.frases[int(match.lastgroup[1:])]
+        return texto[match.end():].strip(), comando
+
+
+identificador_comandos = IdentificadorComandos(COMANDOS_PESQUISA)
+
+
+def identificar_comando(texto):
+    """
+    Retorna a consulta e o comando de pesquisa identificados no texto.
+    """
+    consulta, comando = identificador_comandos.identificar(texto)
+    if comando:
+        logging.info("Comando de pesquisa identificado (%s): %s", comando, consulta)
+    else:
+        logging.info("Texto filtrado sem comando específico: %s", consulta)
+    return consulta, comando
+
+
+# Função de filtragem de comandos de pesquisa
+def filtrar_por_palavra_chave(texto):
+    return identificar_comando(texto)[0]
@@ -0,0 +1,198 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+from time import monotonic
+
+from metricas import registro
+
+# Nível mínimo dos registros e destino (arquivo rotativo e, opcionalmente, o terminal)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs'))
+LOG_FILE = os.path.join(LOG_DIR, 'api.log')
+LOG_CONSOLE = os.getenv('LOG_CONSOLE', 'true').lower() in ('1', 'true', 'sim')
+
+# Rotação do api.log: 'interna' (o próprio processo rotaciona a cada 10 MB, mantendo 5
+# arquivos) ou 'externa' (o arquivo é apenas reaberto quando o logrotate o move). Com vários
+# processos no mesmo arquivo (workers do gunicorn), cada um rotacionaria por conta própria e
+# perderia registros; por isso o gunicorn.conf.py usa 'externa'
+LOG_ROTACAO = os.getenv('LOG_ROTACAO', 'interna').lower()
+
+# 'texto' (uma linha legível por registro) ou 'json' (um objeto JSON por linha)
+LOG_FORMATO = os.getenv('LOG_FORMATO', 'texto').lower()
+
+# Registros DEBUG/INFO com a mesma mensagem (antes da formatação) aceitos por
+# segundo; os excedentes são descartados (0 desativa a limitação)
+LOG_LIMITE_POR_SEGUNDO = float(os.getenv('LOG_LIMITE_POR_SEGUNDO', 5))
+
+# Registros aguardando escrita; com a fila cheia, novos registros são descartados
+LOG_FILA_MAX = int(os.getenv('LOG_FILA_MAX', 10000))
+
+FORMATO_TEXTO = '%(asctime)s - %(levelname)s - [%(request_id)s] %(name)s - %(message)s'
+
+registros_descartados = registro.contador(
+    'log_registros_descartados_total', 'Registros de log descartados, por motivo.', ['motivo'])
+
+# Identificador da requisição em andamento, anexado a cada registro
+id_requisicao = contextvars.ContextVar('id_requisicao', default='-')
+
+_ID_VALIDO = re.compile(r'^[\w.-]{1,64}$')
+
+
+def definir_id_requisicao(valor=None):
+    """
+    Define o identificador da requisição atual (por exemplo, o cabeçalho
+    X-Request-ID recebido). Valores ausentes ou inválidos são substituídos por
+    um identificador novo.
+
+    Returns:
+    str: Identificador em uso.
+    """
+    if not valor or not _ID_VALIDO.match(valor):
+        valor = secrets.token_hex(8)
+    id_requisicao.set(valor)
+    return valor
+
+
+class LimitadorLog(logging.Filter):
+    """
+    Limita os registros DEBUG e INFO a `limite` por segundo para cada mensagem
+    (mesmo logger e mesmo texto antes da formatação), com um balde de fichas
+    por mensagem. Registros WARNING ou mais graves nunca são descartados, nem
+    os marcados com `extra={"amostragem": False}` (ex.: as consultas do log,
+    contadas pelo pré-aquecimento do cache).
+    """
+
+    MAX_MENSAGENS = 4096
+
+    def __init__(self, limite):
+        super().__init__()
+        self.limite = limite
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.limite <= 0 or not getattr(record, 'amostragem', True):
+            return True
+        chave = (record.name, record.msg if isinstance(record.msg, str) else str(record.msg))
+        agora = monotonic()
+        with self._lock:
+            fichas, ultimo = self._baldes.get(chave, (self.limite, agora))
+            fichas = min(self.limite, fichas + (agora - ultimo) * self.limite)
+            if len(self._baldes) >= self.MAX_MENSAGENS and chave not in self._baldes:
+                self._baldes.clear()
+            aceito = fichas >= 1
+            self._baldes[chave] = (fichas - 1 if aceito else fichas, agora)
+        if not aceito:
+            registros_descartados.inc(motivo='amostragem')
+        return aceito
+
+
+class HandlerFila(QueueHandler):
+    """
+    Enfileira os registros sem formatá-los: a formatação da mensagem e a
+    escrita acontecem na thread de escrita. Só o identificador da requisição
+    (que depende do contexto de quem registra) é capturado aqui.
+    """
+
+    def prepare(self, record):
+        record.request_id = id_requisicao.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            registros_descartados.inc(motivo='fila_cheia')
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Um objeto JSON por registro, com os campos estruturados separados da mensagem.
+    """
+
+    def format(self, record):
+        dados = {
+            "ts": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, 'request_id', '-'),
+            "mensagem": record.getMessage(),
+        }
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False)
+
+
+_handler_fila = None
+_ouvinte = None
+_destinos = []
+
+
+def _iniciar_ouvinte():
+    global _ouvinte
+    fila = queue.Queue(LOG_FILA_MAX)
+    _handler_fila.queue = fila
+    _ouvinte = QueueListener(fila, *_destinos, respect_handler_level=True)
+    _ouvinte.start()
+
+
+def configurar_logging(nivel=LOG_LEVEL):
+    """
+    Configura o logging do processo (uma única vez): o logger raiz apenas
+    enfileira os registros e uma thread em segundo plano os formata e grava
+    em LOG_FILE, com a rotação de LOG_ROTACAO (e no terminal, com LOG_CONSOLE). Substitui
+    handlers configurados anteriormente no logger raiz.
+    """
+    global _handler_fila
+    if _handler_fila is not None:
+        return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    formatador = FormatadorJSON() if LOG_FORMATO == 'json' else logging.Formatter(FORMATO_TEXTO)
+    if LOG_ROTACAO == 'externa':
+        _destinos.append(WatchedFileHandler(LOG_FILE))
+    else:
+        _destinos.append(RotatingFileHandler(LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5))
+    if LOG_CONSOLE:
+        _destinos.append(logging.StreamHandler())
+    for destino in _destinos:
+        destino.setFormatter(formatador)
+
+    _handler_fila = HandlerFila(None)
+    _handler_fila.addFilter(LimitadorLog(LOG_LIMITE_POR_SEGUNDO))
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(_handler_fila)
+    raiz.setLevel(getattr(logging, nivel, logging.INFO))
+
+    _iniciar_ouvinte()
+    atexit.register(encerrar_logging)
+
+
+def encerrar_logging():
+    """
+    Grava os registros pendentes e encerra a thread de escrita.
+    """
+    global _ouvinte
+    if _ouvinte is not None:
+        _ouvinte.stop()
+        _ouvinte = None
+
+
+def _apos_fork():
+    # A thread de escrita não existe no processo filho (ex.: workers do
+    # gunicorn): cada processo recebe uma fila e uma thread próprias
+    if _handler_fila is not None:
+        _iniciar_ouvinte()
+
+
+os.register_at_fork(after_in_child=_apos_fork)
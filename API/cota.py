@@ -0,0 +1,159 @@
+import os
+import math
+import asyncio
+import logging
+import contextvars
+from contextlib import contextmanager
+from time import monotonic, sleep, time
+
+from metricas import espera_cota, recusas_cota
+
+logger = logging.getLogger(__name__)
+
+# Faixas de prioridade das chamadas a serviços externos
+INTERATIVO = 'interativo'        # um usuário aguarda a resposta
+LOTE = 'lote'                    # itens de /processar_audio_lote e pré-renderização
+SEGUNDO_PLANO = 'segundo_plano'  # renovação do cache
+
+# Fração da rajada reservada às chamadas interativas e espera máxima por ficha (segundos) em cada faixa
+COTA_RESERVA_INTERATIVA = float(os.getenv('COTA_RESERVA_INTERATIVA', 0.3))
+COTA_ESPERA_MAX = {
+    INTERATIVO: float(os.getenv('COTA_ESPERA_MAX_INTERATIVO', 5)),
+    LOTE: float(os.getenv('COTA_ESPERA_MAX_LOTE', 30)),
+    SEGUNDO_PLANO: float(os.getenv('COTA_ESPERA_MAX_SEGUNDO_PLANO', 0)),
+}
+
+# Intervalo máximo entre duas tentativas de obter uma ficha (outros processos disputam o mesmo balde)
+_INTERVALO_TENTATIVAS = 0.25
+
+faixa_atual = contextvars.ContextVar('faixa_prioridade', default=INTERATIVO)
+
+
+@contextmanager
+def prioridade(faixa):
+    """
+    Define a faixa de prioridade das chamadas a serviços externos feitas
+    dentro do bloco `with` (na thread ou tarefa atual):
+
+        with prioridade(SEGUNDO_PLANO):
+            ...
+    """
+    token = faixa_atual.set(faixa)
+    try:
+        yield
+    finally:
+        faixa_atual.reset(token)
+
+
+class CotaEsgotada(Exception):
+    """
+    Erro lançado quando não há ficha da cota do serviço dentro da espera
+    permitida para a faixa. `retry_after` sugere em quantos segundos o
+    cliente deve tentar novamente.
+    """
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class CotaCompartilhada:
+    """
+    Balde de fichas (token bucket) de um serviço externo, compartilhado por
+    todos os processos que usam o mesmo diretório de cache: o estado (fichas
+    e instante da última reposição) fica em `armazenamento` (o diskcache de
+    estado compartilhado, sem remoção por tamanho, para que a cota não volte
+    à rajada cheia) e é atualizado dentro de uma transação do SQLite, então
+    os workers do gunicorn e o servidor asyncio dividem o mesmo orçamento de
+    `por_minuto` chamadas, com rajadas de até `rajada` chamadas.
+
+    Todas as faixas disputam o mesmo balde, mas LOTE e SEGUNDO_PLANO só levam
+    uma ficha se ainda sobrar a reserva das chamadas interativas
+    (`reserva` * `rajada` fichas). Cada faixa aguarda por uma ficha no máximo
+    COTA_ESPERA_MAX[faixa] segundos. `por_minuto` <= 0 desativa a cota.
+    """
+
+    def __init__(self, servico, armazenamento, por_minuto, rajada, reserva=COTA_RESERVA_INTERATIVA):
+        self.servico = servico
+        self.taxa = por_minuto / 60
+        self.rajada = max(1, rajada)
+        self.reserva = reserva
+        self._armazenamento = armazenamento
+        self._chave = "cota:" + servico
+
+    @property
+    def ativa(self):
+        return self.taxa > 0
+
+    def _minimo(self, faixa):
+        return 1 if faixa == INTERATIVO else 1 + self.reserva * self.rajada
+
+    def _reservar(self, faixa):
+        """
+        Tenta consumir uma ficha do balde.
+
+        Returns:
+        float: 0 se a ficha foi obtida; senão, a estimativa em segundos até haver ficha para a faixa.
+        """
+        agora = time()
+        minimo = self._minimo(faixa)
+        with self._armazenamento.transact(retry=True):
+            fichas, reposto_em = self._armazenamento.get(self._chave, default=(self.rajada, agora))
+            # Após uma pausa (429), reposto_em fica no futuro e o balde só volta a encher a partir dali
+            if reposto_em < agora:
+                fichas = min(self.rajada, fichas + (agora - reposto_em) * self.taxa)
+                reposto_em = agora
+            if fichas >= minimo:
+                self._armazenamento.set(self._chave, (fichas - 1, reposto_em))
+                return 0.0
+        return (reposto_em - agora) + (minimo - fichas) / self.taxa
+
+    def _proxima_espera(self, faixa, inicio):
+        espera = self._reservar(faixa)
+        if espera and monotonic() - inicio + espera > COTA_ESPERA_MAX[faixa]:
+            recusas_cota.inc(servico=self.servico, faixa=faixa)
+            raise CotaEsgotada(f"Cota de {self.servico} esgotada para a faixa {faixa}.", math.ceil(espera))
+        return min(espera, _INTERVALO_TENTATIVAS)
+
+    def adquirir(self, faixa=None):
+        """
+        Consome uma ficha da cota, aguardando se necessário. Sem `faixa`, usa a
+        do contexto atual (ver `prioridade`).
+
+        Raises:
+        CotaEsgotada: se não houver ficha dentro da espera máxima da faixa.
+        """
+        if not self.ativa:
+            return
+        faixa = faixa or faixa_atual.get()
+        inicio = monotonic()
+        espera = self._proxima_espera(faixa, inicio)
+        while espera:
+            sleep(espera)
+            espera = self._proxima_espera(faixa, inicio)
+        espera_cota.observar(monotonic() - inicio, servico=self.servico, faixa=faixa)
+
+    async def adquirir_async(self, faixa=None):
+        """
+        Versão de `adquirir` que aguarda sem bloquear o loop de eventos.
+        """
+        if not self.ativa:
+            return
+        faixa = faixa or faixa_atual.get()
+        inicio = monotonic()
+        espera = self._proxima_espera(faixa, inicio)
+        while espera:
+            await asyncio.sleep(espera)
+            espera = self._proxima_espera(faixa, inicio)
+        espera_cota.observar(monotonic() - inicio, servico=self.servico, faixa=faixa)
+
+    def pausar(self, segundos):
+        """
+        Esvazia o balde e suspende a reposição por `segundos` (ex.: o provedor
+        respondeu 429 com Retry-After), para todos os processos.
+        """
+        if not self.ativa:
+            return
+        with self._armazenamento.transact(retry=True):
+            _, reposto_em = self._armazenamento.get(self._chave, default=(0, 0))
+            self._armazenamento.set(self._chave, (0, max(reposto_em, time() + segundos)))
+        logger.warning("Cota de %s pausada por %s segundos após limite do provedor.", self.servico, segundos)
@@ -0,0 +1,82 @@
+"""
+Configuração do servidor de produção (gunicorn, com pré-fork):
+
+    cd API && gunicorn -c gunicorn.conf.py
+
+O app é importado uma única vez no processo mestre (preload_app) e aquecido
+antes do fork: ffmpeg verificado, gTTS e reconhecedor carregados e segmentos
+de resposta pré-renderizados. Os workers herdam essas páginas de memória
+(copy-on-write) e só abrem os recursos próprios de cada processo (conexão
+com o cache e threads de renovação), ficando prontos logo após o fork. O
+snapshot do cache (CACHE_SNAPSHOT_IMPORTAR) também é importado no mestre.
+"""
+import glob
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+# As variáveis do .env também valem para esta configuração, lida antes do app
+load_dotenv()
+
+wsgi_app = 'app:app'
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+
+# Processos e threads por processo (o pipeline é dominado por E/S: ffmpeg e serviços externos)
+workers = int(os.getenv('GUNICORN_WORKERS', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# O limite de processos ffmpeg vale por processo: sem configuração explícita, os núcleos
+# são divididos entre os workers (e não um limite do tamanho da máquina em cada um)
+os.environ.setdefault('TRANSCODIFICACAO_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+# Todos os workers gravam no mesmo api.log: a rotação fica com o logrotate (ver README),
+# já que processos rotacionando o mesmo arquivo perderiam registros
+os.environ.setdefault('LOG_ROTACAO', 'externa')
+
+# Cada worker publica as suas métricas neste diretório e /metrics soma as de todos eles,
+# qualquer que seja o worker que atenda a coleta
+if not os.getenv('METRICAS_DIR'):
+    os.environ['METRICAS_DIR'] = os.path.join(tempfile.gettempdir(), f'metricas_{os.getpid()}')
+
+# Tempo máximo de uma requisição e de encerramento gracioso (em segundos)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Importa o app no mestre, antes do fork
+preload_app = True
+
+
+def on_starting(server):
+    """
+    Executado no mestre ao iniciar: descarta as métricas publicadas por workers
+    de uma execução anterior com o mesmo METRICAS_DIR.
+    """
+    for arquivo in glob.glob(os.path.join(os.environ['METRICAS_DIR'], '*.json')):
+        os.remove(arquivo)
+
+
+def when_ready(server):
+    """
+    Executado no mestre, com o app já importado e antes de criar os workers.
+    """
+    from audio_processing import aquecer
+    from cache.cache_manager import fechar_cache
+    from cache.snapshot import importar_snapshot_inicial
+
+    aquecer()
+    # Uma única importação do snapshot por nó, antes de os workers abrirem o cache
+    importar_snapshot_inicial()
+    # A conexão SQLite aberta pelo aquecimento não pode ser compartilhada entre processos
+    fechar_cache()
+
+
+def post_fork(server, worker):
+    """
+    Executado em cada worker, logo após o fork e antes de aceitar conexões.
+    """
+    from app import iniciar_worker
+
+    iniciar_worker()
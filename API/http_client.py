@@ -0,0 +1,229 @@
+import logging
+import threading
+from time import monotonic
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, HTTPError, Timeout, ConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitoAbertoError(RequestException):
+    """
+    Erro lançado quando o disjuntor está aberto e a requisição não é enviada.
+    """
+
+
+class Disjuntor:
+    """
+    Disjuntor (circuit breaker) para um serviço externo.
+
+    - fechado: as requisições passam normalmente;
+    - aberto: após `limite_falhas` falhas seguidas, as requisições falham
+      imediatamente durante `tempo_aberto` segundos;
+    - meio-aberto: passado esse tempo, uma única requisição de teste é
+      liberada; sucesso fecha o disjuntor, falha o abre novamente.
+    """
+
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio-aberto'
+
+    def __init__(self, nome, limite_falhas=5, tempo_aberto=30):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_em = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._estado()
+
+    def _estado(self):
+        if self._aberto_em is None:
+            return self.FECHADO
+        if monotonic() - self._aberto_em >= self.tempo_aberto:
+            return self.MEIO_ABERTO
+        return self.ABERTO
+
+    def permitir(self):
+        """
+        Indica se uma requisição pode ser enviada agora.
+        """
+        with self._lock:
+            estado = self._estado()
+            if estado == self.FECHADO:
+                return True
+            if estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self._aberto_em is not None:
+                logger.info("Disjuntor %s fechado após requisição de teste bem-sucedida.", self.nome)
+            self._falhas = 0
+            self._aberto_em = None
+            self._teste_em_andamento = False
+
+    def liberar_teste(self):
+        """
+        Libera a requisição de teste sem registrar resultado (por exemplo,
+        quando ela é cancelada), para que a próxima requisição possa testar.
+        """
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._aberto_em is not None or self._falhas >= self.limite_falhas:
+                if self._aberto_em is None:
+                    logger.warning("Disjuntor %s aberto após %s falhas seguidas.", self.nome, self._falhas)
+                self._aberto_em = monotonic()
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP compartilhado entre threads para um serviço externo.
+
+    Todas as sessões (uma por thread) usam o mesmo pool de conexões
+    keep-alive, limitado a `max_conexoes` por host. As respostas são pedidas
+    comprimidas e um disjuntor evita enviar requisições enquanto o serviço
+    está degradado.
+    """
+
+    def __init__(self, base_url, timeout=10, max_conexoes=10, limite_falhas=5, tempo_aberto=30):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.disjuntor = Disjuntor(base_url, limite_falhas, tempo_aberto)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes, pool_block=True)
+        self._local = threading.local()
+
+    def _sessao(self):
+        sessao = getattr(self._local, 'sessao', None)
+        if sessao is None:
+            sessao = requests.Session()
+            sessao.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+            sessao.mount('http://', self._adapter)
+            sessao.mount('https://', self._adapter)
+            self._local.sessao = sessao
+        return sessao
+
+    def get_json(self, params=None, path=''):
+        """
+        Envia um GET para base_url + path e retorna o corpo JSON.
+
+        Raises:
+        CircuitoAbertoError: se o disjuntor estiver aberto.
+        RequestException: em erros de rede ou respostas HTTP de erro.
+        """
+        if not self.disjuntor.permitir():
+            raise CircuitoAbertoError(f"Serviço {self.base_url} indisponível (disjuntor aberto).")
+
+        try:
+            response = self._sessao().get(self.base_url + path, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            dados = response.json()
+        except (ConnectionError, Timeout):
+            self.disjuntor.registrar_falha()
+            raise
+        except HTTPError as e:
+            # Apenas erros do servidor e limite de requisições indicam degradação
+            status = e.response.status_code if e.response is not None else 0
+            if status >= 500 or status == 429:
+                self.disjuntor.registrar_falha()
+            else:
+                self.disjuntor.registrar_sucesso()
+            raise
+        except Exception:
+            # Resposta inválida (JSON malformado) ou erro inesperado
+            self.disjuntor.registrar_falha()
+            raise
+        except BaseException:
+            # Interrompida sem resposta do serviço (ex.: KeyboardInterrupt)
+            self.disjuntor.liberar_teste()
+            raise
+
+        self.disjuntor.registrar_sucesso()
+        return dados
+
+    def fechar(self):
+        """
+        Fecha as conexões do pool compartilhado.
+        """
+        self._adapter.close()
+
+
+class ClienteHTTPAsync:
+    """
+    Equivalente assíncrono de `ClienteHTTP`, baseado em aiohttp, para uso no
+    pipeline asyncio. A sessão é criada no primeiro uso, dentro do loop de
+    eventos, e o disjuntor pode ser compartilhado com o cliente síncrono.
+    """
+
+    def __init__(self, base_url, timeout=10, max_conexoes=10, disjuntor=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_conexoes = max_conexoes
+        self.disjuntor = disjuntor or Disjuntor(base_url)
+        self._sessao = None
+
+    def _obter_sessao(self):
+        if self._sessao is None or self._sessao.closed:
+            self._sessao = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.max_conexoes),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                auto_decompress=True,
+            )
+        return self._sessao
+
+    async def get_json(self, params=None, path=''):
+        """
+        Envia um GET para base_url + path e retorna o corpo JSON.
+
+        Raises:
+        CircuitoAbertoError: se o disjuntor estiver aberto.
+        aiohttp.ClientError / asyncio.TimeoutError: em erros de rede ou HTTP.
+        """
+        if not self.disjuntor.permitir():
+            raise CircuitoAbertoError(f"Serviço {self.base_url} indisponível (disjuntor aberto).")
+
+        # Como no requests, parâmetros None não são enviados
+        params = {chave: valor for chave, valor in (params or {}).items() if valor is not None}
+        try:
+            async with self._obter_sessao().get(self.base_url + path, params=params) as response:
+                response.raise_for_status()
+                dados = await response.json(content_type=None)
+        except aiohttp.ClientResponseError as e:
+            # Apenas erros do servidor e limite de requisições indicam degradação
+            if e.status >= 500 or e.status == 429:
+                self.disjuntor.registrar_falha()
+            else:
+                self.disjuntor.registrar_sucesso()
+            raise
+        except Exception:
+            self.disjuntor.registrar_falha()
+            raise
+        except BaseException:
+            # Tarefa cancelada (asyncio.CancelledError) sem resposta do serviço
+            self.disjuntor.liberar_teste()
+            raise
+
+        self.disjuntor.registrar_sucesso()
+        return dados
+
+    async def fechar(self):
+        """
+        Fecha a sessão e as conexões do pool.
+        """
+        if self._sessao is not None and not self._sessao.closed:
+            await self._sessao.close()
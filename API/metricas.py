@@ -0,0 +1,272 @@
+import atexit
+import json
+import os
+import secrets
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, sleep
+
+# Limites dos buckets dos histogramas de duração (segundos)
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Com vários processos (gunicorn), cada um publica as suas métricas em METRICAS_DIR a cada
+# METRICAS_INTERVALO_PUBLICACAO segundos e /metrics soma as de todos eles
+METRICAS_DIR = os.getenv('METRICAS_DIR', '')
+METRICAS_INTERVALO_PUBLICACAO = float(os.getenv('METRICAS_INTERVALO_PUBLICACAO', 5))
+
+
+def _rotulos(nomes, valores, extra=''):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Contador:
+    """
+    Contador monotônico com rótulos, no formato de contador do Prometheus.
+    """
+
+    tipo = 'counter'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1, **rotulos):
+        chave = tuple(rotulos.get(nome, '') for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def estado(self):
+        with self._lock:
+            return dict(self._valores)
+
+    def reiniciar(self):
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    @staticmethod
+    def mesclar(estados):
+        total = {}
+        for estado in estados:
+            for chave, valor in estado.items():
+                total[chave] = total.get(chave, 0) + valor
+        return total
+
+    def amostras(self, estado=None):
+        valores = self.estado() if estado is None else estado
+        for chave, valor in sorted(valores.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, chave)} {valor}"
+
+
+class Histograma:
+    """
+    Histograma com rótulos e buckets fixos, no formato do Prometheus. Cada
+    observação custa uma busca binária nos buckets e um incremento sob lock.
+    """
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos.get(nome, '') for nome in self.rotulos)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                # Contagens por bucket (a última posição é +Inf), soma e total
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **rotulos):
+        """
+        Observa a duração (segundos) do bloco `with`, mesmo se ele lançar exceção.
+        """
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(perf_counter() - inicio, **rotulos)
+
+    def estado(self):
+        with self._lock:
+            return {chave: [list(contagens), soma, total] for chave, (contagens, soma, total) in self._series.items()}
+
+    def reiniciar(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    @staticmethod
+    def mesclar(estados):
+        total = {}
+        for estado in estados:
+            for chave, (contagens, soma, quantidade) in estado.items():
+                serie = total.get(chave)
+                if serie is None:
+                    total[chave] = [list(contagens), soma, quantidade]
+                else:
+                    serie[0] = [a + b for a, b in zip(serie[0], contagens)]
+                    serie[1] += soma
+                    serie[2] += quantidade
+        return total
+
+    def amostras(self, estado=None):
+        series = self.estado() if estado is None else estado
+        for chave, (contagens, soma, total) in sorted(series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + ('+Inf',), contagens):
+                acumulado += contagem
+                le = 'le="' + str(limite) + '"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {soma}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, chave)} {total}"
+
+
+class Registro:
+    """
+    Conjunto das métricas, exportado no formato texto do Prometheus.
+
+    Com `diretorio` (METRICAS_DIR), cada processo grava os seus valores em um
+    arquivo próprio desse diretório e a exportação soma os arquivos de todos
+    os processos, inclusive dos que já terminaram (os contadores nunca
+    diminuem entre duas coletas, qualquer que seja o worker que responda).
+    Sem diretório, são exportadas apenas as métricas deste processo.
+    """
+
+    def __init__(self, diretorio=METRICAS_DIR):
+        self.diretorio = diretorio
+        self._metricas = []
+        self._arquivo = None
+        self._publicador = None
+        self._publicacao_lock = threading.Lock()
+        if diretorio:
+            os.register_at_fork(after_in_child=self._apos_fork)
+
+    def contador(self, nome, descricao, rotulos=()):
+        metrica = Contador(nome, descricao, rotulos)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nome, descricao, rotulos=(), buckets=BUCKETS_PADRAO):
+        metrica = Histograma(nome, descricao, rotulos, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def _apos_fork(self):
+        # O worker começa do zero: o que o mestre contou antes do fork não é dele
+        for metrica in self._metricas:
+            metrica.reiniciar()
+        self._arquivo = None
+        self._publicador = None
+        self._publicacao_lock = threading.Lock()
+
+    def _estados(self):
+        return {metrica.nome: metrica.estado() for metrica in self._metricas}
+
+    def publicar(self):
+        """
+        Grava as métricas deste processo no seu arquivo em `diretorio`.
+        """
+        if not self.diretorio:
+            return
+        with self._publicacao_lock:
+            if self._arquivo is None:
+                os.makedirs(self.diretorio, exist_ok=True)
+                self._arquivo = os.path.join(self.diretorio, f"{os.getpid()}-{secrets.token_hex(4)}.json")
+            dados = {nome: [[list(chave), valor] for chave, valor in estado.items()]
+                     for nome, estado in self._estados().items()}
+            temporario = self._arquivo + '.tmp'
+            with open(temporario, 'w') as f:
+                json.dump(dados, f)
+            os.replace(temporario, self._arquivo)
+
+    def _ler_publicados(self):
+        estados = []
+        for nome_arquivo in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome_arquivo)
+            if not nome_arquivo.endswith('.json') or caminho == self._arquivo:
+                continue
+            try:
+                with open(caminho) as f:
+                    dados = json.load(f)
+            except (OSError, ValueError):
+                continue
+            estados.append({nome: {tuple(chave): valor for chave, valor in itens} for nome, itens in dados.items()})
+        return estados
+
+    def iniciar_publicacao(self, intervalo=METRICAS_INTERVALO_PUBLICACAO):
+        """
+        Publica as métricas deste processo a cada `intervalo` segundos e ao
+        encerrar. Não faz nada sem `diretorio` ou se já estiver publicando.
+        """
+        if not self.diretorio or self._publicador is not None:
+            return
+
+        def executar():
+            while True:
+                sleep(intervalo)
+                self.publicar()
+
+        self._publicador = threading.Thread(target=executar, name='publicacao-metricas', daemon=True)
+        self._publicador.start()
+        atexit.register(self.publicar)
+
+    def expor(self):
+        estados = [self._estados()]
+        if self.diretorio:
+            self.publicar()
+            estados.extend(self._ler_publicados())
+
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.descricao}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.amostras(metrica.mesclar(estado.get(metrica.nome, {}) for estado in estados)))
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+duracao_etapa = registro.histograma(
+    'audio_etapa_duracao_segundos', 'Duração de cada etapa do processamento de um áudio.', ['etapa'])
+consultas_cache = registro.contador(
+    'cache_consultas_total', 'Consultas aos caches por resultado (hit ou miss).', ['cache', 'resultado'])
+erros_upstream = registro.contador(
+    'upstream_erros_total', 'Falhas definitivas em serviços externos.', ['servico'])
+novas_tentativas_upstream = registro.contador(
+    'upstream_novas_tentativas_total', 'Novas tentativas (backoff) de chamadas a serviços externos.', ['servico'])
+espera_cota = registro.histograma(
+    'upstream_cota_espera_segundos', 'Espera por uma ficha da cota de um serviço externo.', ['servico', 'faixa'])
+recusas_cota = registro.contador(
+    'upstream_cota_recusas_total', 'Chamadas recusadas por falta de cota do serviço externo.', ['servico', 'faixa'])
+chamadas_coalescidas = registro.contador(
+    'cache_chamadas_coalescidas_total', 'Chamadas à origem evitadas por aguardar a de outro processo ou thread.', ['cache'])
+
+
+def medir_etapa(etapa):
+    """
+    Mede a duração de uma etapa do processamento:
+
+        with medir_etapa('transcricao'):
+            ...
+    """
+    return duracao_etapa.medir(etapa=etapa)
@@ -0,0 +1,66 @@
+"""
+Snapshot do cache de buscas e de áudios de resposta (TTS), para que novas
+réplicas comecem com o cache quente:
+
+    exportar    grava as entradas do cache em um snapshot (JSON Lines + gzip, versionado)
+    importar    carrega um snapshot no cache (entradas existentes são mantidas)
+    consultas   lista as consultas mais frequentes do api.log (usadas no pré-aquecimento)
+    aquecer     busca agora, respeitando as cotas, as consultas mais frequentes que faltam no cache
+
+Usa o CACHE_DIR e as demais variáveis do .env, como o app.
+
+Uso:
+    python API/snapshot_cache.py exportar cache.snapshot.gz
+    python API/snapshot_cache.py importar cache.snapshot.gz
+    python API/snapshot_cache.py consultas [--top-n 50] [api.log ...]
+    python API/snapshot_cache.py aquecer [--top-n 50] [--por-minuto 30] [--sem-audio]
+"""
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente antes dos módulos que as leem na importação
+load_dotenv()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+
+from cache.snapshot import (  # noqa: E402
+    exportar_snapshot, importar_snapshot, consultas_mais_frequentes, pre_aquecer,
+    CACHE_PRE_AQUECIMENTO_TOP_N, CACHE_PRE_AQUECIMENTO_POR_MINUTO,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('exportar').add_argument('arquivo')
+    comandos.add_parser('importar').add_argument('arquivo')
+    consultas = comandos.add_parser('consultas')
+    consultas.add_argument('logs', nargs='*', help="Arquivos de log (padrão: api.log e os rotacionados)")
+    consultas.add_argument('--top-n', type=int, default=CACHE_PRE_AQUECIMENTO_TOP_N)
+    aquecer = comandos.add_parser('aquecer')
+    aquecer.add_argument('--top-n', type=int, default=CACHE_PRE_AQUECIMENTO_TOP_N)
+    aquecer.add_argument('--por-minuto', type=float, default=CACHE_PRE_AQUECIMENTO_POR_MINUTO)
+    aquecer.add_argument('--sem-audio', action='store_true', help="Não gera os áudios de resposta")
+    args = parser.parse_args()
+
+    if args.comando == 'exportar':
+        print(json.dumps(exportar_snapshot(args.arquivo)))
+    elif args.comando == 'importar':
+        try:
+            print(json.dumps(importar_snapshot(args.arquivo)))
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+    elif args.comando == 'consultas':
+        for consulta in consultas_mais_frequentes(args.top_n, args.logs or None):
+            print(consulta)
+    else:
+        from web_search import pesquisar_na_web
+        from audio_processing import gerar_audio_resultado
+
+        sintetizar = None if args.sem_audio else gerar_audio_resultado
+        print(pre_aquecer(pesquisar_na_web, sintetizar, args.top_n, args.por_minuto))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+# Processos ffmpeg simultâneos, áudios aguardando vaga e tempos limite (segundos)
+TRANSCODIFICACAO_WORKERS = int(os.getenv('TRANSCODIFICACAO_WORKERS', os.cpu_count() or 1))
+TRANSCODIFICACAO_FILA_MAX = int(os.getenv('TRANSCODIFICACAO_FILA_MAX', 2 * TRANSCODIFICACAO_WORKERS))
+TRANSCODIFICACAO_ESPERA_MAX = float(os.getenv('TRANSCODIFICACAO_ESPERA_MAX', 10))
+TRANSCODIFICACAO_TIMEOUT = float(os.getenv('TRANSCODIFICACAO_TIMEOUT', 30))
+
+
+class SobrecargaTranscodificacao(Exception):
+    """
+    Erro lançado quando o áudio não pode ser transcodificado agora: fila de
+    admissão cheia, espera por vaga esgotada ou processo acima do tempo limite.
+    `retry_after` sugere em quantos segundos o cliente deve tentar novamente.
+    """
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class LimitadorTranscodificacao:
+    """
+    Controle de admissão dos processos ffmpeg: no máximo `workers` rodando ao
+    mesmo tempo e no máximo `fila_max` aguardando vaga. Quando a fila está
+    cheia, o áudio é recusado imediatamente em vez de disputar CPU.
+    """
+
+    def __init__(self, workers=TRANSCODIFICACAO_WORKERS, fila_max=TRANSCODIFICACAO_FILA_MAX,
+                 espera_max=TRANSCODIFICACAO_ESPERA_MAX):
+        self.workers = workers
+        self.fila_max = fila_max
+        self.espera_max = espera_max
+        self._condicao = threading.Condition()
+        self._ativos = 0
+        self._aguardando = 0
+        self._recusados = 0
+        self._concluidos = 0
+        self._espera_total = 0.0
+        self._duracao_total = 0.0
+
+    def _retry_after(self):
+        duracao_media = self._duracao_total / self._concluidos if self._concluidos else 1.0
+        return max(1, math.ceil(duracao_media * (self._aguardando + 1) / self.workers))
+
+    def adquirir(self):
+        """
+        Aguarda uma vaga para executar o ffmpeg.
+
+        Returns:
+        float: Instante (monotonic) em que a vaga foi obtida.
+
+        Raises:
+        SobrecargaTranscodificacao: fila cheia ou espera acima de espera_max.
+        """
+        inicio = monotonic()
+        with self._condicao:
+            if self._ativos >= self.workers and self._aguardando >= self.fila_max:
+                self._recusados += 1
+                logger.warning("Fila de transcodificação cheia (%s aguardando).", self._aguardando)
+                raise SobrecargaTranscodificacao("Fila de transcodificação cheia.", self._retry_after())
+
+            self._aguardando += 1
+            try:
+                liberado = self._condicao.wait_for(lambda: self._ativos < self.workers, timeout=self.espera_max)
+            finally:
+                self._aguardando -= 1
+            if not liberado:
+                self._recusados += 1
+                logger.warning("Tempo de espera por transcodificação excedido (%ss).", self.espera_max)
+                raise SobrecargaTranscodificacao("Tempo de espera por transcodificação excedido.", self._retry_after())
+
+            self._ativos += 1
+            agora = monotonic()
+            self._espera_total += agora - inicio
+            return agora
+
+    def liberar(self, adquirido_em):
+        """
+        Devolve a vaga obtida em `adquirir`.
+        """
+        with self._condicao:
+            self._ativos -= 1
+            self._concluidos += 1
+            self._duracao_total += monotonic() - adquirido_em
+            self._condicao.notify()
+
+    @contextmanager
+    def vaga(self):
+        adquirido_em = self.adquirir()
+        try:
+            yield
+        finally:
+            self.liberar(adquirido_em)
+
+    def estatisticas(self):
+        """
+        Retorna o estado da fila: processos ativos, profundidade da fila,
+        recusas e tempos médios de espera e de execução (segundos).
+        """
+        with self._condicao:
+            concluidos = self._concluidos
+            return {
+                "workers": self.workers,
+                "ativos": self._ativos,
+                "aguardando": self._aguardando,
+                "fila_max": self.fila_max,
+                "concluidos": concluidos,
+                "recusados": self._recusados,
+                "espera_media": self._espera_total / concluidos if concluidos else 0.0,
+                "duracao_media": self._duracao_total / concluidos if concluidos else 0.0,
+            }
+
+
+limitador_transcodificacao = LimitadorTranscodificacao()
@@ -1,41 +1,128 @@
 import os
-import requests
+import asyncio
 import logging
 import time
 import backoff
-import hashlib
-import json
+import aiohttp
 from requests.exceptions import RequestException, HTTPError, Timeout, ConnectionError
-from dotenv import load_dotenv  
+from http_client import ClienteHTTP, ClienteHTTPAsync, CircuitoAbertoError
+from cota import CotaCompartilhada, CotaEsgotada
+from cache.cache_manager import estado_compartilhado
+from metricas import medir_etapa, erros_upstream, novas_tentativas_upstream
 
-# Carregar as variáveis do arquivo .env
-load_dotenv()
-
-# Ler a chave de API do arquivo .env
+# Chave de API (do ambiente ou do arquivo .env carregado pelo ponto de entrada)
 SERPAPI_API_KEY = os.getenv('SERPAPI_API_KEY')  
-SERPAPI_SEARCH_URL = 'https://serpapi.com/search'
+SERPAPI_SEARCH_URL = os.getenv('SERPAPI_SEARCH_URL', 'https://serpapi.com/search')
 API_TIMEOUT = 10  
 MAX_RETRIES = 3  
-
-# Função de retry com backoff exponencial
-@backoff.on_exception(backoff.expo, (RequestException, ConnectionError, Timeout), max_tries=MAX_RETRIES, jitter=None)
+MAX_RESULTADOS = 3
+
+# Pool de conexões keep-alive e disjuntor para a SERPAPI
+SERPAPI_MAX_CONEXOES = int(os.getenv('SERPAPI_MAX_CONEXOES', 10))
+SERPAPI_LIMITE_FALHAS = int(os.getenv('SERPAPI_LIMITE_FALHAS', 5))
+SERPAPI_TEMPO_ABERTO = int(os.getenv('SERPAPI_TEMPO_ABERTO', 30))
+
+# Cota de chamadas à SERPAPI compartilhada por todos os processos (0 = sem limite)
+SERPAPI_COTA_POR_MINUTO = float(os.getenv('SERPAPI_COTA_POR_MINUTO', 100))
+SERPAPI_COTA_RAJADA = int(os.getenv('SERPAPI_COTA_RAJADA', 20))
+# Pausa da cota após uma resposta 429 sem Retry-After (segundos)
+SERPAPI_PAUSA_LIMITE = int(os.getenv('SERPAPI_PAUSA_LIMITE', 5))
+
+cliente_serpapi = ClienteHTTP(
+    SERPAPI_SEARCH_URL,
+    timeout=API_TIMEOUT,
+    max_conexoes=SERPAPI_MAX_CONEXOES,
+    limite_falhas=SERPAPI_LIMITE_FALHAS,
+    tempo_aberto=SERPAPI_TEMPO_ABERTO,
+)
+
+# Cliente assíncrono (pipeline asyncio), com o mesmo disjuntor do cliente síncrono
+cliente_serpapi_async = ClienteHTTPAsync(
+    SERPAPI_SEARCH_URL,
+    timeout=API_TIMEOUT,
+    max_conexoes=SERPAPI_MAX_CONEXOES,
+    disjuntor=cliente_serpapi.disjuntor,
+)
+
+cota_serpapi = CotaCompartilhada('serpapi', estado_compartilhado, SERPAPI_COTA_POR_MINUTO, SERPAPI_COTA_RAJADA)
+
+def _status_http(e):
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status
+    resposta = getattr(e, 'response', None)
+    return resposta.status_code if resposta is not None else None
+
+def _sem_nova_tentativa(e):
+    # Disjuntor aberto ou limite do provedor (429): novas tentativas só agravam a situação
+    return isinstance(e, CircuitoAbertoError) or _status_http(e) == 429
+
+def _pausar_se_limitado(e):
+    """
+    Em uma resposta 429, pausa a cota de todos os processos pelo tempo do Retry-After.
+    """
+    if _status_http(e) != 429:
+        return
+    cabecalhos = e.headers if isinstance(e, aiohttp.ClientResponseError) else e.response.headers
+    try:
+        segundos = int((cabecalhos or {}).get('Retry-After', SERPAPI_PAUSA_LIMITE))
+    except ValueError:
+        segundos = SERPAPI_PAUSA_LIMITE
+    cota_serpapi.pausar(segundos)
+
+# Métricas de novas tentativas e falhas definitivas (após o backoff) da SERPAPI
+def _contar_nova_tentativa(detalhes):
+    novas_tentativas_upstream.inc(servico='serpapi')
+
+def _contar_falha(detalhes):
+    erros_upstream.inc(servico='serpapi')
+
+# Função de retry com backoff exponencial (sem novas tentativas com o disjuntor aberto ou após 429)
+@backoff.on_exception(backoff.expo, (RequestException, ConnectionError, Timeout), max_tries=MAX_RETRIES, jitter=None,
+                      giveup=_sem_nova_tentativa,
+                      on_backoff=_contar_nova_tentativa, on_giveup=_contar_falha)
 def request_func(params):
     """
     Função que realiza a requisição para a API do SERPAPI.
     O backoff é aplicado para erros de rede, como timeout e conexão.
+    As conexões são reaproveitadas pelo pool do cliente compartilhado.
+    Cada tentativa consome uma ficha da cota compartilhada.
+
+    Raises:
+    CotaEsgotada: se não houver cota para a faixa de prioridade atual.
+    """
+    cota_serpapi.adquirir()
+    logging.debug("Enviando requisição para a API com parâmetros: %s", params)
+    try:
+        return cliente_serpapi.get_json(params=params)
+    except HTTPError as e:
+        _pausar_se_limitado(e)
+        raise
+
+def _formatar_resultados(resultados, query):
     """
-    logging.debug(f"Enviando requisição para a API com parâmetros: {params}")
-    response = requests.get(SERPAPI_SEARCH_URL, params=params, timeout=API_TIMEOUT)
-    response.raise_for_status()
-    return response.json()
+    Extrai os MAX_RESULTADOS primeiros resultados orgânicos da resposta da SERPAPI.
+    """
+    if 'organic_results' not in resultados:
+        logging.warning("Nenhum resultado encontrado na resposta da API para a consulta: %s", query)
+        return None
+
+    resposta = [{
+        'titulo': item.get('title', 'Sem título'),
+        'descricao': item.get('snippet', 'Sem descrição'),
+        'link': item.get('link', 'Sem link')
+    } for item in resultados['organic_results'][:MAX_RESULTADOS]]
+
+    logging.info("Consulta '%s' retornou %s resultados.", query, len(resposta))
+    return resposta
 
 def pesquisar_na_web(query):
     """
     Função de busca na web utilizando a API do SERPAPI.
     Realiza o request, com tratamento de erros e logging robusto.
+    A falta de cota (CotaEsgotada) é propagada para quem chamou.
     """
     try:
-        logging.info(f"Iniciando pesquisa na web para a consulta: '{query}'")
+        logging.info("Iniciando pesquisa na web para a consulta: '%s'", query)
 
         # Sanitizar a consulta para garantir que ela está formatada corretamente
         query = query.strip()
@@ -43,17 +130,6 @@ def pesquisar_na_web(query):
             logging.warning("Consulta vazia fornecida. Nenhum resultado será retornado.")
             return None
 
-        # Gerar chave de cache baseada na consulta para evitar buscas duplicadas
-        query_hash = hashlib.md5(query.encode('utf-8')).hexdigest()
-        cache_file = f"cache_{query_hash}.json"
-
-        # Verificar se já temos cache para esta consulta
-        if os.path.exists(cache_file):
-            logging.info(f"Utilizando cache para a consulta: '{query}'")
-            with open(cache_file, 'r') as cache_f:
-                cached_data = json.load(cache_f)
-                return cached_data
-
         params = {
             'q': query,
             'api_key': SERPAPI_API_KEY,
@@ -62,33 +138,61 @@ def pesquisar_na_web(query):
 
         # Realizar a requisição à API com backoff em caso de falhas temporárias
         try:
-            resultados = request_func(params)
-
-            
-            if 'organic_results' not in resultados:
-                logging.warning(f"Nenhum resultado encontrado na resposta da API para a consulta: {query}")
-                return None
+            with medir_etapa('pesquisa_web'):
+                resultados = request_func(params)
+            return _formatar_resultados(resultados, query)
 
+        except (RequestException, HTTPError, Timeout, ConnectionError) as e:
+            logging.error("Erro ao realizar a requisição para a consulta '%s': %s", query, e)
+            return None
 
-            resposta = [{
-                'titulo': item.get('title', 'Sem título'),
-                'descricao': item.get('snippet', 'Sem descrição'),
-                'link': item.get('link', 'Sem link')
-            } for item in resultados['organic_results'][:3]]
+    except CotaEsgotada:
+        # Tratada por quem chamou (resposta 503 ou renovação adiada)
+        raise
+    except Exception as e:
+        logging.error("Erro inesperado ao buscar na web para a consulta '%s': %s", query, e)
+        return None
 
-            logging.info(f"Consulta '{query}' retornou {len(resposta)} resultados.")
 
-            # Salvar resultados no cache para otimizar futuras requisições
-            with open(cache_file, 'w') as cache_f:
-                json.dump(resposta, cache_f)
-            logging.info(f"Resultados armazenados em cache para a consulta: '{query}'")
+# Versão assíncrona da requisição, com o mesmo backoff exponencial
+@backoff.on_exception(backoff.expo, (aiohttp.ClientError, asyncio.TimeoutError), max_tries=MAX_RETRIES, jitter=None,
+                      giveup=_sem_nova_tentativa,
+                      on_backoff=_contar_nova_tentativa, on_giveup=_contar_falha)
+async def request_func_async(params):
+    """
+    Realiza a requisição para a API do SERPAPI sem bloquear o loop de eventos.
+    """
+    await cota_serpapi.adquirir_async()
+    logging.debug("Enviando requisição assíncrona para a API com parâmetros: %s", params)
+    try:
+        return await cliente_serpapi_async.get_json(params=params)
+    except aiohttp.ClientResponseError as e:
+        _pausar_se_limitado(e)
+        raise
 
-            return resposta
+async def pesquisar_na_web_async(query):
+    """
+    Versão assíncrona de `pesquisar_na_web`, para o pipeline asyncio.
+    """
+    try:
+        logging.info("Iniciando pesquisa na web (assíncrona) para a consulta: '%s'", query)
 
-        except (RequestException, HTTPError, Timeout, ConnectionError) as e:
-            logging.error(f"Erro ao realizar a requisição para a consulta '{query}': {e}")
+        query = query.strip()
+        if not query:
+            logging.warning("Consulta vazia fornecida. Nenhum resultado será retornado.")
             return None
 
+        params = {
+            'q': query,
+            'api_key': SERPAPI_API_KEY,
+            'engine': 'google',
+        }
+        with medir_etapa('pesquisa_web'):
+            resultados = await request_func_async(params)
+        return _formatar_resultados(resultados, query)
+
+    except CotaEsgotada:
+        raise
     except Exception as e:
-        logging.error(f"Erro inesperado ao buscar na web para a consulta '{query}': {e}")
+        logging.error("Erro ao realizar a requisição para a consulta '%s': %s", query, e)
         return None
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark da identificação de comandos de pesquisa (comandos.py).
+
+Compara o identificador compilado com o laço original de expressões
+regulares sobre um corpus de transcrições. Sem argumentos, o corpus é
+gerado a partir de frases típicas; com um arquivo (uma transcrição por
+linha), usa as transcrições reais.
+
+Uso:
+    python benchmarks/bench_comandos.py [transcricoes.txt] [--repeticoes N]
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'API'))
+
+from comandos import identificador_comandos  # noqa: E402
+
+COMANDOS_ORIGINAIS = [
+    r"pesquisar\s*(.*)",
+    r"buscar\s*(.*)",
+    r"me\s*encontre\s*(.*)",
+    r"faça\s*uma\s*pesquisa\s*sobre\s*(.*)",
+    r"procure\s*(.*)",
+    r"encontre\s*(.*)",
+    r"encontre\s*informações\s*sobre\s*(.*)",
+    r"quero\s*ver\s*(.*)",
+]
+
+PREFIXOS = ["", "por favor ", "você pode ", "eu queria ", "ok "]
+COMANDOS = [
+    "pesquisar", "buscar", "me encontre", "faça uma pesquisa sobre", "procure", "encontre",
+    "encontre informações sobre", "quero ver", "Pesquisar", "Encontre informações sobre", "",
+]
+TEMAS = [
+    "previsão do tempo em São Paulo", "receita de bolo de cenoura", "resultado do jogo do Flamengo",
+    "como funciona a inteligência artificial", "horário de funcionamento do banco", "notícias de hoje",
+    "preço do dólar", "filmes em cartaz", "história do Brasil", "melhores praias do nordeste",
+]
+
+
+def laco_original(texto):
+    for comando in COMANDOS_ORIGINAIS:
+        match = re.search(comando, texto, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return texto.strip()
+
+
+def gerar_corpus(tamanho, semente=42):
+    aleatorio = random.Random(semente)
+    combinacoes = list(itertools.product(PREFIXOS, COMANDOS, TEMAS))
+    return [
+        f"{prefixo}{comando} {tema}".strip()
+        for prefixo, comando, tema in (aleatorio.choice(combinacoes) for _ in range(tamanho))
+    ]
+
+
+def medir(nome, funcao, corpus, repeticoes):
+    tempos = timeit.repeat(lambda: [funcao(texto) for texto in corpus], number=1, repeat=repeticoes)
+    melhor = min(tempos)
+    print(f"{nome:<14} {melhor * 1000:8.2f} ms/corpus  {melhor / len(corpus) * 1e6:6.2f} µs/transcrição")
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('arquivo', nargs='?', help="Transcrições reais, uma por linha")
+    parser.add_argument('--tamanho', type=int, default=5000, help="Tamanho do corpus gerado")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    # O log por chamada não faz parte do que está sendo medido
+    logging.disable(logging.CRITICAL)
+
+    if args.arquivo:
+        with open(args.arquivo, encoding='utf-8') as f:
+            corpus = [linha.strip() for linha in f if linha.strip()]
+    else:
+        corpus = gerar_corpus(args.tamanho)
+    print(f"Corpus: {len(corpus)} transcrições")
+
+    original = medir("laço original", laco_original, corpus, args.repeticoes)
+    compilado = medir("compilado", lambda texto: identificador_comandos.identificar(texto)[0], corpus, args.repeticoes)
+    print(f"Ganho: {original / compilado:.1f}x")
+
+    divergencias = [
+        texto for texto in corpus
+        if laco_original(texto) != identificador_comandos.identificar(texto)[0]
+    ]
+    print(f"Consultas diferentes do laço original: {len(divergencias)} (ex.: {divergencias[:3]})")
+
+
+if __name__ == "__main__":
+    main()
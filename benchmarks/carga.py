@@ -0,0 +1,285 @@
+"""
+Benchmark de carga de ponta a ponta do /processar_audio, sem rede externa.
+
+A SerpApi, o reconhecimento de fala e o gTTS são substituídos por servidores
+locais (servidores_falsos.py) com latência e taxa de erro configuráveis; o
+app Flask roda em uma thread, com cache e logs em um diretório temporário.
+Cada cenário envia requisições concorrentes e mede a vazão e os percentis
+(p50/p95/p99) da latência total e de cada etapa (os mesmos nomes de etapa de
+/metrics).
+
+Cenários:
+    frio        cada requisição é um áudio inédito (nenhum cache ajuda)
+    quente      os áudios já foram processados uma vez (todos os caches quentes)
+    duplicados  80% das requisições repetem 5 áudios, o resto é inédito
+    invalidos   uploads que não são áudio e áudios acima de MAX_AUDIO_SIZE_MB
+
+Uso:
+    python benchmarks/carga.py [--cenarios frio,quente] [--requisicoes N] [--concorrencia C]
+                               [--latencia-busca S] [--taxa-erro-busca P] [--cota-busca N] ... [--json saida.json]
+                               [--limite quente:250]
+
+Com --limite cenario:p95_ms, o script termina com código 1 se o p95 da
+latência total do cenário passar do limite (para uso em CI).
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRETORIO_BENCHMARKS, '..', 'API'))
+sys.path.insert(0, DIRETORIO_BENCHMARKS)
+
+import corpus  # noqa: E402
+from servidores_falsos import (  # noqa: E402
+    ServidorFalso, responder_serpapi, responder_fala, responder_tts, reconhecedor_falso, gtts_falso,
+)
+
+CENARIOS = ('frio', 'quente', 'duplicados', 'invalidos')
+
+
+def percentil(valores, p):
+    """
+    Percentil por interpolação linear entre as amostras ordenadas.
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+class ColetorEtapas:
+    """
+    Guarda a duração bruta de cada observação do histograma de etapas, para
+    calcular percentis exatos (os buckets do /metrics são largos demais).
+    """
+
+    def __init__(self, histograma):
+        self._lock = threading.Lock()
+        self._amostras = defaultdict(list)
+        observar_original = histograma.observar
+
+        def observar(valor, **rotulos):
+            with self._lock:
+                self._amostras[rotulos.get('etapa', '')].append(valor)
+            observar_original(valor, **rotulos)
+        histograma.observar = observar
+
+    def coletar(self):
+        """
+        Retorna as amostras acumuladas desde a última coleta e as zera.
+        """
+        with self._lock:
+            amostras, self._amostras = self._amostras, defaultdict(list)
+        return amostras
+
+
+def preparar_ambiente(args, diretorio):
+    """
+    Configura o ambiente antes de importar o app: cache e logs isolados e
+    a SerpApi apontando para o servidor falso.
+    """
+    servidores = {
+        'busca': ServidorFalso(responder_serpapi, args.latencia_busca, args.latencia_busca / 2, args.taxa_erro_busca, args.semente),
+        'fala': ServidorFalso(responder_fala, args.latencia_fala, args.latencia_fala / 2, args.taxa_erro_fala, args.semente + 1),
+        'tts': ServidorFalso(responder_tts, args.latencia_tts, args.latencia_tts / 2, args.taxa_erro_tts, args.semente + 2),
+    }
+    urls = {nome: servidor.iniciar() for nome, servidor in servidores.items()}
+
+    os.environ.update({
+        'CACHE_DIR': os.path.join(diretorio, 'cache'),
+        'LOG_DIR': os.path.join(diretorio, 'logs'),
+        'LOG_LEVEL': 'WARNING',
+        'SERPAPI_API_KEY': 'benchmark',
+        'SERPAPI_SEARCH_URL': f"{urls['busca']}/search",
+        'CACHE_RENOVACAO_TOP_K': '0',
+        'CACHE_PRE_AQUECIMENTO_TOP_N': '0',
+        'MAX_AUDIO_SIZE_MB': str(args.limite_mb),
+        'SERPAPI_COTA_POR_MINUTO': str(args.cota_busca),
+        'TTS_COTA_POR_MINUTO': str(args.cota_tts),
+    })
+
+    import audio_processing
+    audio_processing.definir_reconhecedor(reconhecedor_falso(urls['fala']))
+    audio_processing.gTTS = gtts_falso(urls['tts'])
+    return servidores
+
+
+def iniciar_app():
+    from werkzeug.serving import make_server
+    from app import app, aquecer, iniciar_worker
+
+    aquecer()
+    iniciar_worker()
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}/processar_audio"
+
+
+def enviar(sessao, url, caminho):
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    inicio = time.perf_counter()
+    try:
+        resposta = sessao.post(url, files={'audio': (os.path.basename(caminho), conteudo)}, timeout=120)
+        status = resposta.status_code
+    except requests.RequestException:
+        status = 'conexao'
+    return status, time.perf_counter() - inicio
+
+
+def executar(url, caminhos, concorrencia):
+    """
+    Envia os áudios com `concorrencia` clientes simultâneos.
+
+    Returns:
+    tuple[list, float]: (status, latência) de cada requisição e duração total.
+    """
+    local = threading.local()
+
+    def enviar_com_sessao(caminho):
+        if not hasattr(local, 'sessao'):
+            local.sessao = requests.Session()
+        return enviar(local.sessao, url, caminho)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        respostas = list(executor.map(enviar_com_sessao, caminhos))
+    return respostas, time.perf_counter() - inicio
+
+
+def montar_cenario(nome, args, diretorio_corpus, proximo_indice):
+    """
+    Retorna (aquecimento, requisições, próximo índice livre do corpus).
+    """
+    n = args.requisicoes
+    if nome == 'frio':
+        return [], corpus.gerar_corpus(diretorio_corpus, n, proximo_indice), proximo_indice + n
+    if nome == 'quente':
+        distintos = corpus.gerar_corpus(diretorio_corpus, max(1, n // 5), proximo_indice)
+        requisicoes = [distintos[i % len(distintos)] for i in range(n)]
+        return distintos, requisicoes, proximo_indice + len(distintos)
+    if nome == 'duplicados':
+        aleatorio = random.Random(args.semente)
+        repetidos = corpus.gerar_corpus(diretorio_corpus, 5, proximo_indice)
+        ineditos = iter(corpus.gerar_corpus(diretorio_corpus, n, proximo_indice + 5))
+        requisicoes = [aleatorio.choice(repetidos) if aleatorio.random() < 0.8 else next(ineditos) for _ in range(n)]
+        return [], requisicoes, proximo_indice + 5 + n
+    lixo, grande = corpus.gerar_invalidos(diretorio_corpus, args.limite_mb)
+    return [], [lixo if i % 2 else grande for i in range(n)], proximo_indice
+
+
+def resumir(nome, respostas, duracao, etapas):
+    latencias = [latencia for _, latencia in respostas]
+    resumo = {
+        'cenario': nome,
+        'requisicoes': len(respostas),
+        'status': dict(Counter(str(status) for status, _ in respostas)),
+        'vazao_rps': len(respostas) / duracao if duracao else 0.0,
+        'total_ms': {f"p{p}": percentil(latencias, p) * 1000 for p in (50, 95, 99)},
+        'etapas_ms': {
+            etapa: {'n': len(valores), **{f"p{p}": percentil(valores, p) * 1000 for p in (50, 95, 99)}}
+            for etapa, valores in sorted(etapas.items())
+        },
+    }
+    return resumo
+
+
+def imprimir(resumo):
+    total = resumo['total_ms']
+    print(f"\n== {resumo['cenario']}: {resumo['requisicoes']} requisições, {resumo['vazao_rps']:.1f} req/s, "
+          f"status {resumo['status']}")
+    print(f"{'etapa':<18} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print(f"{'total':<18} {resumo['requisicoes']:>6} {total['p50']:>9.1f} {total['p95']:>9.1f} {total['p99']:>9.1f}")
+    for etapa, valores in resumo['etapas_ms'].items():
+        print(f"{etapa:<18} {valores['n']:>6} {valores['p50']:>9.1f} {valores['p95']:>9.1f} {valores['p99']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cenarios', default=','.join(CENARIOS))
+    parser.add_argument('--requisicoes', type=int, default=100, help="Requisições por cenário")
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--latencia-busca', type=float, default=0.15, help="Latência média da SerpApi falsa (s)")
+    parser.add_argument('--latencia-fala', type=float, default=0.3, help="Latência média do reconhecimento falso (s)")
+    parser.add_argument('--latencia-tts', type=float, default=0.2, help="Latência média do TTS falso (s)")
+    parser.add_argument('--taxa-erro-busca', type=float, default=0.0)
+    parser.add_argument('--taxa-erro-fala', type=float, default=0.0)
+    parser.add_argument('--taxa-erro-tts', type=float, default=0.0)
+    parser.add_argument('--cota-busca', type=float, default=0,
+                        help="SERPAPI_COTA_POR_MINUTO do app durante o teste (0 = sem limite)")
+    parser.add_argument('--cota-tts', type=float, default=0,
+                        help="TTS_COTA_POR_MINUTO do app durante o teste (0 = sem limite)")
+    parser.add_argument('--limite-mb', type=int, default=2, help="MAX_AUDIO_SIZE_MB do app durante o teste")
+    parser.add_argument('--corpus', help="Diretório do corpus (padrão: temporário)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help="Grava os resultados neste arquivo")
+    parser.add_argument('--limite', action='append', default=[], metavar='CENARIO:P95_MS')
+    args = parser.parse_args()
+
+    cenarios = [nome.strip() for nome in args.cenarios.split(',') if nome.strip()]
+    invalidos = set(cenarios) - set(CENARIOS)
+    if invalidos:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(invalidos))}")
+
+    diretorio = tempfile.mkdtemp(prefix='bench_carga_')
+    diretorio_corpus = os.path.abspath(args.corpus) if args.corpus else os.path.join(diretorio, 'corpus')
+    servidores = preparar_ambiente(args, diretorio)
+
+    # Os logs por requisição (também enviados ao terminal) não fazem parte do relatório
+    logging.disable(logging.CRITICAL)
+
+    import metricas
+    coletor = ColetorEtapas(metricas.duracao_etapa)
+    servidor_app, url = iniciar_app()
+
+    resumos = []
+    proximo_indice = 0
+    try:
+        for nome in cenarios:
+            aquecimento, requisicoes, proximo_indice = montar_cenario(nome, args, diretorio_corpus, proximo_indice)
+            if aquecimento:
+                executar(url, aquecimento, args.concorrencia)
+            coletor.coletar()
+            respostas, duracao = executar(url, requisicoes, args.concorrencia)
+            resumo = resumir(nome, respostas, duracao, coletor.coletar())
+            imprimir(resumo)
+            resumos.append(resumo)
+    finally:
+        servidor_app.shutdown()
+        for servidor in servidores.values():
+            servidor.parar()
+
+    print("\nChamadas aos serviços falsos: " + ', '.join(
+        f"{nome}={servidor.requisicoes} ({servidor.erros} erros)" for nome, servidor in servidores.items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resumos, f, indent=2, ensure_ascii=False)
+
+    violacoes = []
+    for limite in args.limite:
+        cenario, _, valor = limite.partition(':')
+        for resumo in resumos:
+            if resumo['cenario'] == cenario and resumo['total_ms']['p95'] > float(valor):
+                violacoes.append(f"{cenario}: p95 {resumo['total_ms']['p95']:.1f} ms > {float(valor):.1f} ms")
+    for violacao in violacoes:
+        print(f"LIMITE EXCEDIDO {violacao}")
+    sys.exit(1 if violacoes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Corpus de áudios para os benchmarks, gerado com ffmpeg de forma
+reproduzível: clipes em cada formato suportado (OGG/Vorbis, MP3, WAV, FLAC e
+AAC/ADTS), cada um com conteúdo diferente, além de uploads inválidos (lixo e
+acima do limite de tamanho).
+
+Uso (para gravar um corpus fixo em disco):
+    python benchmarks/corpus.py destino/ [--quantidade N]
+"""
+import argparse
+import os
+import subprocess
+
+# Parâmetros de codificação por extensão
+FORMATOS = {
+    'ogg': ['-c:a', 'libvorbis'],
+    'mp3': ['-c:a', 'libmp3lame'],
+    'wav': ['-c:a', 'pcm_s16le'],
+    'flac': ['-c:a', 'flac'],
+    'aac': ['-c:a', 'aac', '-f', 'adts'],
+}
+
+
+def gerar_clipe(caminho, formato, frequencia, duracao=1.5, ffmpeg='ffmpeg'):
+    """
+    Gera um tom de `frequencia` Hz com silêncio antes e depois.
+    """
+    filtro = (f"sine=f={frequencia}:d={duracao}:sample_rate=16000,"
+              f"adelay=300,apad=pad_dur=0.3")
+    subprocess.run(
+        [ffmpeg, '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', filtro, '-ac', '1', *FORMATOS[formato], caminho],
+        check=True,
+    )
+    return caminho
+
+
+def gerar_corpus(diretorio, quantidade, inicio=0, formatos=tuple(FORMATOS), ffmpeg='ffmpeg'):
+    """
+    Gera `quantidade` clipes distintos, alternando entre os formatos. Clipes
+    com índices diferentes (a partir de `inicio`) nunca têm o mesmo conteúdo.
+
+    Returns:
+    list[str]: Caminhos dos clipes gerados.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = []
+    for indice in range(inicio, inicio + quantidade):
+        formato = formatos[indice % len(formatos)]
+        caminho = os.path.join(diretorio, f"clipe_{indice:05d}.{formato}")
+        if not os.path.exists(caminho):
+            gerar_clipe(caminho, formato, 200 + 3 * indice, ffmpeg=ffmpeg)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def gerar_invalidos(diretorio, limite_mb, ffmpeg='ffmpeg'):
+    """
+    Gera um arquivo que não é áudio e um WAV maior que `limite_mb`.
+
+    Returns:
+    tuple[str, str]: (caminho do lixo, caminho do áudio grande demais)
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    lixo = os.path.join(diretorio, 'lixo.ogg')
+    with open(lixo, 'wb') as f:
+        f.write(os.urandom(64 * 1024))
+
+    grande = os.path.join(diretorio, 'grande.wav')
+    if not os.path.exists(grande) or os.path.getsize(grande) <= limite_mb * 1024 * 1024:
+        # PCM 16 kHz mono de 16 bits: 32000 bytes por segundo
+        duracao = limite_mb * 1024 * 1024 / 32000 + 5
+        subprocess.run(
+            [ffmpeg, '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', f"sine=f=440:d={duracao}:sample_rate=16000",
+             '-c:a', 'pcm_s16le', grande],
+            check=True,
+        )
+    return lixo, grande
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('destino')
+    parser.add_argument('--quantidade', type=int, default=50)
+    parser.add_argument('--limite-mb', type=int, default=10)
+    args = parser.parse_args()
+
+    caminhos = gerar_corpus(args.destino, args.quantidade)
+    gerar_invalidos(args.destino, args.limite_mb)
+    print(f"{len(caminhos)} clipes e 2 uploads inválidos em {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
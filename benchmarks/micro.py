@@ -0,0 +1,126 @@
+"""
+Micro-benchmarks das partes do pipeline que não dependem de rede:
+
+    check_audio     validação e decodificação de um clipe por formato suportado,
+                    e a recusa de um upload que não é áudio (sem iniciar o ffmpeg)
+    comandos        filtrar_por_palavra_chave sobre um corpus de transcrições
+    cache           leitura de resultados de busca (memória, disco e por consulta
+                    similar), escrita, e leitura do cache de áudio (TTS)
+
+Substitui o antigo cache_manager.medir_performance. O cache é criado em um
+diretório temporário.
+
+Uso:
+    python benchmarks/micro.py [--grupos check_audio,comandos,cache] [--repeticoes N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRETORIO_BENCHMARKS, '..', 'API'))
+sys.path.insert(0, DIRETORIO_BENCHMARKS)
+
+GRUPOS = ('check_audio', 'comandos', 'cache')
+
+
+def medir(nome, funcao, repeticoes, numero=1, unidades=1):
+    """
+    Imprime o melhor tempo por chamada de `funcao` entre `repeticoes` rodadas
+    de `numero` chamadas; `unidades` é quantos itens cada chamada processa.
+    """
+    tempos = timeit.repeat(funcao, number=numero, repeat=repeticoes)
+    por_item = min(tempos) / numero / unidades
+    print(f"{nome:<34} {por_item * 1e6:10.1f} µs/op")
+    return por_item
+
+
+def bench_check_audio(repeticoes, diretorio):
+    import corpus
+    from check_audio import check_audio, check_audio_stream
+
+    for indice, formato in enumerate(corpus.FORMATOS):
+        caminho = corpus.gerar_clipe(os.path.join(diretorio, f"micro.{formato}"), formato, 300 + indice)
+        medir(f"check_audio {formato}", lambda: check_audio(caminho), repeticoes)
+
+    lixo, _ = corpus.gerar_invalidos(diretorio, 1)
+    with open(lixo, 'rb') as f:
+        conteudo = f.read()
+
+    def recusar():
+        from io import BytesIO
+        check_audio_stream(BytesIO(conteudo))
+    medir("check_audio lixo (cabeçalho)", recusar, repeticoes, numero=100)
+
+
+def bench_comandos(repeticoes, tamanho):
+    from bench_comandos import gerar_corpus
+    from comandos import filtrar_por_palavra_chave
+
+    transcricoes = gerar_corpus(tamanho)
+    medir("filtrar_por_palavra_chave", lambda: [filtrar_por_palavra_chave(t) for t in transcricoes],
+          repeticoes, unidades=len(transcricoes))
+
+
+def bench_cache(repeticoes, iteracoes):
+    from cache import cache_manager
+
+    resultados = [{"titulo": f"t{n}", "descricao": "d" * 120, "link": f"https://exemplo.com/{n}"} for n in range(3)]
+    consultas = [f"consulta de benchmark {n}" for n in range(iteracoes)]
+    for consulta in consultas:
+        cache_manager.armazenar_cache(consulta, resultados)
+
+    medir("armazenar_cache", lambda: [cache_manager.armazenar_cache(c, resultados) for c in consultas],
+          repeticoes, unidades=iteracoes)
+    medir("obter_cache (memória)", lambda: [cache_manager.obter_cache(c) for c in consultas],
+          repeticoes, unidades=iteracoes)
+
+    def ler_do_disco():
+        cache_manager.cache_memoria.clear()
+        for consulta in consultas:
+            cache_manager.obter_cache(consulta)
+    medir("obter_cache (disco)", ler_do_disco, repeticoes, unidades=iteracoes)
+
+    # Transcrições ligeiramente diferentes: falha na chave exata e acerto pelo índice de similaridade
+    variantes = [c.replace("benchmark", "benchmarc") for c in consultas]
+    medir("obter_cache (similar)", lambda: [cache_manager.obter_cache(v) for v in variantes],
+          repeticoes, unidades=iteracoes)
+
+    audio = b'\xff\xf3\x44\xc4' + b'\x00' * 16 * 1024
+    textos = [f"Aqui estão os resultados para {c}" for c in consultas]
+    for texto in textos:
+        cache_manager.armazenar_audio_cache(texto, audio)
+    medir("obter_audio_cache", lambda: [cache_manager.obter_audio_cache(t) for t in textos],
+          repeticoes, unidades=iteracoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grupos', default=','.join(GRUPOS))
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--tamanho', type=int, default=5000, help="Transcrições do corpus de comandos")
+    parser.add_argument('--iteracoes', type=int, default=500, help="Consultas distintas no benchmark do cache")
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='bench_micro_')
+    os.environ.setdefault('CACHE_DIR', os.path.join(diretorio, 'cache'))
+    os.environ.setdefault('LOG_DIR', os.path.join(diretorio, 'logs'))
+    os.environ.setdefault('CACHE_RENOVACAO_TOP_K', '0')
+
+    # O log por chamada não faz parte do que está sendo medido
+    logging.disable(logging.CRITICAL)
+
+    grupos = [grupo.strip() for grupo in args.grupos.split(',') if grupo.strip()]
+    if 'check_audio' in grupos:
+        bench_check_audio(args.repeticoes, diretorio)
+    if 'comandos' in grupos:
+        bench_comandos(args.repeticoes, args.tamanho)
+    if 'cache' in grupos:
+        bench_cache(args.repeticoes, args.iteracoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Servidores locais que substituem os serviços externos nos benchmarks: SerpApi,
+reconhecimento de fala e síntese de voz (TTS). Cada servidor roda em uma
+thread, com latência e taxa de erro configuráveis.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+import speech_recognition as sr
+
+
+class ServidorFalso:
+    """
+    Servidor HTTP local que responde com `responder(metodo, caminho, parametros, corpo)`,
+    que retorna (status, content_type, corpo). Cada requisição espera `latencia`
+    segundos (com variação de até `variacao` para mais ou para menos) e falha
+    com 503 na proporção `taxa_erro`.
+    """
+
+    def __init__(self, responder, latencia=0.0, variacao=0.0, taxa_erro=0.0, semente=42):
+        self.responder = responder
+        self.latencia = latencia
+        self.variacao = variacao
+        self.taxa_erro = taxa_erro
+        self.requisicoes = 0
+        self.erros = 0
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _sortear(self):
+        with self._lock:
+            self.requisicoes += 1
+            espera = max(0.0, self.latencia + self._aleatorio.uniform(-self.variacao, self.variacao))
+            falhar = self._aleatorio.random() < self.taxa_erro
+            if falhar:
+                self.erros += 1
+        return espera, falhar
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _atender(self, metodo):
+                url = urlparse(self.path)
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                corpo = self.rfile.read(tamanho) if tamanho else b''
+                espera, falhar = servidor._sortear()
+                time.sleep(espera)
+                if falhar:
+                    status, tipo, resposta = 503, 'text/plain', b'erro simulado'
+                else:
+                    status, tipo, resposta = servidor.responder(metodo, url.path, parse_qs(url.query), corpo)
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(resposta)))
+                self.end_headers()
+                self.wfile.write(resposta)
+
+            def do_GET(self):
+                self._atender('GET')
+
+            def do_POST(self):
+                self._atender('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self):
+        """
+        Inicia o servidor em uma porta livre e retorna a URL base.
+        """
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._servidor.server_port}"
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+
+def responder_serpapi(metodo, caminho, parametros, corpo):
+    """
+    Resposta no formato da SerpApi com três resultados orgânicos para a consulta 'q'.
+    """
+    query = parametros.get('q', [''])[0]
+    dados = {"organic_results": [
+        {"title": f"{query} - resultado {n}", "snippet": f"Descrição {n} sobre {query}", "link": f"https://exemplo.com/{n}"}
+        for n in range(1, 4)
+    ]}
+    return 200, 'application/json', json.dumps(dados).encode()
+
+
+def responder_fala(metodo, caminho, parametros, corpo):
+    """
+    Transcrição determinística derivada do conteúdo do áudio: o mesmo PCM gera
+    sempre a mesma consulta e áudios diferentes geram consultas diferentes.
+    """
+    if not corpo:
+        return 200, 'application/json', b'{"transcript": ""}'
+    assunto = hashlib.blake2b(corpo, digest_size=4).hexdigest()
+    return 200, 'application/json', json.dumps({"transcript": f"pesquisar assunto {assunto}"}).encode()
+
+
+def responder_tts(metodo, caminho, parametros, corpo):
+    """
+    "MP3" sintético com tamanho proporcional ao texto (quadros MPEG vazios).
+    """
+    quadro = b'\xff\xf3\x44\xc4' + b'\x00' * 140
+    return 200, 'audio/mpeg', quadro * max(1, len(corpo) // 4)
+
+
+def reconhecedor_falso(url_base):
+    """
+    Reconhecedor (mesma interface de audio_processing.reconhecer_google) que
+    envia o PCM ao servidor de fala falso.
+    """
+    sessao = requests.Session()
+
+    def reconhecer(audio_data):
+        try:
+            resposta = sessao.post(f"{url_base}/recognize", data=audio_data.get_raw_data(), timeout=30)
+        except requests.RequestException as e:
+            raise sr.RequestError(str(e))
+        if resposta.status_code != 200:
+            raise sr.RequestError(f"recognition request failed: {resposta.status_code}")
+        texto = resposta.json().get('transcript')
+        if not texto:
+            raise sr.UnknownValueError()
+        return texto
+    return reconhecer
+
+
+def gtts_falso(url_base):
+    """
+    Classe com a interface usada de gTTS (construtor e write_to_fp) que
+    sintetiza pelo servidor de TTS falso.
+    """
+    sessao = requests.Session()
+
+    class GTTSFalso:
+        def __init__(self, texto, lang='pt', slow=False):
+            self.texto = texto
+
+        def write_to_fp(self, fp):
+            resposta = sessao.post(f"{url_base}/tts", data=self.texto.encode('utf-8'), timeout=30)
+            resposta.raise_for_status()
+            fp.write(resposta.content)
+    return GTTSFalso
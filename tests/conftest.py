@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Cache, logs e tarefas em segundo plano isolados, definidos antes de importar os módulos do app
+_DIRETORIO = tempfile.mkdtemp(prefix='testes_api_')
+os.environ.setdefault('CACHE_DIR', os.path.join(_DIRETORIO, 'cache'))
+os.environ.setdefault('LOG_DIR', os.path.join(_DIRETORIO, 'logs'))
+os.environ.setdefault('CACHE_RENOVACAO_TOP_K', '0')
+os.environ.setdefault('CACHE_PRE_AQUECIMENTO_TOP_N', '0')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'API'))
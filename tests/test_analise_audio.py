@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from analise_audio import analisar_volume, cortar_silencio, segmentar_por_silencio, PISO_DB
+
+TAXA = 16000
+
+
+def _pcm(*trechos):
+    """
+    PCM 16 bits a partir de trechos (segundos, amplitude): amplitude 0 é
+    silêncio digital, as demais são um tom de 440 Hz.
+    """
+    partes = []
+    for segundos, amplitude in trechos:
+        t = np.arange(int(segundos * TAXA)) / TAXA
+        partes.append(amplitude * np.sin(2 * np.pi * 440 * t))
+    return np.concatenate(partes).astype('<i2').tobytes()
+
+
+def test_silencio_digital_fica_no_piso():
+    analise = analisar_volume(_pcm((1.0, 0)), TAXA)
+    assert analise["mean_volume"] == PISO_DB
+    assert analise["max_volume"] == PISO_DB
+    assert analisar_volume(b'', TAXA)["proporcao_silencio"] == 1.0
+
+
+def test_volume_e_trecho_de_fala():
+    analise = analisar_volume(_pcm((0.9, 0), (0.9, 10000), (0.9, 0)), TAXA)
+    assert analise["max_volume"] == pytest.approx(20 * np.log10(10000 / 32768), abs=0.1)
+    assert analise["proporcao_silencio"] == pytest.approx(2 / 3, abs=0.01)
+    assert analise["inicio_fala"] == pytest.approx(0.9)
+    assert analise["fim_fala"] == pytest.approx(1.8)
+
+
+def test_audio_saturado_tem_pico_em_0_dbfs():
+    # Tom com o dobro da amplitude representável, cortado nos limites do int16
+    saturado = np.clip(np.sin(np.arange(TAXA) / 5) * 65536, -32768, 32767).astype('<i2').tobytes()
+    assert analisar_volume(saturado, TAXA)["max_volume"] == 0.0
+
+
+def test_cortar_silencio_mantem_a_margem():
+    pcm = _pcm((0.9, 0), (0.9, 10000), (0.9, 0))
+    cortado = cortar_silencio(pcm, TAXA, analisar_volume(pcm, TAXA), margem_ms=200)
+    assert len(cortado) // 2 == pytest.approx(1.3 * TAXA, abs=2)
+    assert cortado == pcm[int(0.7 * TAXA) * 2:int(0.7 * TAXA) * 2 + len(cortado)]
+
+    # Sem trecho de fala identificado, o áudio é mantido
+    sem_fala = {"inicio_fala": 0.0, "fim_fala": 0.0}
+    assert cortar_silencio(pcm, TAXA, sem_fala) is pcm
+
+
+def test_segmentos_separados_pelo_silencio_minimo():
+    # 0,6 s de fala, 0,9 s de silêncio e 0,6 s de fala (quadros de 30 ms = 480 amostras)
+    pcm = _pcm((0.6, 10000), (0.9, 0), (0.6, 10000))
+    intervalos = segmentar_por_silencio(pcm, TAXA, -40, silencio_min_ms=500, margem_ms=200)
+    assert intervalos == [(0, 9600 + 3200), (24000 - 3200, 33600)]
+
+    # Silêncio menor que o mínimo não separa os trechos
+    pcm = _pcm((0.6, 10000), (0.3, 0), (0.6, 10000))
+    assert segmentar_por_silencio(pcm, TAXA, -40, silencio_min_ms=500) == [(0, 24000)]
+
+
+def test_segmento_longo_dividido_em_partes_iguais():
+    pcm = _pcm((2.4, 10000))
+    assert segmentar_por_silencio(pcm, TAXA, -40, segmento_max_s=1.0) == [(0, 12800), (12800, 25600), (25600, 38400)]
+
+
+def test_sem_fala_nao_ha_segmentos():
+    assert segmentar_por_silencio(_pcm((1.0, 0)), TAXA, -40) == []
+    assert segmentar_por_silencio(b'', TAXA, -40) == []
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import logging
+import queue
+
+from aiohttp import FormData
+from aiohttp.test_utils import TestClient, TestServer
+
+import app_async
+from configuracao_log import HandlerFila, definir_id_requisicao
+
+
+def test_id_da_requisicao_nos_logs_das_threads_do_executor():
+    fila = queue.Queue()
+    logger = logging.getLogger('teste_executor')
+    logger.addHandler(HandlerFila(fila))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    async def requisicao():
+        definir_id_requisicao('req-123')
+        await app_async._em_thread(logger.info, "Registro na thread do executor")
+
+    asyncio.run(requisicao())
+    assert fila.get_nowait().request_id == 'req-123'
+
+
+def _enviar_audio(conteudo):
+    async def enviar():
+        app = app_async.web.Application()
+        app.router.add_post('/processar_audio', app_async.processar_audio)
+        async with TestClient(TestServer(app)) as cliente:
+            dados = FormData()
+            dados.add_field('audio', conteudo, filename='audio.wav')
+            resposta = await cliente.post('/processar_audio', data=dados)
+            return resposta.status, await resposta.json()
+
+    return asyncio.run(enviar())
+
+
+def test_audio_repetido_nao_passa_pelo_ffmpeg(monkeypatch):
+    conteudo = b'RIFF' + bytes(200 * 1024)
+    digests = []
+
+    def obter_transcricao_cache(digest):
+        digests.append(digest)
+        return {"transcricao": "pesquisar"}
+
+    async def check_audio_stream_async(chunks, label):
+        raise AssertionError("o ffmpeg não deveria ser chamado para um áudio em cache")
+
+    monkeypatch.setattr(app_async, 'obter_transcricao_cache', obter_transcricao_cache)
+    monkeypatch.setattr(app_async, 'check_audio_stream_async', check_audio_stream_async)
+
+    status, corpo = _enviar_audio(conteudo)
+    assert status == 400
+    assert "interpretar" in corpo["message"]
+    assert digests == [hashlib.blake2b(conteudo, digest_size=32).hexdigest()]
+
+
+def test_audio_novo_vai_inteiro_ao_ffmpeg(monkeypatch):
+    conteudo = bytes(range(256)) * 800
+    recebido = []
+
+    async def check_audio_stream_async(chunks, label):
+        async for bloco in chunks:
+            recebido.append(bloco)
+        return {"status": "error", "message": "Formato inválido."}
+
+    monkeypatch.setattr(app_async, 'obter_transcricao_cache', lambda digest: None)
+    monkeypatch.setattr(app_async, 'check_audio_stream_async', check_audio_stream_async)
+
+    status, corpo = _enviar_audio(conteudo)
+    assert status == 400
+    assert corpo == {"error": "Formato inválido."}
+    assert b''.join(recebido) == conteudo
+
+
+def test_upload_acima_do_limite_recusado_sem_ffmpeg(monkeypatch):
+    async def check_audio_stream_async(chunks, label):
+        raise AssertionError("o ffmpeg não deveria ser chamado acima do limite")
+
+    monkeypatch.setattr(app_async, 'MAX_AUDIO_SIZE_BYTES', 100 * 1024)
+    monkeypatch.setattr(app_async, 'check_audio_stream_async', check_audio_stream_async)
+
+    status, corpo = _enviar_audio(bytes(300 * 1024))
+    assert status == 400
+    assert "excede o limite" in corpo["error"]
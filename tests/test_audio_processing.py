@@ -0,0 +1,35 @@
+import audio_processing
+from cota import LOTE, faixa_atual, prioridade
+
+
+def test_sintese_especulativa_mantem_faixa_de_quem_chamou(monkeypatch):
+    faixas = []
+
+    def gerar_audio_resposta(texto, *args, **kwargs):
+        faixas.append(faixa_atual.get())
+        return b"mp3"
+
+    monkeypatch.setattr(audio_processing, 'TTS_MODO', 'completo')
+    monkeypatch.setattr(audio_processing, 'gerar_audio_resposta', gerar_audio_resposta)
+    with prioridade(LOTE):
+        finalizar = audio_processing.iniciar_sintese_especulativa("clima hoje", [3])
+
+    assert finalizar(3) == b"mp3"
+    assert faixas == [LOTE]
+
+
+def test_total_nao_especulado_e_sintetizado_sob_demanda(monkeypatch):
+    textos = []
+
+    def gerar_audio_resposta(texto, *args, **kwargs):
+        textos.append(texto)
+        return b"especulado"
+
+    monkeypatch.setattr(audio_processing, 'TTS_MODO', 'completo')
+    monkeypatch.setattr(audio_processing, 'gerar_audio_resposta', gerar_audio_resposta)
+    monkeypatch.setattr(audio_processing, 'gerar_audio_resultado', lambda query, total: b"sob demanda")
+    finalizar = audio_processing.iniciar_sintese_especulativa("clima hoje", [5])
+
+    assert finalizar(2) == b"sob demanda"
+    assert finalizar(5) == b"especulado"
+    assert len(textos) == 1
@@ -0,0 +1,98 @@
+import threading
+from time import sleep, time
+
+from cache import cache_manager
+
+
+def _entradas(query, resultados_velhos, resultados_novos):
+    agora = time()
+    velha = {"query": query, "resultados": resultados_velhos, "renovar_em": agora - 10}
+    nova = {"query": query, "resultados": resultados_novos, "renovar_em": agora + 3600}
+    return velha, nova
+
+
+def test_entrada_velha_na_memoria_usa_a_renovada_por_outro_worker():
+    query = "cotacao dolar hoje"
+    chave = cache_manager.chave_busca(query)
+    velha, nova = _entradas(query, ["velho"], ["novo"])
+    cache_manager.cache.set(chave, nova, expire=7200)
+    cache_manager.cache_memoria.set(chave, velha, 3600)
+    chamadas = []
+
+    def buscar(q):
+        chamadas.append(q)
+        return ["origem"]
+
+    assert cache_manager.obter_ou_buscar(query, buscar) == ["novo"]
+    assert chamadas == []
+    assert cache_manager.cache_memoria.get(chave) == nova
+
+
+def test_renovacao_nao_chama_a_origem_se_o_disco_ja_foi_renovado():
+    query = "placar do jogo"
+    chave = cache_manager.chave_busca(query)
+    velha, nova = _entradas(query, ["velho"], ["novo"])
+    cache_manager.cache.set(chave, nova, expire=7200)
+    chamadas = []
+
+    def buscar(q):
+        chamadas.append(q)
+        return ["origem"]
+
+    cache_manager._renovar(query, chave, buscar, 3600, velha["renovar_em"])
+    assert chamadas == []
+
+    # Sem entrada mais nova no disco, a renovação chama a origem
+    cache_manager.cache.set(chave, velha, expire=7200)
+    cache_manager._renovar(query, chave, buscar, 3600, velha["renovar_em"])
+    assert chamadas == [query]
+    assert cache_manager.cache.get(chave)["resultados"] == ["origem"]
+
+
+def test_normalizacao_remove_stop_words_antes_dos_acentos():
+    normalizar = cache_manager.normalizar_consulta
+    assert normalizar("Clima no Pará") == "clima para"
+    assert normalizar("clima no Pará") != normalizar("clima")
+    assert normalizar("o que é python") == "que e python"
+    assert normalizar("Informações sobre a Inteligência Artificial!") == "inteligencia artificial"
+    assert normalizar("clima e tempo") == "clima tempo"
+
+
+def test_consultas_simultaneas_chamam_a_origem_uma_vez():
+    chamadas = []
+    liberar = threading.Event()
+
+    def buscar(q):
+        chamadas.append(q)
+        liberar.wait(5)
+        return ["resultado"]
+
+    respostas = []
+    threads = [
+        threading.Thread(target=lambda q=q: respostas.append(cache_manager.obter_ou_buscar(q, buscar)))
+        for q in ("Previsão do tempo", "previsao do tempo", "a previsão do tempo")
+    ]
+    for thread in threads:
+        thread.start()
+    sleep(0.2)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(chamadas) == 1
+    assert respostas == [["resultado"]] * 3
+
+
+def test_limpar_o_cache_mantem_cotas_e_marcadores():
+    from cota import CotaCompartilhada
+
+    cota = CotaCompartilhada('teste', cache_manager.estado_compartilhado, por_minuto=60, rajada=2)
+    cota.adquirir()
+    cota.adquirir()
+    cache_manager.estado_compartilhado.add("em_andamento:busca:teste", 1, expire=30)
+
+    cache_manager.limpar_cache()
+    cache_manager.manter_limite_cache()
+
+    assert cota._reservar('interativo') > 0
+    assert "em_andamento:busca:teste" in cache_manager.estado_compartilhado
@@ -0,0 +1,61 @@
+import struct
+
+from check_audio import identificar_formato, duracao_cabecalho, pre_validar_cabecalho
+
+
+def _wav(segundos, taxa=16000, canais=1, bits=16):
+    taxa_bytes = taxa * canais * bits // 8
+    tamanho_dados = int(segundos * taxa_bytes)
+    fmt = struct.pack('<HHIIHH', 1, canais, taxa, taxa_bytes, canais * bits // 8, bits)
+    return (b'RIFF' + struct.pack('<I', 36 + tamanho_dados) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + b'data' + struct.pack('<I', tamanho_dados))
+
+
+def _flac(segundos, taxa=44100):
+    amostras = int(segundos * taxa)
+    info = bytearray(34)
+    info[10] = taxa >> 12
+    info[11] = (taxa >> 4) & 0xFF
+    info[12] = (taxa & 0x0F) << 4
+    info[13] = (amostras >> 32) & 0x0F
+    struct.pack_into('>I', info, 14, amostras & 0xFFFFFFFF)
+    return b'fLaC' + bytes([0x80, 0, 0, 34]) + bytes(info)
+
+
+def test_identifica_formato_pela_assinatura():
+    assert identificar_formato(_wav(1)) == 'wav'
+    assert identificar_formato(b'OggS\x00\x02' + b'\x00' * 20) == 'ogg'
+    assert identificar_formato(_flac(1)) == 'flac'
+    assert identificar_formato(b'ID3\x04\x00\x00\x00\x00\x00\x00') == 'mp3'
+    assert identificar_formato(b'\xff\xfb\x90\x64') == 'mp3'
+    assert identificar_formato(b'\xff\xf1\x50\x80') == 'aac'
+    assert identificar_formato(b'<html><body>') is None
+    assert identificar_formato(b'RIFF\x00\x00\x00\x00AVI ') is None
+
+
+def test_duracao_declarada_no_cabecalho():
+    assert duracao_cabecalho(_wav(2.5), 'wav') == 2.5
+    assert abs(duracao_cabecalho(_flac(3), 'flac') - 3) < 1e-6
+    assert duracao_cabecalho(b'OggS' + b'\x00' * 40, 'ogg') is None
+    # WAV gravado em fluxo contínuo: tamanho dos dados 0 ou máximo
+    assert duracao_cabecalho(_wav(0), 'wav') is None
+    assert duracao_cabecalho(_wav(1)[:-4] + b'\xff\xff\xff\xff', 'wav') is None
+
+
+def test_cabecalho_truncado_nao_falha():
+    wav = _wav(1)
+    for corte in (4, 12, 20, 30, len(wav) - 4):
+        formato = identificar_formato(wav[:corte])
+        assert duracao_cabecalho(wav[:corte], 'wav') is None
+        assert formato in (None, 'wav')
+    assert duracao_cabecalho(_flac(1)[:30], 'flac') is None
+    assert identificar_formato(b'') is None
+    assert identificar_formato(b'\xff') is None
+
+
+def test_pre_validacao_pelo_cabecalho():
+    assert pre_validar_cabecalho(_wav(1), 'ok.wav') is None
+    assert pre_validar_cabecalho(b'\xff\xfb\x90\x64' + b'\x00' * 60, 'ok.mp3') is None
+    assert pre_validar_cabecalho(_wav(0.05), 'curto.wav')["message"] == "Áudio muito curto para processamento."
+    assert pre_validar_cabecalho(b'%PDF-1.4', 'doc.pdf')["message"] == "Tipo de arquivo inválido, não é áudio."
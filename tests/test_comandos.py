@@ -0,0 +1,21 @@
+from comandos import IdentificadorComandos, COMANDOS_PADRAO, filtrar_por_palavra_chave
+
+
+def test_comando_longo_tem_precedencia_sobre_o_prefixo():
+    identificador = IdentificadorComandos(COMANDOS_PADRAO)
+
+    assert identificador.identificar("Encontre informações sobre energia solar") == (
+        "energia solar", "encontre informações sobre")
+    assert identificador.identificar("encontre informacoes sobre energia solar") == (
+        "energia solar", "encontre informações sobre")
+    assert identificador.identificar("encontre um restaurante") == ("um restaurante", "encontre")
+    assert filtrar_por_palavra_chave("Encontre informações sobre energia solar") == "energia solar"
+
+
+def test_frases_fora_da_ordem_de_tamanho_nao_sao_sombreadas():
+    identificador = IdentificadorComandos(["quero", "quero ver"])
+    assert identificador.identificar("quero ver o jogo") == ("o jogo", "quero ver")
+
+
+def test_texto_sem_comando_e_mantido():
+    assert filtrar_por_palavra_chave("  previsão do tempo ") == "previsão do tempo"
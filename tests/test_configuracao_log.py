@@ -0,0 +1,19 @@
+import logging
+
+from configuracao_log import LimitadorLog
+
+
+def _registro(mensagem, **extra):
+    registro = logging.LogRecord('app', logging.INFO, __file__, 1, mensagem, ("clima",), None)
+    registro.__dict__.update(extra)
+    return registro
+
+
+def test_limite_nao_descarta_registros_sem_amostragem():
+    limitador = LimitadorLog(limite=2)
+
+    amostrados = [limitador.filter(_registro("Resultados: %s")) for _ in range(10)]
+    consultas = [limitador.filter(_registro("Consulta filtrada: %s", amostragem=False)) for _ in range(10)]
+
+    assert sum(amostrados) == 2
+    assert all(consultas)
@@ -0,0 +1,86 @@
+import diskcache
+import pytest
+
+import cota
+from cota import CotaCompartilhada, CotaEsgotada, INTERATIVO, LOTE, SEGUNDO_PLANO, prioridade
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cota, 'time', relogio)
+    monkeypatch.setattr(cota, 'monotonic', relogio)
+    monkeypatch.setattr(cota, 'sleep', relogio.dormir)
+    return relogio
+
+
+@pytest.fixture
+def armazenamento(tmp_path):
+    with diskcache.Cache(str(tmp_path)) as armazenamento:
+        yield armazenamento
+
+
+def test_balde_repoe_fichas_com_o_tempo(relogio, armazenamento):
+    cota_servico = CotaCompartilhada('servico', armazenamento, por_minuto=60, rajada=2)
+    assert cota_servico._reservar(INTERATIVO) == 0
+    assert cota_servico._reservar(INTERATIVO) == 0
+    assert cota_servico._reservar(INTERATIVO) == pytest.approx(1.0)
+
+    relogio.dormir(1.0)
+    assert cota_servico._reservar(INTERATIVO) == 0
+
+    # A reposição não passa da rajada
+    relogio.dormir(3600)
+    esperas = [cota_servico._reservar(INTERATIVO) for _ in range(3)]
+    assert esperas[:2] == [0, 0] and esperas[2] > 0
+
+
+def test_reserva_da_rajada_para_chamadas_interativas(relogio, armazenamento):
+    cota_servico = CotaCompartilhada('servico', armazenamento, por_minuto=60, rajada=10, reserva=0.3)
+    for _ in range(6):
+        assert cota_servico._reservar(INTERATIVO) == 0
+
+    # Restam 4 fichas: LOTE leva uma enquanto sobrar a reserva (3 fichas) mais a própria
+    assert cota_servico._reservar(LOTE) == 0
+    assert cota_servico._reservar(LOTE) > 0
+    assert cota_servico._reservar(SEGUNDO_PLANO) > 0
+    assert cota_servico._reservar(INTERATIVO) == 0
+
+
+def test_cota_esgotada_sugere_retry_after(relogio, armazenamento, monkeypatch):
+    monkeypatch.setitem(cota.COTA_ESPERA_MAX, INTERATIVO, 2)
+    cota_servico = CotaCompartilhada('servico', armazenamento, por_minuto=6, rajada=1)
+    cota_servico.adquirir()
+
+    with pytest.raises(CotaEsgotada) as erro:
+        cota_servico.adquirir()
+    assert erro.value.retry_after == 10
+
+
+def test_adquirir_aguarda_dentro_da_espera_maxima_da_faixa(relogio, armazenamento, monkeypatch):
+    monkeypatch.setitem(cota.COTA_ESPERA_MAX, LOTE, 30)
+    cota_servico = CotaCompartilhada('servico', armazenamento, por_minuto=60, rajada=1, reserva=0)
+    inicio = relogio.agora
+    with prioridade(LOTE):
+        cota_servico.adquirir()
+        cota_servico.adquirir()
+    assert relogio.agora - inicio == pytest.approx(1.0)
+
+
+def test_pausa_apos_limite_do_provedor(relogio, armazenamento):
+    cota_servico = CotaCompartilhada('servico', armazenamento, por_minuto=60, rajada=5)
+    cota_servico.pausar(30)
+    assert cota_servico._reservar(INTERATIVO) == pytest.approx(31.0)
+    relogio.dormir(31)
+    assert cota_servico._reservar(INTERATIVO) == 0
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from http_client import ClienteHTTPAsync, Disjuntor
+
+
+def test_teste_meio_aberto_cancelado_libera_o_disjuntor(monkeypatch):
+    disjuntor = Disjuntor('servico', limite_falhas=1, tempo_aberto=0)
+    disjuntor.registrar_falha()
+    cliente = ClienteHTTPAsync('http://servico', disjuntor=disjuntor)
+
+    class SessaoLenta:
+        def get(self, *args, **kwargs):
+            return self
+
+        async def __aenter__(self):
+            await asyncio.sleep(60)
+
+        async def __aexit__(self, *args):
+            return False
+
+    monkeypatch.setattr(cliente, '_obter_sessao', lambda: SessaoLenta())
+
+    async def cancelar_teste():
+        tarefa = asyncio.ensure_future(cliente.get_json())
+        await asyncio.sleep(0)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+
+    asyncio.run(cancelar_teste())
+    assert disjuntor.permitir()
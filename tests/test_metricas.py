@@ -0,0 +1,29 @@
+import multiprocessing
+
+from metricas import Registro
+
+
+def _worker(registro, contador, histograma):
+    contador.inc(3, cache='busca')
+    histograma.observar(0.2, etapa='busca')
+    registro.publicar()
+
+
+def test_metricas_somadas_entre_processos(tmp_path):
+    registro = Registro(diretorio=str(tmp_path))
+    contador = registro.contador('consultas_total', "Consultas.", ('cache',))
+    histograma = registro.histograma('etapa_duracao_segundos', "Duração.", ('etapa',), buckets=(0.1, 1.0))
+    contador.inc(2, cache='busca')
+    histograma.observar(0.05, etapa='busca')
+
+    # O worker começa do zero após o fork e continua somado depois de terminar
+    processo = multiprocessing.get_context('fork').Process(target=_worker, args=(registro, contador, histograma))
+    processo.start()
+    processo.join()
+    assert processo.exitcode == 0
+
+    linhas = registro.expor().splitlines()
+    assert 'consultas_total{cache="busca"} 5' in linhas
+    assert 'etapa_duracao_segundos_bucket{etapa="busca",le="0.1"} 1' in linhas
+    assert 'etapa_duracao_segundos_bucket{etapa="busca",le="1.0"} 2' in linhas
+    assert 'etapa_duracao_segundos_count{etapa="busca"} 2' in linhas
@@ -0,0 +1,22 @@
+from cache.similaridade import IndiceSimilaridade
+
+
+def _indice(*consultas):
+    return IndiceSimilaridade(0.88, lambda: consultas, intervalo_recarga=3600)
+
+
+def test_erro_de_digitacao_encontra_a_consulta_em_cache():
+    indice = _indice("inteligencia artificial")
+    assert indice.buscar("inteligencia artifical")[0] == "inteligencia artificial"
+
+
+def test_palavra_diferente_nao_encontra_a_consulta_em_cache():
+    indice = _indice("python tutorial", "jogo 2024")
+    assert indice.buscar("ipython tutorial") is None
+    assert indice.buscar("jogo 2023") is None
+
+
+def test_consulta_parecida_encontrada_entre_muitas_com_trigramas_comuns():
+    consultas = [f"previsao do tempo cidade {n}" for n in range(500)] + ["previsao do tempo amanha"]
+    indice = IndiceSimilaridade(0.88, lambda: consultas, intervalo_recarga=3600, max_por_trigrama=16)
+    assert indice.buscar("previsao do tempo amanhan")[0] == "previsao do tempo amanha"
@@ -0,0 +1,47 @@
+import gzip
+import json
+from time import time
+
+from cache import cache_manager, snapshot
+
+
+def _registro(query, resultados):
+    chave = cache_manager.chave_busca(query)
+    valor = {"query": query, "resultados": resultados, "renovar_em": time() + 3600}
+    return json.dumps({"tipo": "busca", "chave": chave, "valor": valor, "expira_em": time() + 7200})
+
+
+def _cabecalho():
+    return json.dumps({"formato": snapshot.FORMATO, "versao": snapshot.VERSAO, "criado_em": time()})
+
+
+def test_registros_malformados_sao_ignorados(tmp_path):
+    caminho = tmp_path / "snapshot.gz"
+    linhas = [
+        _cabecalho(),
+        _registro("snapshot valido um", ["r1"]),
+        '{"tipo": "busca", "chave": "busca:sem valor"}',
+        'null',
+        '{"tipo": "busca", "chave": "busca:truncad',
+        json.dumps({"tipo": "tts", "chave": "tts:abc", "valor": "***", "expira_em": None}),
+        _registro("snapshot valido dois", ["r2"]),
+    ]
+    with gzip.open(caminho, 'wt', encoding='utf-8') as f:
+        f.write("\n".join(linhas) + "\n")
+
+    contagens = snapshot.importar_snapshot(str(caminho))
+
+    assert contagens == {"busca": 2, "ignorados": 4}
+    assert cache_manager.obter_cache("snapshot valido dois") == ["r2"]
+
+
+def test_arquivo_truncado_importa_ate_o_corte(tmp_path):
+    caminho = tmp_path / "snapshot.gz"
+    conteudo = "\n".join([_cabecalho()] + [_registro(f"snapshot truncado {n}", [n]) for n in range(200)]) + "\n"
+    comprimido = gzip.compress(conteudo.encode('utf-8'))
+    caminho.write_bytes(comprimido[:len(comprimido) * 2 // 3])
+
+    contagens = snapshot.importar_snapshot(str(caminho))
+
+    assert 0 < contagens["busca"] < 200
+    assert cache_manager.obter_cache("snapshot truncado 0") == [0]